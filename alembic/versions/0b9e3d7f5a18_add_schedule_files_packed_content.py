@@ -0,0 +1,28 @@
+"""add schedule files packed content
+
+Revision ID: 0b9e3d7f5a18
+Revises: f4c1a9e6b270
+Create Date: 2025-04-02 09:47:33.872105
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0b9e3d7f5a18"
+down_revision: Union[str, None] = "f4c1a9e6b270"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "schedule_files", sa.Column("packed_content", sa.LargeBinary(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("schedule_files", "packed_content")
@@ -0,0 +1,48 @@
+"""add schedule file groups
+
+Revision ID: 3c8f1b6d2e94
+Revises: 0b9e3d7f5a18
+Create Date: 2025-04-03 15:21:07.418360
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "3c8f1b6d2e94"
+down_revision: Union[str, None] = "0b9e3d7f5a18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Содержимое ранее загруженных файлов остается в schedule_files
+    # и читается оттуда (FileRepository.load_content)
+    op.create_table(
+        "schedule_file_groups",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("file_id", sa.BigInteger(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("group_name", sa.String(), nullable=False),
+        sa.Column("content", sa.JSON(), nullable=True),
+        sa.Column("packed_content", sa.LargeBinary(), nullable=True),
+        sa.ForeignKeyConstraint(["file_id"], ["schedule_files.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id"),
+    )
+    op.create_index(
+        "ix_schedule_file_groups_file_group",
+        "schedule_file_groups",
+        ["file_id", "group_name"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_schedule_file_groups_file_group", table_name="schedule_file_groups"
+    )
+    op.drop_table("schedule_file_groups")
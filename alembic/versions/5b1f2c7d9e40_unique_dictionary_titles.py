@@ -0,0 +1,66 @@
+"""unique dictionary titles
+
+Revision ID: 5b1f2c7d9e40
+Revises: 04a0045f5990
+Create Date: 2025-03-03 11:20:41.118204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5b1f2c7d9e40"
+down_revision: Union[str, None] = "04a0045f5990"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Справочник -> (поле, [(таблица, внешний ключ), ...])
+DICTIONARIES = {
+    "sc_disc": ("title", [("sc_rasp7", "disc_id"), ("sc_rasp18", "disc_id")]),
+    "sc_group": (
+        "title",
+        [("sc_rasp7_groups", "group_id"), ("sc_rasp18_groups", "group_id")],
+    ),
+    "sc_prep": (
+        "fio",
+        [("sc_rasp7_preps", "prep_id"), ("sc_rasp18_preps", "prep_id")],
+    ),
+}
+
+
+def _merge_duplicates(table: str, field: str, references) -> None:
+    # Перевешиваем ссылки дубликатов на запись с минимальным id и удаляем дубликаты
+    for ref_table, ref_column in references:
+        op.execute(
+            f"""
+            UPDATE {ref_table} AS r
+            SET {ref_column} = d.keep_id
+            FROM (
+                SELECT id, min(id) OVER (PARTITION BY {field}) AS keep_id
+                FROM {table}
+            ) AS d
+            WHERE r.{ref_column} = d.id AND d.id <> d.keep_id
+            """
+        )
+
+    op.execute(
+        f"""
+        DELETE FROM {table} AS d
+        USING {table} AS k
+        WHERE d.{field} = k.{field} AND d.id > k.id
+        """
+    )
+
+
+def upgrade() -> None:
+    for table, (field, references) in DICTIONARIES.items():
+        _merge_duplicates(table, field, references)
+        op.create_index(f"ix_{table}_{field}", table, [field], unique=True)
+
+
+def downgrade() -> None:
+    for table, (field, _) in DICTIONARIES.items():
+        op.drop_index(f"ix_{table}_{field}", table_name=table)
@@ -0,0 +1,28 @@
+"""add schedule files fingerprint tree
+
+Revision ID: 7d3b5e1a9c24
+Revises: e2a7c4f9b813
+Create Date: 2025-03-27 10:41:17.204983
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "7d3b5e1a9c24"
+down_revision: Union[str, None] = "e2a7c4f9b813"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "schedule_files", sa.Column("fingerprint_tree", sa.JSON(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("schedule_files", "fingerprint_tree")
@@ -0,0 +1,40 @@
+"""add schedule files group names
+
+Revision ID: a6f2d8c3e157
+Revises: 7d3b5e1a9c24
+Create Date: 2025-03-28 15:22:09.613472
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "a6f2d8c3e157"
+down_revision: Union[str, None] = "7d3b5e1a9c24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "schedule_files",
+        sa.Column("group_names", sa.ARRAY(sa.String()), nullable=True),
+    )
+    # json_object_keys сохраняет порядок групп в содержимом
+    op.execute(
+        """
+        UPDATE schedule_files
+        SET group_names = ARRAY(
+            SELECT json_object_keys(standardized_content)
+        )
+        WHERE json_typeof(standardized_content) = 'object'
+          AND standardized_content::text <> '{}'
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("schedule_files", "group_names")
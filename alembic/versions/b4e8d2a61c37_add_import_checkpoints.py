@@ -0,0 +1,44 @@
+"""add import checkpoints
+
+Revision ID: b4e8d2a61c37
+Revises: 7a3c9e1f2b64
+Create Date: 2025-03-14 16:42:09.381277
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b4e8d2a61c37"
+down_revision: Union[str, None] = "7a3c9e1f2b64"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "import_checkpoints",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("semcode", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("is_official", sa.Boolean(), nullable=False),
+        sa.Column("completed_groups", sa.JSON(), nullable=False),
+        sa.Column("batches_done", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id"),
+    )
+    op.create_index(
+        "ix_import_checkpoints_key", "import_checkpoints", ["key"], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_import_checkpoints_key", table_name="import_checkpoints")
+    op.drop_table("import_checkpoints")
@@ -0,0 +1,58 @@
+"""add file content hash
+
+Revision ID: c91f4e7a2d05
+Revises: b4e8d2a61c37
+Create Date: 2025-03-18 10:27:53.904112
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "c91f4e7a2d05"
+down_revision: Union[str, None] = "b4e8d2a61c37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "schedule_files", sa.Column("content_hash", sa.String(64), nullable=True)
+    )
+    op.execute(
+        "UPDATE schedule_files SET content_hash = encode(sha256(file_data), 'hex')"
+    )
+    op.create_index(
+        "ix_schedule_files_content_hash", "schedule_files", ["content_hash"]
+    )
+
+    op.create_table(
+        "schedule_imports",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("file_id", sa.Integer(), nullable=True),
+        sa.Column("semcode", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("is_official", sa.Boolean(), nullable=False),
+        sa.Column("content_hash", sa.String(64), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["file_id"], ["schedule_files.id"], ondelete="SET NULL"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id"),
+    )
+    op.create_index(
+        "ix_schedule_imports_semcode_version",
+        "schedule_imports",
+        ["semcode", "version"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_schedule_imports_semcode_version", table_name="schedule_imports")
+    op.drop_table("schedule_imports")
+    op.drop_index("ix_schedule_files_content_hash", table_name="schedule_files")
+    op.drop_column("schedule_files", "content_hash")
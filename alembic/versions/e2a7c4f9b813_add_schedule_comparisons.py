@@ -0,0 +1,55 @@
+"""add schedule comparisons
+
+Revision ID: e2a7c4f9b813
+Revises: c91f4e7a2d05
+Create Date: 2025-03-24 12:08:41.530227
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "e2a7c4f9b813"
+down_revision: Union[str, None] = "c91f4e7a2d05"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "schedule_comparisons",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("file_id_1", sa.BigInteger(), nullable=False),
+        sa.Column("file_id_2", sa.BigInteger(), nullable=False),
+        sa.Column("engine_version", sa.String(16), nullable=False),
+        sa.Column("result", sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["file_id_1"], ["schedule_files.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(
+            ["file_id_2"], ["schedule_files.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id"),
+    )
+    op.create_index(
+        "ix_schedule_comparisons_files",
+        "schedule_comparisons",
+        ["file_id_1", "file_id_2", "engine_version"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_schedule_comparisons_file_id_2", "schedule_comparisons", ["file_id_2"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_schedule_comparisons_file_id_2", table_name="schedule_comparisons"
+    )
+    op.drop_index("ix_schedule_comparisons_files", table_name="schedule_comparisons")
+    op.drop_table("schedule_comparisons")
@@ -0,0 +1,35 @@
+"""add schedule files blob key
+
+Revision ID: f4c1a9e6b270
+Revises: a6f2d8c3e157
+Create Date: 2025-03-31 11:05:52.318640
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "f4c1a9e6b270"
+down_revision: Union[str, None] = "a6f2d8c3e157"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("schedule_files", sa.Column("blob_key", sa.String(64), nullable=True))
+    op.create_index("ix_schedule_files_blob_key", "schedule_files", ["blob_key"])
+    op.alter_column(
+        "schedule_files", "file_data", existing_type=sa.LargeBinary(), nullable=True
+    )
+
+
+def downgrade() -> None:
+    # Перед откатом файлы из хранилища нужно вернуть в БД
+    op.alter_column(
+        "schedule_files", "file_data", existing_type=sa.LargeBinary(), nullable=False
+    )
+    op.drop_index("ix_schedule_files_blob_key", table_name="schedule_files")
+    op.drop_column("schedule_files", "blob_key")
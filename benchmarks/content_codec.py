@@ -0,0 +1,51 @@
+"""
+Размер и время декодирования standardized_content в JSON-колонке и в
+формате core.utils.content_codec (msgpack + zlib).
+
+Содержимое генерируется так же, как в benchmarks.schedule_compare. Для JSON
+замеряется json.loads текста, который asyncpg получает из JSON-колонки, для
+msgpack - decode_content. Без сжатия в БД JSON занимает столько, сколько
+указано в строке "JSON"; PostgreSQL дополнительно сжимает его pglz при
+записи в TOAST, но по сети и в память процесса передается полный текст.
+
+Запуск:
+    python -m benchmarks.content_codec --groups 600
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.schedule_compare import generate_pair
+from core.utils.content_codec import decode_content, encode_content
+
+
+def measure(func, value, repeat: int = 5):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func(value)
+    return result, (time.perf_counter() - started) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--groups", type=int, default=600)
+    args = parser.parse_args()
+
+    content, _ = generate_pair(args.groups)
+
+    json_data = json.dumps(content, ensure_ascii=False).encode("utf-8")
+    packed, encode_time = measure(encode_content, content)
+    from_json, json_time = measure(json.loads, json_data)
+    from_packed, packed_time = measure(decode_content, packed)
+
+    print(f"Групп: {args.groups}")
+    print(f"JSON:             {len(json_data) / 1024:.0f} КБ, {json_time:.3f} c")
+    print(f"msgpack + zlib:   {len(packed) / 1024:.0f} КБ, {packed_time:.3f} c")
+    print(f"Уменьшение:       x{len(json_data) / len(packed):.1f}")
+    print(f"Кодирование:      {encode_time:.3f} c")
+    print(f"Содержимое совпадает: {from_json == from_packed == content}")
+
+
+if __name__ == "__main__":
+    main()
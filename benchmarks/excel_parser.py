@@ -0,0 +1,201 @@
+"""
+Сравнение потокового разбора Excel (read_only, один проход по строкам)
+с прежним разбором через sheet.cell в полном режиме openpyxl.
+
+Файл генерируется синтетически, результаты обоих конвертеров сверяются.
+
+Запуск:
+    python -m benchmarks.excel_parser --groups 60 --sheets 10
+"""
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from io import BytesIO
+from typing import Dict
+
+from openpyxl import Workbook, load_workbook
+
+from core.schemas.schedule import LessonData, ScheduleResult
+from core.services.converters.excel_converter import ExcelConverter
+from core.settings.app_config import settings
+from core.utils.maps import COLUMN_MAPS, WEEKDAYS
+
+SUBJECTS = [f"Дисциплина {i}" for i in range(40)]
+TEACHERS = [f"Преподаватель {i} А.Б." for i in range(30)]
+ROOMS = ["ауд. А-101 (В-78)", "комп. Б-204 (В-86)", "ауд. 305", "ауд. Г-1 (С-20)"]
+
+
+class LegacyExcelConverter(ExcelConverter):
+    """Прежний разбор: полный режим и обход каждого блока через sheet.cell"""
+
+    def convert(self, file_data: bytes) -> ScheduleResult:
+        wb = load_workbook(BytesIO(file_data))
+        results: Dict[str, ScheduleResult] = {}
+        for sheet in wb.worksheets:
+            self._process_legacy_sheet(sheet, results)
+        return next(iter(results.values())) if results else ScheduleResult()
+
+    def convert_all(self, file_data: bytes) -> Dict[str, ScheduleResult]:
+        wb = load_workbook(BytesIO(file_data))
+        results: Dict[str, ScheduleResult] = {}
+        for sheet in wb.worksheets:
+            self._process_legacy_sheet(sheet, results)
+        return results
+
+    def _process_legacy_sheet(self, sheet, results):
+        max_columns = sheet.max_column
+        for start_col in range(1, max_columns + 1, 15):
+            for header_col, first_col, last_col, column_map in (
+                (start_col + 5, start_col, start_col + 9, COLUMN_MAPS["1"]),
+                (start_col + 10, start_col + 10, start_col + 14, COLUMN_MAPS["2"]),
+            ):
+                if header_col > max_columns:
+                    continue
+                cell_value = sheet.cell(row=2, column=header_col).value
+                if cell_value and "КМБО" in str(cell_value):
+                    group_name = str(cell_value).strip()
+                    if group_name not in results:
+                        results[group_name] = ScheduleResult(group_name=group_name)
+                    self._process_legacy_block(
+                        sheet, first_col, last_col, results[group_name], column_map
+                    )
+
+    def _process_legacy_block(self, sheet, start_col, end_col, result, column_map):
+        last_teacher = None
+        for row in range(4, sheet.max_row + 1):
+            weekday_num = (row - 4) // 14
+            if weekday_num >= len(WEEKDAYS):
+                continue
+            weekday = WEEKDAYS[weekday_num]
+            lesson_num = str(((row - 4) % 14) // 2 + 1)
+            first_week = 1 if row % 2 == 0 else 2
+            week_numbers = range(first_week, self.total_weeks + 1, 2)
+
+            lesson_data = LessonData()
+            for col_idx, col in enumerate(range(start_col, end_col + 1)):
+                cell_value = sheet.cell(row=row, column=col).value
+                if not cell_value or col_idx not in column_map:
+                    continue
+                field = column_map[col_idx]
+                if field == "title":
+                    lesson_data.subject = str(cell_value)
+                elif field == "fio":
+                    lesson_data.teacher = str(cell_value)
+                elif field == "lesson_type":
+                    for type_prefix, type_id in settings.LESSON_TYPES.items():
+                        if str(cell_value).strip() == type_prefix:
+                            lesson_data.lesson_type = type_prefix
+                            lesson_data.lesson_type_id = type_id
+                            break
+                elif field == "room":
+                    parts = (
+                        str(cell_value)
+                        .replace("ауд. ", "")
+                        .replace("комп. ", "")
+                        .split()
+                    )
+                    lesson_data.room = parts[0] if parts else ""
+                    lesson_data.campus = (
+                        parts[1].replace("(", "").replace(")", "")
+                        if len(parts) > 1
+                        else ""
+                    )
+
+            if len(lesson_data.subject) < 3:
+                continue
+            if not lesson_data.teacher and lesson_data.subject and last_teacher:
+                lesson_data.teacher = last_teacher
+            elif lesson_data.teacher:
+                last_teacher = lesson_data.teacher
+
+            if any(getattr(lesson_data, a) for a in ["subject", "teacher", "room"]):
+                for week_number in week_numbers:
+                    self._add_lesson_to_schedule(
+                        result,
+                        1 << (week_number - 1),
+                        weekday,
+                        lesson_num,
+                        lesson_data.model_copy(),
+                    )
+
+
+def generate_workbook(groups_per_sheet: int, sheets: int, seed: int = 0) -> bytes:
+    """Генерирует файл расписания: по две группы на каждые 15 столбцов"""
+    rnd = random.Random(seed)
+    wb = Workbook(write_only=True)
+    group_counter = 0
+
+    for sheet_idx in range(sheets):
+        ws = wb.create_sheet(f"Лист {sheet_idx + 1}")
+        strides = (groups_per_sheet + 1) // 2
+        width = strides * 15
+
+        header = [None] * width
+        for stride in range(strides):
+            for col in (stride * 15 + 5, stride * 15 + 10):
+                if group_counter < (sheet_idx + 1) * groups_per_sheet:
+                    group_counter += 1
+                    header[col] = f"КМБО-{group_counter:02d}-24"
+
+        ws.append([None] * width)
+        ws.append(header)
+        ws.append(["Предмет", "Вид", "ФИО", "Ауд."] * (width // 4))
+
+        for _ in range(len(WEEKDAYS) * 14):
+            row = [None] * width
+            for stride in range(strides):
+                for first in (stride * 15 + 5, stride * 15 + 10):
+                    if rnd.random() < 0.45:
+                        row[first] = rnd.choice(SUBJECTS)
+                        row[first + 1] = rnd.choice(list(settings.LESSON_TYPES))
+                        if rnd.random() < 0.7:
+                            row[first + 2] = rnd.choice(TEACHERS)
+                        row[first + 3] = rnd.choice(ROOMS)
+            ws.append(row)
+
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def measure(converter, file_data: bytes):
+    # Время и память измеряются отдельными запусками: tracemalloc замедляет код
+    started = time.perf_counter()
+    results = converter.convert_all(file_data)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    converter.convert_all(file_data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return results, elapsed, peak / 1024 / 1024
+
+
+def dump(results: Dict[str, ScheduleResult]) -> str:
+    # Сравнивается и порядок ключей, от него зависит сохраняемый JSON
+    return json.dumps({name: result.model_dump() for name, result in results.items()})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--groups", type=int, default=60, help="групп на листе")
+    parser.add_argument("--sheets", type=int, default=10)
+    args = parser.parse_args()
+
+    file_data = generate_workbook(args.groups, args.sheets)
+
+    legacy, legacy_time, legacy_peak = measure(LegacyExcelConverter(), file_data)
+    streaming, streaming_time, streaming_peak = measure(ExcelConverter(), file_data)
+
+    print(f"Файл: {len(file_data) / 1024:.0f} КБ, групп: {len(streaming)}")
+    print(f"sheet.cell, полный режим: {legacy_time:.2f} c, {legacy_peak:.1f} МБ")
+    print(f"read_only, один проход:   {streaming_time:.2f} c, {streaming_peak:.1f} МБ")
+    print(f"Ускорение:                x{legacy_time / streaming_time:.1f}")
+    print(f"Результаты совпадают:     {dump(legacy) == dump(streaming)}")
+
+
+if __name__ == "__main__":
+    main()
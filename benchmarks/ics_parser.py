@@ -0,0 +1,296 @@
+"""
+Сравнение однопроходного разбора ICS с прежним разбором через icalendar
+и dateutil.rrule, с проверкой совпадения результатов на эталонных файлах.
+
+Файлы генерируются синтетически: часовой пояс в DTSTART/EXDATE, RRULE
+с INTERVAL и UNTIL, исключенные даты, экранированный и перенесенный текст,
+вложенные VALARM, события-метки недель.
+
+Эталонные файлы лежат в benchmarks/fixtures/ics: calendar_N.ics
+(generate_calendar(40, N)) и calendar_N.json - standardized_content
+в прежнем формате по неделям, полученный исходным конвертером ICSConverter
+на icalendar до перехода на однопроходный разбор. Результат сверяется
+по занятиям каждой недели.
+
+Запуск:
+    python -m benchmarks.ics_parser --events 2000
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from dateutil import rrule as dateutil_rrule
+from icalendar import Calendar
+
+from core.schemas.schedule import LessonData, ScheduleResult
+from core.services.converters.ics_converter import ICSConverter
+from core.utils.maps import WEEKDAYS
+from core.utils.schedule_content import LESSON_FIELDS, mask_to_weeks
+
+FIXTURES_PATH = Path(__file__).parent / "fixtures" / "ics"
+
+SUBJECTS = [f"Дисциплина {i}" for i in range(40)] + ["Физика, часть 1; основы"]
+TEACHERS = [f"Преподавателев Преподаватель{i} Преподавателевич" for i in range(30)]
+ROOMS = ["А-101 (В-78)", "Б-204 (В-86)", "305", "Г-1 (С-20) Г-2 (С-20)"]
+TYPES = ["ЛК", "ПР", "ЛАБ"]
+PAIR_TIMES = ["0900", "1040", "1240", "1420", "1620", "1800", "1940"]
+SEMESTER_START = datetime(2025, 9, 1)
+
+
+class LegacyICSConverter(ICSConverter):
+    """Прежний разбор: дерево icalendar, два обхода и dateutil.rrule"""
+
+    def convert(self, file_data: bytes) -> ScheduleResult:
+        cal = Calendar.from_ical(file_data)
+        group_name = str(cal.get("X-WR-CALNAME"))
+        event_dates = []
+        semester_events = []
+        result = ScheduleResult(group_name=group_name)
+
+        for component in cal.walk():
+            if component.name == "VEVENT":
+                start_date = None
+                if component.get("dtstart"):
+                    start_date = component.get("dtstart").dt
+                summary = str(component.get("summary", ""))
+                if isinstance(start_date, datetime):
+                    event_dates.append(start_date)
+                if "неделя" in summary:
+                    try:
+                        semester_events.append((start_date, int(summary.split()[0])))
+                    except (ValueError, IndexError):
+                        pass
+
+        if not event_dates:
+            return ScheduleResult()
+
+        earliest_date = min(event_dates)
+        self.start_of_semester = earliest_date - timedelta(days=earliest_date.weekday())
+
+        for component in cal.walk():
+            if component.name == "VEVENT":
+                self._process_legacy_event(component, result)
+
+        return result
+
+    def _process_legacy_event(self, component, result: ScheduleResult):
+        start_date = component.get("dtstart").dt
+        if not isinstance(start_date, datetime):
+            return
+
+        summary = str(component.get("summary", ""))
+        if "неделя" in summary and len(summary.split()) <= 2:
+            return
+
+        subject, lesson_type, lesson_type_id = self._extract_subject_type(summary)
+        room, campus = self._extract_room_campus(str(component.get("location", "")))
+        teacher = self._extract_teacher(str(component.get("description", "")))
+        weekday = WEEKDAYS[start_date.weekday()]
+        lesson_num = str(self._get_lesson_number(start_date))
+        if lesson_num == "0":
+            return
+
+        for occurrence in self._get_legacy_occurrences(component):
+            week_number = self._get_week_number(occurrence)
+            if week_number < 1 or week_number > self.total_weeks:
+                continue
+            self._add_lesson_to_schedule(
+                result,
+                1 << (week_number - 1),
+                weekday,
+                lesson_num,
+                LessonData(
+                    subject=subject,
+                    teacher=teacher,
+                    room=room,
+                    campus=campus,
+                    lesson_type=lesson_type,
+                    lesson_type_id=lesson_type_id,
+                ),
+            )
+
+    def _get_legacy_occurrences(self, component) -> List[datetime]:
+        start_date = component.get("dtstart").dt
+        rrule_dict = component.get("RRULE", {})
+        if not rrule_dict:
+            return [start_date]
+
+        exdates = []
+        if "EXDATE" in component:
+            for exdate in component.get("EXDATE", []).dts:
+                if hasattr(exdate, "dt"):
+                    exdates.append(exdate.dt)
+
+        freq = rrule_dict.get("FREQ", ["WEEKLY"])[0]
+        rule_params = {
+            "freq": self.freq_map.get(freq, dateutil_rrule.WEEKLY),
+            "dtstart": start_date,
+            "interval": int(rrule_dict.get("INTERVAL", [1])[0]),
+        }
+        if "UNTIL" in rrule_dict:
+            rule_params["until"] = rrule_dict.get("UNTIL")[0]
+        else:
+            rule_params["until"] = self.start_of_semester + timedelta(days=18 * 7)
+
+        return [
+            date for date in dateutil_rrule.rrule(**rule_params) if date not in exdates
+        ]
+
+
+def fold(line: str) -> str:
+    """Переносит строку по 60 символов, как это делают генераторы ICS"""
+    chunks = [line[i : i + 60] for i in range(0, len(line), 60)]
+    return "\r\n ".join(chunks)
+
+
+def escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def generate_calendar(events: int, seed: int = 0) -> bytes:
+    """Генерирует ICS-файл группы с events повторяющимися занятиями"""
+    rnd = random.Random(seed)
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//benchmark//RU",
+        f"X-WR-CALNAME:{escape('КМБО-01-24')}",
+    ]
+
+    for week in range(1, 19):
+        day = SEMESTER_START + timedelta(weeks=week - 1)
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:week-{week}",
+            f"DTSTART;VALUE=DATE:{day:%Y%m%d}",
+            f"SUMMARY:{week} неделя",
+            "END:VEVENT",
+        ]
+
+    for index in range(events):
+        start = SEMESTER_START + timedelta(days=rnd.randrange(14) if index else 0)
+        pair_time = rnd.choice(PAIR_TIMES)
+        dtstart = f"{start:%Y%m%d}T{pair_time}00"
+        interval = rnd.choice([1, 2, 2])
+        until = SEMESTER_START + timedelta(weeks=rnd.choice([8, 12, 18, 20]))
+
+        if rnd.random() < 0.7:
+            teachers = "Преподаватель: " + rnd.choice(TEACHERS)
+        else:
+            teachers = "Преподаватели:\n" + "\n".join(rnd.sample(TEACHERS, 2))
+        description = f"{teachers}\n\nГруппы: КМБО-01-24"
+
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:lesson-{index}",
+            f"DTSTART;TZID=Europe/Moscow:{dtstart}",
+            f"RRULE:FREQ=WEEKLY;INTERVAL={interval};UNTIL={until:%Y%m%dT%H%M%S}Z",
+            fold("SUMMARY:" + escape(f"{rnd.choice(TYPES)} {rnd.choice(SUBJECTS)}")),
+            fold("DESCRIPTION:" + escape(description)),
+            fold("LOCATION:" + escape(rnd.choice(ROOMS))),
+        ]
+
+        if rnd.random() < 0.5:
+            excluded = [
+                start + timedelta(weeks=interval * rnd.randrange(1, 8))
+                for _ in range(rnd.randrange(1, 4))
+            ]
+            lines.append(
+                "EXDATE;TZID=Europe/Moscow:"
+                + ",".join(f"{d:%Y%m%d}T{pair_time}00" for d in excluded)
+            )
+
+        if rnd.random() < 0.2:
+            lines += [
+                "BEGIN:VALARM",
+                "ACTION:DISPLAY",
+                "DESCRIPTION:Преподаватель: Не Тот Преподаватель",
+                "TRIGGER:-PT15M",
+                "END:VALARM",
+            ]
+
+        lines.append("END:VEVENT")
+
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(lines) + "\r\n").encode("utf-8")
+
+
+def measure(converter_cls, file_data: bytes):
+    started = time.perf_counter()
+    result = converter_cls().convert(file_data)
+    return result, time.perf_counter() - started
+
+
+def dump(result: ScheduleResult) -> str:
+    return json.dumps(result.model_dump(), ensure_ascii=False)
+
+
+def week_lessons(result: ScheduleResult) -> Set[Tuple]:
+    """Занятия расписания по неделям: (неделя, день, пара, поля занятия)"""
+    return {
+        (week, lesson.day, lesson.pair)
+        + tuple(getattr(lesson, field) for field in LESSON_FIELDS)
+        for lesson in result.lessons
+        for week in mask_to_weeks(lesson.weeks)
+    }
+
+
+def expected_week_lessons(week_schedules: Dict[str, dict]) -> Set[Tuple]:
+    """Занятия из standardized_content группы в прежнем формате по неделям"""
+    return {
+        (int(week), day, pair)
+        + tuple(lesson_data.get(field) for field in LESSON_FIELDS)
+        for week, week_data in week_schedules.items()
+        for day, pairs in week_data["weekday_schedules"].items()
+        for pair, lesson_data in pairs.items()
+    }
+
+
+def check_fixtures() -> List[str]:
+    """Эталонные файлы, результат разбора которых расходится с эталоном"""
+    mismatches = []
+    for ics_path in sorted(FIXTURES_PATH.glob("*.ics")):
+        expected = json.loads(ics_path.with_suffix(".json").read_text("utf-8"))
+        result = ICSConverter().convert(ics_path.read_bytes())
+        if list(expected) != [result.group_name] or expected_week_lessons(
+            expected[result.group_name]
+        ) != week_lessons(result):
+            mismatches.append(ics_path.name)
+    return mismatches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=2000)
+    args = parser.parse_args()
+
+    fixtures = len(list(FIXTURES_PATH.glob("*.ics")))
+    mismatches = check_fixtures()
+
+    file_data = generate_calendar(args.events)
+    legacy, legacy_time = measure(LegacyICSConverter, file_data)
+    fast, fast_time = measure(ICSConverter, file_data)
+
+    print(f"Файл: {len(file_data) / 1024:.0f} КБ, событий: {args.events}")
+    print(f"icalendar + rrule:   {legacy_time:.2f} c")
+    print(f"однопроходный:       {fast_time:.2f} c")
+    print(f"Ускорение:           x{legacy_time / fast_time:.1f}")
+    print(f"Совпадает с icalendar: {dump(legacy) == dump(fast)}")
+    print(
+        f"Эталонные файлы:     {fixtures - len(mismatches)} из {fixtures}"
+        + (f", расхождения: {mismatches}" if mismatches else "")
+    )
+
+
+if __name__ == "__main__":
+    main()
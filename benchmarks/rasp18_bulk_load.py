@@ -0,0 +1,145 @@
+"""
+Сравнение загрузки 18-недельного расписания через ORM (add_all + flush)
+и через COPY с заранее зарезервированными ID.
+
+Запуск (используется БД из .env, все изменения откатываются):
+    python -m benchmarks.rasp18_bulk_load --lessons 100000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Dict, List
+
+from core.db.models.schedule_models import (
+    ScRasp18,
+    ScRasp18Days,
+    ScRasp18Groups,
+    ScRasp18Preps,
+    ScRasp18Rooms,
+)
+from core.repositories.schedule_repository import ScheduleRepository
+from core.utils.date_utils import generate_semester_days, get_pair_time
+from core.utils.db_utils import (
+    get_or_create_discs,
+    get_or_create_groups,
+    get_or_create_preps,
+)
+
+BENCH_SEMCODE = 19991
+
+
+def generate_lessons(
+    count: int, day_ids: List[int], group_ids: List[int], disc_ids, prep_ids
+) -> List[Dict[str, Any]]:
+    rnd = random.Random(count)
+    lessons = []
+    for _ in range(count):
+        pair = rnd.randint(1, 7)
+        timestart, timeend = get_pair_time(pair)
+        lessons.append(
+            {
+                "semcode": BENCH_SEMCODE,
+                "day_id": rnd.choice(day_ids),
+                "pair": pair,
+                "kind": 0,
+                "worktype": rnd.choice([0, 1, 2]),
+                "disc_id": rnd.choice(disc_ids),
+                "timestart": timestart,
+                "timeend": timeend,
+                "groups": set(rnd.sample(group_ids, rnd.randint(1, 3))),
+                "rooms": {f"А-{rnd.randint(1, 400)}"},
+                "preps": set(rnd.sample(prep_ids, rnd.randint(1, 2))),
+            }
+        )
+    return lessons
+
+
+async def load_with_orm(repo: ScheduleRepository, lessons: List[Dict[str, Any]]):
+    fields = ("semcode", "day_id", "pair", "kind", "worktype", "disc_id")
+    entries = [
+        ScRasp18(
+            **{field: lesson[field] for field in fields},
+            timestart=lesson["timestart"],
+            timeend=lesson["timeend"],
+        )
+        for lesson in lessons
+    ]
+    await repo.create_18week_schedule_entries(entries)
+
+    relations = []
+    for entry, lesson in zip(entries, lessons):
+        relations.extend(
+            ScRasp18Groups(rasp18_id=entry.id, group_id=group_id)
+            for group_id in lesson["groups"]
+        )
+        relations.extend(
+            ScRasp18Rooms(rasp18_id=entry.id, room=room) for room in lesson["rooms"]
+        )
+        relations.extend(
+            ScRasp18Preps(rasp18_id=entry.id, prep_id=prep_id)
+            for prep_id in lesson["preps"]
+        )
+    await repo.create_18week_relations(relations)
+
+
+async def load_with_copy(repo: ScheduleRepository, lessons: List[Dict[str, Any]]):
+    await repo.bulk_create_18week_schedule(lessons)
+
+
+async def prepare_references(session, repo: ScheduleRepository):
+    await repo.create_entities(
+        [ScRasp18Days(**day) for day in generate_semester_days(BENCH_SEMCODE)]
+    )
+    days = await repo.get_semester_days(BENCH_SEMCODE)
+
+    groups = await get_or_create_groups(session, [f"BENCH-{i}" for i in range(300)])
+    discs = await get_or_create_discs(session, [f"BENCH-{i}" for i in range(1500)])
+    preps = await get_or_create_preps(session, [f"BENCH-{i}" for i in range(1000)])
+
+    return (
+        [day.id for day in days],
+        list(groups.values()),
+        list(discs.values()),
+        list(preps.values()),
+    )
+
+
+async def measure(session_factory, lessons_count: int, loader) -> float:
+    async with session_factory() as session:
+        repo = ScheduleRepository(session)
+        try:
+            references = await prepare_references(session, repo)
+            lessons = generate_lessons(lessons_count, *references)
+
+            started = time.perf_counter()
+            await loader(repo, lessons)
+            await session.flush()
+            return time.perf_counter() - started
+        finally:
+            await session.rollback()
+
+
+async def run(session_factory, lessons_count: int) -> None:
+    orm_time = await measure(session_factory, lessons_count, load_with_orm)
+    copy_time = await measure(session_factory, lessons_count, load_with_copy)
+
+    print(f"Занятий: {lessons_count}")
+    print(f"ORM (add_all + flush): {orm_time:.2f} c")
+    print(f"COPY:                  {copy_time:.2f} c")
+    print(f"Ускорение:             x{orm_time / copy_time:.1f}")
+
+
+def main() -> None:
+    from core.db.session import Session
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lessons", type=int, default=100_000)
+    args = parser.parse_args()
+
+    asyncio.run(run(Session, args.lessons))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Проверка границ пересборки 18-недельного расписания из 7-дневного
+(ScheduleRepository.regenerate_18week_from_7day).
+
+В семестре заводятся 7-дневное расписание двух версий и записи sc_rasp18:
+устаревшая запись слота версии, занятие группы версии, которого больше нет
+в 7-дневном расписании, занятие со смененной дисциплиной, занятие другой
+группы в слоте версии, перенесенная пара и занятие другой версии.
+Пересборка версии должна удалить записи групп версии, кроме перенесенной
+пары, не трогать записи других групп и не создавать перенесенную пару
+в исходном слоте заново.
+
+Запуск (используется БД из .env, все изменения откатываются):
+    python -m benchmarks.rasp18_regenerate
+"""
+
+import asyncio
+from typing import Dict, List
+
+from sqlalchemy import select
+
+from core.db.models.schedule_models import (
+    ScRasp18,
+    ScRasp18Days,
+    ScRasp18Groups,
+    ScRasp7,
+    ScRasp7Groups,
+)
+from core.repositories.schedule_repository import ScheduleRepository
+from core.utils.date_utils import generate_semester_days, get_pair_time
+from core.utils.db_utils import get_or_create_discs, get_or_create_groups
+
+BENCH_SEMCODE = 19992
+
+
+async def add_rasp7(
+    repo: ScheduleRepository,
+    version: int,
+    disc_id: int,
+    day: ScRasp18Days,
+    pair: int,
+    weeks: List[int],
+    group_ids: List[int],
+) -> None:
+    rasp7 = ScRasp7(
+        semcode=BENCH_SEMCODE,
+        version=version,
+        disc_id=disc_id,
+        weekday=day.weekday,
+        pair=pair,
+        weeksarray=weeks,
+        weekstext=",".join(map(str, weeks)),
+        worktype=0,
+    )
+    await repo.create_entities([rasp7])
+    await repo.create_entities(
+        [ScRasp7Groups(rasp7_id=rasp7.id, group_id=group_id) for group_id in group_ids]
+    )
+
+
+async def add_rasp18(
+    repo: ScheduleRepository,
+    disc_id: int,
+    day: ScRasp18Days,
+    pair: int,
+    group_ids: List[int],
+) -> int:
+    timestart, timeend = get_pair_time(pair)
+    lesson = await repo.create_lesson(
+        {
+            "semcode": BENCH_SEMCODE,
+            "day_id": day.id,
+            "pair": pair,
+            "kind": 0,
+            "worktype": 0,
+            "disc_id": disc_id,
+            "timestart": timestart,
+            "timeend": timeend,
+        }
+    )
+    await repo.create_lesson_relations(lesson.id, group_ids=group_ids)
+    return lesson.id
+
+
+async def lesson_groups(session, lesson_ids: List[int]) -> Dict[int, set]:
+    rows = await session.execute(
+        select(ScRasp18Groups.rasp18_id, ScRasp18Groups.group_id).where(
+            ScRasp18Groups.rasp18_id.in_(lesson_ids)
+        )
+    )
+    groups: Dict[int, set] = {}
+    for rasp18_id, group_id in rows:
+        groups.setdefault(rasp18_id, set()).add(group_id)
+    return groups
+
+
+async def run(session_factory) -> None:
+    async with session_factory() as session:
+        repo = ScheduleRepository(session)
+        try:
+            await repo.create_entities(
+                [ScRasp18Days(**day) for day in generate_semester_days(BENCH_SEMCODE)]
+            )
+            days = await repo.get_semester_days(BENCH_SEMCODE)
+            week_1 = [day for day in days if day.week == 1]
+            day_1 = week_1[0]
+            day_1_week_2 = next(
+                day for day in days if day.week == 2 and day.weekday == day_1.weekday
+            )
+            day_2 = week_1[1]
+
+            groups = await get_or_create_groups(
+                session, [f"BENCH-{name}" for name in "ABCD"]
+            )
+            group_a, group_b, group_c, group_d = (
+                groups[f"BENCH-{name}"] for name in "ABCD"
+            )
+            discs = await get_or_create_discs(session, ["BENCH-X", "BENCH-Y"])
+            disc_x, disc_y = discs["BENCH-X"], discs["BENCH-Y"]
+
+            await add_rasp7(repo, 1, disc_x, day_1, 1, [1, 2], [group_a, group_b])
+            await add_rasp7(repo, 2, disc_y, day_2, 2, [1], [group_d])
+
+            removed = {
+                "устаревшая запись слота версии": await add_rasp18(
+                    repo, disc_x, day_1, 1, [group_a]
+                ),
+                "занятие, удаленное из 7-дневного": await add_rasp18(
+                    repo, disc_x, day_1, 3, [group_a]
+                ),
+                "смененная дисциплина слота": await add_rasp18(
+                    repo, disc_y, day_1_week_2, 1, [group_b]
+                ),
+            }
+            kept = {
+                "другая группа в слоте версии": await add_rasp18(
+                    repo, disc_x, day_1, 1, [group_c]
+                ),
+                "занятие другой версии": await add_rasp18(
+                    repo, disc_y, day_2, 2, [group_d]
+                ),
+            }
+            moved = await add_rasp18(repo, disc_x, day_1_week_2, 5, [group_a, group_b])
+            await repo.create_lesson_move(
+                {
+                    "rasp18_dest_id": moved,
+                    "src_day_id": day_1_week_2.id,
+                    "src_pair": 1,
+                    "reason": "",
+                    "comment": "",
+                }
+            )
+            kept["перенесенная пара"] = moved
+
+            result = await repo.regenerate_18week_from_7day(
+                BENCH_SEMCODE, 1, commit=False
+            )
+
+            lessons = (
+                await session.execute(
+                    select(ScRasp18.id, ScRasp18.day_id, ScRasp18.pair).where(
+                        ScRasp18.semcode == BENCH_SEMCODE
+                    )
+                )
+            ).all()
+            lesson_ids = {lesson.id for lesson in lessons}
+            created = [lesson for lesson in lessons if lesson.id > moved]
+            created_groups = await lesson_groups(
+                session, [lesson.id for lesson in created]
+            )
+
+            print(f"Создано: {result['inserted']}, удалено: {result['deleted']}")
+            for name, lesson_id in removed.items():
+                print(f"Удалено ({name}): {lesson_id not in lesson_ids}")
+            for name, lesson_id in kept.items():
+                print(f"Сохранено ({name}): {lesson_id in lesson_ids}")
+            print(
+                "Созданы только слоты версии: "
+                f"{[(row.day_id, row.pair) for row in created] == [(day_1.id, 1)]}"
+            )
+            print(
+                "Группы созданной записи:     "
+                f"{list(created_groups.values()) == [{group_a, group_b}]}"
+            )
+
+            # С фильтром по одной группе общий с группой B слот пересобирается
+            # по всем группам, записи других групп и перенесенная пара остаются
+            await repo.regenerate_18week_from_7day(
+                BENCH_SEMCODE, 1, [group_a], commit=False
+            )
+            filtered_groups = await lesson_groups(
+                session,
+                (
+                    await session.scalars(
+                        select(ScRasp18.id).where(ScRasp18.semcode == BENCH_SEMCODE)
+                    )
+                ).all(),
+            )
+            expected = [[group_a, group_b], [group_a, group_b], [group_c], [group_d]]
+            actual = [sorted(groups) for groups in filtered_groups.values()]
+            print(
+                "С фильтром по группе:        "
+                f"{sorted(actual) == sorted(map(sorted, expected))}"
+            )
+        finally:
+            await session.rollback()
+
+
+def main() -> None:
+    from core.db.session import Session
+
+    asyncio.run(run(Session))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Проверка повторного пакетного импорта расписания
+(ScheduleProcessor.import_schedule_batched).
+
+Версия 1 импортируется пакетами по одной группе: у группы A математика на все
+недели и физика на первые две недели, у группы B химия. Затем та же версия
+импортируется повторно без физики группы A. Записи sc_rasp18 физики должны
+быть удалены, математика и занятия группы B - сохранены.
+
+Пакеты фиксируются отдельными транзакциями, поэтому созданные записи семестра,
+групп и дисциплин удаляются в конце проверки.
+
+Запуск (используется БД из .env):
+    python -m benchmarks.schedule_batched_import
+"""
+
+import asyncio
+from typing import Dict, List
+
+from sqlalchemy import delete, func, select
+
+from core.db.models.schedule_models import (
+    ScDisc,
+    ScGroup,
+    ScRasp18,
+    ScRasp18Days,
+    ScRasp18Groups,
+    ScRasp7,
+)
+from core.repositories.schedule_repository import ScheduleRepository
+from core.schemas.schedule import ScheduleLesson, ScheduleResult
+from core.services.schedule_processor import ScheduleProcessor
+
+BENCH_SEMCODE = 19993
+GROUPS = ["BENCH-BATCH-A", "BENCH-BATCH-B"]
+DISCS = ["BENCH-MATH", "BENCH-PHYS", "BENCH-CHEM"]
+ALL_WEEKS = (1 << 16) - 1
+
+
+def schedule(group_name: str, lessons: List[tuple]) -> ScheduleResult:
+    return ScheduleResult(
+        group_name=group_name,
+        lessons=[
+            ScheduleLesson(day=day, pair=str(pair), subject=subject, weeks=weeks)
+            for subject, day, pair, weeks in lessons
+        ],
+    )
+
+
+async def count_lessons(session) -> Dict[tuple, int]:
+    rows = await session.execute(
+        select(ScGroup.title, ScDisc.title, func.count())
+        .select_from(ScRasp18)
+        .join(ScRasp18Groups, ScRasp18Groups.rasp18_id == ScRasp18.id)
+        .join(ScGroup, ScGroup.id == ScRasp18Groups.group_id)
+        .join(ScDisc, ScDisc.id == ScRasp18.disc_id)
+        .where(ScRasp18.semcode == BENCH_SEMCODE)
+        .group_by(ScGroup.title, ScDisc.title)
+    )
+    return {(group, disc): count for group, disc, count in rows}
+
+
+async def run(session_factory) -> None:
+    math = ("BENCH-MATH", "Понедельник", 1, ALL_WEEKS)
+    phys = ("BENCH-PHYS", "Вторник", 2, 0b11)
+    chem = ("BENCH-CHEM", "Среда", 3, ALL_WEEKS)
+    version_1 = {
+        GROUPS[0]: schedule(GROUPS[0], [math, phys]),
+        GROUPS[1]: schedule(GROUPS[1], [chem]),
+    }
+    version_2 = {
+        GROUPS[0]: schedule(GROUPS[0], [math]),
+        GROUPS[1]: schedule(GROUPS[1], [chem]),
+    }
+
+    async with session_factory() as session:
+        processor = ScheduleProcessor(ScheduleRepository(session), session)
+        try:
+            await processor.import_schedule_batched(
+                BENCH_SEMCODE, 1, version_1, batch_size=1
+            )
+            before = await count_lessons(session)
+
+            result = await processor.import_schedule_batched(
+                BENCH_SEMCODE, 1, version_2, batch_size=1
+            )
+            after = await count_lessons(session)
+
+            print(
+                f"Создано: {result.inserted_lessons}, удалено: {result.deleted_lessons}"
+            )
+            print(f"Физика после импорта v1:  {before.get((GROUPS[0], phys[0])) == 2}")
+            print(f"Физика удалена:           {(GROUPS[0], phys[0]) not in after}")
+            print(
+                "Математика сохранена:     "
+                f"{after.get((GROUPS[0], math[0])) == before.get((GROUPS[0], math[0]))}"
+            )
+            print(
+                "Группа B сохранена:       "
+                f"{after.get((GROUPS[1], chem[0])) == before.get((GROUPS[1], chem[0]))}"
+            )
+        finally:
+            await session.rollback()
+            await session.execute(
+                delete(ScRasp18Days).where(ScRasp18Days.semcode == BENCH_SEMCODE)
+            )
+            await session.execute(
+                delete(ScRasp7).where(ScRasp7.semcode == BENCH_SEMCODE)
+            )
+            await session.execute(delete(ScGroup).where(ScGroup.title.in_(GROUPS)))
+            await session.execute(delete(ScDisc).where(ScDisc.title.in_(DISCS)))
+            await session.commit()
+
+
+def main() -> None:
+    from core.db.session import Session
+
+    asyncio.run(run(Session))
+
+
+if __name__ == "__main__":
+    main()
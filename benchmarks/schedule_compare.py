@@ -0,0 +1,339 @@
+"""
+Сравнение индексированного движка ScheduleCompareService с прежним
+сравнением по неделям (линейный поиск записей и повторный разбор
+"Пара N" для каждой пары каждой недели).
+
+Генерируется пара файлов на заданное число групп: во второй версии часть
+занятий изменена, удалена, добавлена или перенесена на другие недели.
+Результаты сверяются с точностью до порядка записей и до дублей, которые
+прежний движок создавал для второй четности недель. Режим summary
+сверяется с количеством записей и сводкой полного сравнения. Сравнение
+по деревьям отпечатков (строятся при загрузке файла и в замер не входят)
+должно совпадать с индексированным движком без деревьев. Оно пропускает
+только неизмененные группы, поэтому отдельно замеряется пара файлов,
+в которой изменена лишь малая доля групп (--few-changed): время сравнения
+по деревьям зависит от числа измененных слотов, а не от размера файла.
+
+Запуск:
+    python -m benchmarks.schedule_compare --groups 300 --few-changed 0.01
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Dict
+
+from core.schemas.schedule import (
+    AddedLessonModel,
+    GroupComparisonModel,
+    LessonChangeModel,
+    LessonData,
+    LessonDetailsCompareModel,
+    ModifiedLessonModel,
+    RemovedLessonModel,
+    ScheduleResult,
+)
+from core.services.schedule_compare import (
+    ScheduleCompareService,
+    build_fingerprint_tree,
+)
+from core.utils.maps import WEEKDAYS
+from core.utils.schedule_content import (
+    add_lesson,
+    mask_to_weeks,
+    schedule_to_content,
+    schedule_weeks_mask,
+    weeks_to_mask,
+)
+
+SUBJECTS = [f"Дисциплина {i}" for i in range(40)]
+TEACHERS = [f"Преподаватель {i} А.Б." for i in range(30)]
+ROOMS = ["А-101", "Б-204", "305", "Г-1"]
+CAMPUSES = ["В-78", "В-86", "С-20", ""]
+TYPES = ["ЛК", "ПР", "ЛАБ"]
+ODD_WEEKS = weeks_to_mask(range(1, 19, 2))
+EVEN_WEEKS = weeks_to_mask(range(2, 19, 2))
+
+
+class LegacyScheduleCompareService(ScheduleCompareService):
+    """Прежнее сравнение: обход по неделям и линейный поиск записей"""
+
+    def compare_group(self, schedule1, schedule2) -> GroupComparisonModel:
+        group_result = GroupComparisonModel()
+        weeks_mask1 = schedule_weeks_mask(schedule1)
+        weeks_mask2 = schedule_weeks_mask(schedule2)
+        all_weeks = set(mask_to_weeks(weeks_mask1 | weeks_mask2))
+        common_weeks = weeks_mask1 & weeks_mask2
+
+        week_days = []
+        for schedule in (schedule1, schedule2):
+            days = {}
+            for lesson in schedule.lessons:
+                for week in mask_to_weeks(lesson.weeks & common_weeks):
+                    days.setdefault(week, {}).setdefault(lesson.day, {})[
+                        lesson.pair
+                    ] = lesson
+            week_days.append(days)
+
+        tracking = {}
+        for week in mask_to_weeks(common_weeks):
+            self._compare_week(
+                group_result,
+                week_days[0].get(week, {}),
+                week_days[1].get(week, {}),
+                week,
+                tracking,
+            )
+
+        for kind in ("modified", "added", "removed"):
+            for item in getattr(group_result.details, kind):
+                key = (item.day, int(item.lesson.split()[1]))
+                if key in tracking:
+                    weeks = [w for w in sorted(all_weeks) if w % 2 == item.week % 2]
+                    item.weeks_comparison = self._weeks_comparison(
+                        kind, weeks, tracking[key]
+                    )
+
+        return group_result
+
+    def _compare_week(self, group_result, days1, days2, week, tracking):
+        for day in set(days1) | set(days2):
+            pairs1 = days1.get(day, {})
+            pairs2 = days2.get(day, {})
+            for pair in set(pairs1) | set(pairs2):
+                tracked = tracking.setdefault((day, int(pair)), {})
+                lesson1 = pairs1.get(pair)
+                lesson2 = pairs2.get(pair)
+                before = self._details(lesson1) if lesson1 else None
+                after = self._details(lesson2) if lesson2 else None
+                tracked[week] = (before, after)
+
+                if lesson1 is None or lesson2 is None:
+                    kind = "added" if lesson1 is None else "removed"
+                    existing = next(
+                        (
+                            item
+                            for item in getattr(group_result.details, kind)
+                            if item.day == day and f"Пара {pair}" in item.lesson
+                        ),
+                        None,
+                    )
+                    if existing and existing.week % 2 == week % 2:
+                        continue
+                    model = AddedLessonModel if lesson1 is None else RemovedLessonModel
+                    getattr(group_result.details, kind).append(
+                        model(
+                            day=day,
+                            lesson=f"Пара {pair} (неделя {week})",
+                            details=after or before,
+                            week=week,
+                        )
+                    )
+                    group_result.total += 1
+                    continue
+
+                changes = []
+                for field in ("subject", "teacher", "room", "campus", "lesson_type"):
+                    value1 = getattr(lesson1, field)
+                    value2 = getattr(lesson2, field)
+                    if value1 != value2:
+                        changes.append(
+                            LessonChangeModel(
+                                field=field, from_value=value1, to_value=value2
+                            )
+                        )
+                        if field != "lesson_type":
+                            current = getattr(group_result.summary, field)
+                            setattr(group_result.summary, field, current + 1)
+
+                if not changes:
+                    continue
+                existing = next(
+                    (
+                        item
+                        for item in group_result.details.modified
+                        if item.day == day and f"Пара {pair}" in item.lesson
+                    ),
+                    None,
+                )
+                if existing and existing.week % 2 == week % 2:
+                    continue
+                group_result.details.modified.append(
+                    ModifiedLessonModel(
+                        day=day,
+                        lesson=f"Пара {pair} (неделя {week})",
+                        changes=changes,
+                        before=before,
+                        after=after,
+                        week=week,
+                    )
+                )
+                group_result.total += 1
+
+    @staticmethod
+    def _details(lesson) -> LessonDetailsCompareModel:
+        return LessonDetailsCompareModel(
+            subject=lesson.subject,
+            teacher=lesson.teacher,
+            room=lesson.room,
+            campus=lesson.campus,
+            lesson_type=lesson.lesson_type,
+        )
+
+
+def generate_pair(groups: int, seed: int = 0, changed_share: float = 0.3):
+    """
+    Генерирует две версии standardized_content, отличия вносятся примерно
+    в долю changed_share групп
+    """
+    rnd = random.Random(seed)
+    first: Dict[str, dict] = {}
+    second: Dict[str, dict] = {}
+
+    def random_lesson() -> LessonData:
+        return LessonData(
+            subject=rnd.choice(SUBJECTS),
+            teacher=rnd.choice(TEACHERS),
+            room=rnd.choice(ROOMS),
+            campus=rnd.choice(CAMPUSES),
+            lesson_type=rnd.choice(TYPES),
+        )
+
+    for index in range(groups):
+        group = f"КМБО-{index:03d}-24"
+        schedule1 = ScheduleResult(group_name=group)
+        schedule2 = ScheduleResult(group_name=group)
+        changed = rnd.random() < changed_share
+
+        for day in WEEKDAYS[:6]:
+            for pair in range(1, 8):
+                for weeks in (ODD_WEEKS, EVEN_WEEKS):
+                    if rnd.random() > 0.45:
+                        continue
+                    lesson = random_lesson()
+                    add_lesson(schedule1, weeks, day, str(pair), lesson)
+
+                    roll = rnd.random() if changed else 1
+                    if roll < 0.05:
+                        continue  # занятие удалено
+                    if roll < 0.12:
+                        lesson = lesson.model_copy(update={"room": rnd.choice(ROOMS)})
+                    elif roll < 0.16:
+                        # занятие проводится не на всех неделях
+                        weeks &= ~weeks_to_mask([rnd.randrange(1, 19)])
+                    add_lesson(schedule2, weeks, day, str(pair), lesson)
+
+                if changed and rnd.random() < 0.03:
+                    add_lesson(schedule2, ODD_WEEKS, day, str(pair), random_lesson())
+
+        first[group] = schedule_to_content(schedule1)
+        second[group] = schedule_to_content(schedule2)
+
+    return first, second
+
+
+def normalize(result, dedupe: bool) -> str:
+    """Результат без учета порядка записей и дублей по четности недель"""
+    data = result.model_dump()
+    for group in data["groups"].values():
+        total = 0
+        for kind, items in group["details"].items():
+            if dedupe:
+                unique = {}
+                for item in sorted(items, key=lambda item: item["week"]):
+                    pair = item["lesson"].split(" (")[0]
+                    unique.setdefault((item["day"], pair, item["week"] % 2), item)
+                items = list(unique.values())
+            items.sort(key=lambda item: (item["day"], item["lesson"]))
+            group["details"][kind] = items
+            total += len(items)
+        if dedupe:
+            group["total"] = total
+    return json.dumps(data["groups"], sort_keys=True, ensure_ascii=False)
+
+
+def measure(compare, first, second):
+    started = time.perf_counter()
+    result = compare(first, second)
+    return result, time.perf_counter() - started
+
+
+def counts_from_full(result) -> Dict[str, dict]:
+    """Количество изменений по группам, полученное из полного сравнения"""
+    return {
+        group: {
+            "total": group_result.total,
+            "added": len(group_result.details.added),
+            "removed": len(group_result.details.removed),
+            "modified": len(group_result.details.modified),
+            "summary": group_result.summary.model_dump(),
+        }
+        for group, group_result in result.groups.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--groups", type=int, default=300)
+    parser.add_argument(
+        "--few-changed", type=float, default=0.01, help="доля измененных групп"
+    )
+    args = parser.parse_args()
+
+    first, second = generate_pair(args.groups)
+
+    service = ScheduleCompareService()
+    legacy, legacy_time = measure(
+        LegacyScheduleCompareService().compare_schedules, first, second
+    )
+    indexed, indexed_time = measure(service.compare_schedules, first, second)
+    summary, summary_time = measure(service.summarize_schedules, first, second)
+
+    trees = build_fingerprint_tree(first), build_fingerprint_tree(second)
+    tree_started = time.perf_counter()
+    by_tree = service.compare_schedules(first, second, *trees)
+    tree_time = time.perf_counter() - tree_started
+
+    changed = sum(1 for group in indexed.groups.values() if group.total)
+    print(f"Групп: {args.groups}, с изменениями: {changed}")
+    print(f"по неделям, линейный поиск: {legacy_time:.2f} c")
+    print(f"индексированный движок:     {indexed_time:.2f} c")
+    print(f"Ускорение:                  x{legacy_time / indexed_time:.1f}")
+    print(
+        "Результаты совпадают:       "
+        f"{normalize(legacy, dedupe=True) == normalize(indexed, dedupe=False)}"
+    )
+    print(f"режим summary:              {summary_time:.3f} c")
+    print(f"Ускорение summary:          x{indexed_time / summary_time:.1f}")
+    print(
+        "Количество совпадает:       "
+        f"{summary.model_dump()['groups'] == counts_from_full(indexed)}"
+    )
+    print(f"по дереву отпечатков:       {tree_time:.3f} c")
+    print(f"Ускорение по дереву:        x{indexed_time / tree_time:.1f}")
+    print(
+        "Результаты совпадают:       "
+        f"{by_tree.model_dump_json() == indexed.model_dump_json()}"
+    )
+
+    first, second = generate_pair(args.groups, changed_share=args.few_changed)
+    few_indexed, few_indexed_time = measure(service.compare_schedules, first, second)
+    trees = build_fingerprint_tree(first), build_fingerprint_tree(second)
+    tree_started = time.perf_counter()
+    few_by_tree = service.compare_schedules(first, second, *trees)
+    few_tree_time = time.perf_counter() - tree_started
+
+    few_changed = sum(1 for group in few_indexed.groups.values() if group.total)
+    print(f"Мало изменений, групп с изменениями: {few_changed}")
+    print(f"индексированный движок:     {few_indexed_time:.3f} c")
+    print(f"по дереву отпечатков:       {few_tree_time:.3f} c")
+    print(f"Ускорение по дереву:        x{few_indexed_time / few_tree_time:.1f}")
+    print(
+        "Результаты совпадают:       "
+        f"{few_by_tree.model_dump_json() == few_indexed.model_dump_json()}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
 from core.api.router.files.view import router as files_router
+from core.api.router.jobs.view import router as jobs_router
 from core.api.router.schedule.view import router as schedule_router
 from core.api.router.view import router as main_router
 
@@ -9,6 +10,7 @@ router = APIRouter()
 api_router = APIRouter(prefix="/api")
 api_router.include_router(files_router)
 api_router.include_router(schedule_router)
+api_router.include_router(jobs_router)
 
 router.include_router(api_router)
 router.include_router(main_router)
@@ -21,7 +21,7 @@ async def get_compare_service() -> ScheduleCompareService:
 async def get_schedule_service(
     db_session: AsyncSession = Depends(get_session),
 ) -> ScheduleService:
-    return ScheduleService(db=db_session)
+    return ScheduleService(db_session=db_session)
 
 
 async def get_schedule_downloader() -> ScheduleDownloader:
@@ -1,14 +1,28 @@
+import json
 from urllib.parse import quote
-from typing import List
+from typing import Iterator, List, Literal, Optional, Tuple, Union
 
 import httpx
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 
 from core.repositories.file_repository import FileRepository
+from core.repositories.job_repository import JobRepository
+from core.services.blob_storage import blob_storage
+from core.services.conversion_pool import (
+    ConversionPoolBusyError,
+    ConversionTimeoutError,
+)
 from core.services.schedule_compare import ScheduleCompareService
 from core.services.schedule_service import ScheduleService
-from core.schemas.schedule import ScheduleComparisonResultModel
+from core.db.models.schedule_files import ScheduleFile
+from core.schemas.schedule import (
+    ScheduleComparisonResultModel,
+    ScheduleComparisonSummaryModel,
+)
+from core.settings.app_config import settings
+from core.utils.upload_spool import UploadTooLargeError
 from core.schemas.api_responses import (
     FileResponseModel,
     FileListResponseModel,
@@ -21,6 +35,7 @@ from core.api.router.files.depends import (
     get_file_manager,
     get_schedule_service,
 )
+from core.api.router.jobs.depends import get_job_repository
 
 router = APIRouter(tags=["files"])
 
@@ -29,25 +44,75 @@ router = APIRouter(tags=["files"])
 async def add_file(
     file: UploadFile = File(...),
     is_official: bool = False,
+    background: bool = False,
     file_manager: FileRepository = Depends(get_file_manager),
     schedule_service: ScheduleService = Depends(get_schedule_service),
+    job_repository: JobRepository = Depends(get_job_repository),
 ) -> FileResponseModel:
     try:
         if not file.filename.endswith(".xlsx") and not file.filename.endswith(".ics"):
             raise HTTPException(status_code=400, detail="Wrong format")
+
+        if background:
+            # Конвертация и импорт выполняются воркером, файл сохраняется как есть
+            saved_file = await file_manager.save_raw_file(file)
+            # Для уже сконвертированного файла с тем же содержимым
+            # достаточно импорта
+            job = await job_repository.enqueue(
+                "import_file" if saved_file.group_count else "convert_file",
+                {
+                    "file_id": saved_file.id,
+                    "import": True,
+                    "semcode": 1,
+                    "version": 1,
+                    "is_official": is_official,
+                    "compare": settings.COMPARE_PRECOMPUTE_ON_UPLOAD,
+                },
+                max_attempts=settings.JOB_MAX_ATTEMPTS,
+            )
+
+            return FileResponseModel(
+                id=saved_file.id,
+                name=file.filename,
+                created_at=saved_file.created_at.isoformat(),
+                is_official=is_official,
+                job_id=job.id,
+            )
+
         saved_file = await file_manager.save_file(file)
-        await schedule_service.import_schedule_from_standardized_content(
-            1, 1, saved_file.standardized_content, is_official=is_official
+        import_result = (
+            await schedule_service.import_schedule_from_standardized_content(
+                1,
+                1,
+                file_manager.load_schedule_results(
+                    await file_manager.load_content(saved_file)
+                ),
+                is_official=is_official,
+                content_hash=saved_file.content_hash,
+                file_id=saved_file.id,
+            )
         )
 
         file_id = saved_file.id
 
+        if settings.COMPARE_PRECOMPUTE_ON_UPLOAD and not import_result.cache_hit:
+            await job_repository.enqueue("compare_files", {"file_id": file_id})
+
         return FileResponseModel(
             id=file_id,
             name=file.filename,
             created_at=saved_file.created_at.isoformat(),
             is_official=is_official,
+            cache_hit=import_result.cache_hit,
         )
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ConversionPoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ConversionTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -65,7 +130,7 @@ async def all_files(
                     id=file.id,
                     created_at=file.created_at.isoformat(),
                     group_count=file.group_count,
-                    group_names=list(file.standardized_content.keys()),
+                    group_names=file.group_names or [],
                 )
                 for file in files
             ]
@@ -91,8 +156,7 @@ async def download_file(
     file_id: int, file_manager: FileRepository = Depends(get_file_manager)
 ):
     try:
-        file_data = await file_manager.get_file(file_id)
-        await file_manager.delete_file(file_id)
+        file_data = await file_manager.get_file(file_id, with_data=True)
         if not file_data:
             raise HTTPException(status_code=404, detail="Файл не найден")
 
@@ -103,43 +167,158 @@ async def download_file(
         }
         media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
-        return Response(
-            content=file_data.file_data, headers=headers, media_type=media_type
-        )
+        file_path = file_manager.get_file_path(file_data)
+        if file_path:
+            # Данные в хранилище удаляются после отправки файла
+            blob_key = await file_manager.delete_file(file_id, release_blob=False)
+            return FileResponse(
+                file_path,
+                headers=headers,
+                media_type=media_type,
+                background=(
+                    BackgroundTask(blob_storage.delete, blob_key) if blob_key else None
+                ),
+            )
+
+        content = await file_manager.read_file_data(file_data)
+        await file_manager.delete_file(file_id)
+        return Response(content=content, headers=headers, media_type=media_type)
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/compare-files")
+async def _get_files_to_compare(
+    file_manager: FileRepository, file_id_1: int, file_id_2: int
+) -> Tuple[ScheduleFile, ScheduleFile]:
+    file_1 = await file_manager.get_file(file_id_1)
+    file_2 = await file_manager.get_file(file_id_2)
+
+    if not file_1 or not file_2:
+        raise HTTPException(status_code=404, detail="Файлы не найдены")
+
+    if not file_1.group_count or not file_2.group_count:
+        raise HTTPException(
+            status_code=400, detail="Файлы не содержат стандартизированных данных"
+        )
+
+    return file_1, file_2
+
+
+@router.get(
+    "/compare-files",
+    response_model=Union[ScheduleComparisonResultModel, ScheduleComparisonSummaryModel],
+)
 async def compare_files(
     file_id_1: int,
     file_id_2: int,
+    mode: Literal["full", "summary"] = "full",
+    groups: Optional[List[str]] = Query(None),
     file_manager: FileRepository = Depends(get_file_manager),
     compare_service: ScheduleCompareService = Depends(get_compare_service),
-) -> ScheduleComparisonResultModel:
+) -> Response:
+    """
+    Сравнение файлов. В режиме summary возвращается только количество
+    изменений по группам (ScheduleComparisonSummaryModel). При groups
+    сравниваются и загружаются из БД только указанные группы
+    """
     try:
-        file_1 = await file_manager.get_file(file_id_1)
-        file_2 = await file_manager.get_file(file_id_2)
+        if mode == "summary":
+            file_1, file_2 = await _get_files_to_compare(
+                file_manager, file_id_1, file_id_2
+            )
+            summary = compare_service.summarize_schedules(
+                *await file_manager.load_compare_contents(file_1, file_2, groups),
+                file_1.fingerprint_tree,
+                file_2.fingerprint_tree,
+            )
+            return Response(
+                content=summary.model_dump_json(), media_type="application/json"
+            )
 
-        if not file_1 or not file_2:
-            raise HTTPException(status_code=404, detail="Файлы не найдены")
+        # Сохраненный результат отдается как есть, без загрузки файлов.
+        # Кэшируется только сравнение всех групп
+        result_json = None
+        if groups is None:
+            result_json = await file_manager.get_cached_comparison(file_id_1, file_id_2)
 
-        if not file_1.standardized_content or not file_2.standardized_content:
-            raise HTTPException(
-                status_code=400, detail="Файлы не содержат стандартизированных данных"
+        if result_json is None:
+            file_1, file_2 = await _get_files_to_compare(
+                file_manager, file_id_1, file_id_2
             )
+            result = await compare_service.compare_schedules_parallel(
+                *await file_manager.load_compare_contents(file_1, file_2, groups),
+                file_1.fingerprint_tree,
+                file_2.fingerprint_tree,
+            )
+            result_json = result.model_dump_json().encode()
+            if groups is None:
+                await file_manager.save_cached_comparison(
+                    file_id_1, file_id_2, result_json
+                )
 
-        result = compare_service.compare_schedules(
-            file_1.standardized_content, file_2.standardized_content
-        )
-
-        return result
+        return Response(content=result_json, media_type="application/json")
 
+    except HTTPException:
+        raise
+    except ConversionPoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ConversionTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+def _comparison_line(group: str, group_json: str) -> bytes:
+    """Строка NDJSON с результатом сравнения одной группы"""
+    group_name = json.dumps(group, ensure_ascii=False)
+    return f'{{"group":{group_name},"result":{group_json}}}\n'.encode()
+
+
+@router.get("/compare-files/stream")
+async def compare_files_stream(
+    file_id_1: int,
+    file_id_2: int,
+    groups: Optional[List[str]] = Query(None),
+    file_manager: FileRepository = Depends(get_file_manager),
+    compare_service: ScheduleCompareService = Depends(get_compare_service),
+) -> StreamingResponse:
+    """
+    Сравнение файлов в формате NDJSON: строка {"group": ..., "result": ...}
+    с GroupComparisonModel выдается, как только сравнена очередная группа.
+    При groups сравниваются только указанные группы
+    """
+    result_json = None
+    if groups is None:
+        result_json = await file_manager.get_cached_comparison(file_id_1, file_id_2)
+
+    if result_json is not None:
+        cached_groups = json.loads(result_json)["groups"]
+
+        def lines() -> Iterator[bytes]:
+            for group, group_result in cached_groups.items():
+                yield _comparison_line(
+                    group, json.dumps(group_result, ensure_ascii=False)
+                )
+
+    else:
+        file_1, file_2 = await _get_files_to_compare(file_manager, file_id_1, file_id_2)
+        content_1, content_2 = await file_manager.load_compare_contents(
+            file_1, file_2, groups
+        )
+        tree_1 = file_1.fingerprint_tree
+        tree_2 = file_2.fingerprint_tree
+
+        def lines() -> Iterator[bytes]:
+            for group, group_result in compare_service.iter_compare_schedules(
+                content_1, content_2, tree_1, tree_2
+            ):
+                yield _comparison_line(group, group_result.model_dump_json())
+
+    # Синхронный генератор выполняется в пуле потоков и не блокирует цикл событий
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.get("/search-groups")
 async def search_groups(match: str) -> ExternalGroupsResponseModel:
     external_api_url = "https://schedule-of.mirea.ru/schedule/api/search"
@@ -161,7 +340,7 @@ async def get_file(
     file_id: int, file_manager: FileRepository = Depends(get_file_manager)
 ) -> FileResponseModel:
     try:
-        file_data = await file_manager.get_file(file_id)
+        file_data = await file_manager.get_file_info(file_id)
         if not file_data:
             raise HTTPException(status_code=404, detail="Файл не найден")
 
@@ -180,18 +359,16 @@ async def get_groups_from_file(
     file_id: int, file_manager: FileRepository = Depends(get_file_manager)
 ) -> GroupListResponseModel:
     try:
-        file_data = await file_manager.get_file(file_id)
+        file_data = await file_manager.get_file_info(file_id)
         if not file_data:
             raise HTTPException(status_code=404, detail="Файл не найден")
 
-        if not file_data.standardized_content:
+        if not file_data.group_names:
             raise HTTPException(
                 status_code=400, detail="Файл не содержит данных о группах"
             )
 
-        groups = list(file_data.standardized_content.keys())
-
-        return GroupListResponseModel(groups=groups)
+        return GroupListResponseModel(groups=file_data.group_names)
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,11 @@
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.db.session import get_session
+from core.repositories.job_repository import JobRepository
+
+
+async def get_job_repository(
+    db_session: AsyncSession = Depends(get_session),
+) -> JobRepository:
+    return JobRepository(db_session=db_session)
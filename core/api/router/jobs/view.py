@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from core.repositories.job_repository import JobRepository
+from core.schemas.api_responses import JobProgressResponseModel, JobResponseModel
+from core.api.router.jobs.depends import get_job_repository
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: int,
+    job_repository: JobRepository = Depends(get_job_repository),
+) -> JobResponseModel:
+    """
+    Возвращает состояние фоновой задачи и результат ее выполнения
+    """
+    job = await job_repository.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+
+    return JobResponseModel.model_validate(job)
+
+
+@router.get("/{job_id}/progress")
+async def get_job_progress(
+    job_id: int,
+    job_repository: JobRepository = Depends(get_job_repository),
+) -> JobProgressResponseModel:
+    """
+    Возвращает прогресс выполнения фоновой задачи
+    """
+    job = await job_repository.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+
+    return JobProgressResponseModel.model_validate(job)
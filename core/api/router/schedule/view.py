@@ -2,36 +2,40 @@ from datetime import date
 from typing import Any, Dict, List, Literal, Optional
 
 from attr import s
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 
 from core.repositories.file_repository import FileRepository
+from core.repositories.job_repository import JobRepository
 from core.services.schedule_service import ScheduleService
-from core.services.schedule_downloader import ScheduleDownloader
+from core.settings.app_config import settings
 from core.schemas.schedule import (
+    ScheduleComparisonResultModel,
     ScheduleInfoModel,
     SemesterDatesModel,
     CurrentWeekInfoModel,
     LessonInfoModel,
     ScheduleResponseModel,
+    ScheduleRegenerateResultModel,
 )
 from core.schemas.api_responses import (
     ImportResultResponseModel,
     LessonMoveResponseModel,
     LessonCreateMultipleResponseModel,
-    GroupDownloadResponseModel,
+    JobResponseModel,
 )
 from core.schemas.api_requests import (
     GroupDownloadRequest,
     LessonAddRequest,
     LessonMoveRequest,
     ImportFromFileRequest,
+    Regenerate18WeekRequest,
 )
 from core.api.router.schedule.depends import (
     get_schedule_service,
     get_file_manager,
-    get_schedule_downloader,
 )
+from core.api.router.jobs.depends import get_job_repository
 
 router = APIRouter(prefix="/schedule", tags=["schedule"])
 
@@ -128,9 +132,13 @@ async def import_from_file(
     request: ImportFromFileRequest,
     schedule_service: ScheduleService = Depends(get_schedule_service),
     file_manager: FileRepository = Depends(get_file_manager),
-) -> ImportResultResponseModel:
+    job_repository: JobRepository = Depends(get_job_repository),
+) -> ImportResultResponseModel | JobResponseModel:
     """
-    Импортирует расписание из ранее загруженного файла в базу данных
+    Импортирует расписание из ранее загруженного файла в базу данных.
+    При background=true импорт ставится в очередь фоновых задач, при batched=true
+    выполняется пакетами групп и после сбоя продолжается с последнего пакета.
+    При groups импортируются и загружаются из БД только указанные группы
     """
     semcode = request.semcode
     if not semcode:
@@ -140,17 +148,60 @@ async def import_from_file(
     if not file:
         raise HTTPException(status_code=404, detail="Файл не найден")
 
+    if not file.group_count:
+        raise HTTPException(
+            status_code=400, detail="Файл не содержит данных расписания"
+        )
+
+    batch_size = None
+    if request.batched:
+        batch_size = request.batch_size or settings.IMPORT_BATCH_SIZE
+
+    if request.background:
+        job = await job_repository.enqueue(
+            "import_file",
+            {
+                "file_id": request.file_id,
+                "semcode": semcode,
+                "version": request.version,
+                "is_official": request.is_official,
+                "incremental": request.incremental,
+                "batch_size": batch_size,
+                "groups": request.groups,
+            },
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+        )
+        return JobResponseModel.model_validate(job)
+
     try:
-        if not file.standardized_content:
-            raise HTTPException(
-                status_code=400, detail="Файл не содержит данных расписания"
+        if not file_manager.file_group_names(file, request.groups):
+            raise ValueError("Указанные группы не найдены в файле")
+        if batch_size:
+            # Группы загружаются из БД по одному пакету
+            standardized_content = file_manager.iter_file_schedule_results(
+                file, request.groups, batch_size
+            )
+        else:
+            standardized_content = file_manager.load_schedule_results(
+                await file_manager.load_content(file, request.groups)
             )
-
         result = await schedule_service.import_schedule_from_standardized_content(
             semcode=semcode,
             version=request.version,
-            standardized_content=file.standardized_content,
+            standardized_content=standardized_content,
             is_official=request.is_official,
+            incremental=request.incremental,
+            batch_size=batch_size,
+            checkpoint_key=schedule_service.file_import_checkpoint_key(
+                request.file_id,
+                semcode,
+                request.version,
+                request.is_official,
+                request.groups,
+            ),
+            # Кэш импорта относится к содержимому всего файла
+            content_hash=file.content_hash if request.groups is None else None,
+            file_id=file.id,
         )
 
         return ImportResultResponseModel(
@@ -161,6 +212,10 @@ async def import_from_file(
             imported_to_db=True,
             semcode=semcode,
             is_official=request.is_official,
+            inserted_lessons=result.inserted_lessons,
+            deleted_lessons=result.deleted_lessons,
+            unchanged_lessons=result.unchanged_lessons,
+            cache_hit=result.cache_hit,
         )
 
     except ValueError as e:
@@ -171,6 +226,66 @@ async def import_from_file(
         )
 
 
+@router.post("/regenerate-18week")
+async def regenerate_18week(
+    request: Regenerate18WeekRequest,
+    schedule_service: ScheduleService = Depends(get_schedule_service),
+) -> ScheduleRegenerateResultModel:
+    """
+    Пересобирает 18-недельное расписание из сохраненного 7-дневного
+    """
+    semcode = request.semcode
+    if not semcode:
+        semcode = await schedule_service.get_current_semcode()
+
+    try:
+        return await schedule_service.regenerate_18week_schedule(
+            semcode=semcode,
+            version=request.version,
+            group_titles=request.groups,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Ошибка при пересборке расписания: {str(e)}"
+        )
+
+
+@router.get("/compare-versions")
+async def compare_versions(
+    version_1: int,
+    version_2: int,
+    semcode: Optional[int] = None,
+    semcode_2: Optional[int] = Query(
+        None, description="Семкод второй версии, по умолчанию semcode"
+    ),
+    official_1: bool = False,
+    official_2: bool = False,
+    schedule_service: ScheduleService = Depends(get_schedule_service),
+) -> ScheduleComparisonResultModel:
+    """
+    Сравнивает две импортированные версии 7-дневного расписания, в том числе
+    официальную и черновую, без загрузки версий из базы данных целиком
+    """
+    if not semcode:
+        semcode = await schedule_service.get_current_semcode()
+
+    try:
+        return await schedule_service.compare_versions(
+            semcode_1=semcode,
+            version_1=version_1,
+            official_1=official_1,
+            semcode_2=semcode_2 or semcode,
+            version_2=version_2,
+            official_2=official_2,
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Ошибка при сравнении версий: {str(e)}"
+        )
+
+
 @router.get("/current-week")
 async def get_current_week(
     semcode: Optional[int] = None,
@@ -260,57 +375,22 @@ async def move_lesson(
 
 @router.post("/download-schedules")
 async def download_schedules(
-    background_tasks: BackgroundTasks,
     request: GroupDownloadRequest,
-    schedule_downloader: ScheduleDownloader = Depends(get_schedule_downloader),
     schedule_service: ScheduleService = Depends(get_schedule_service),
-    file_manager: FileRepository = Depends(get_file_manager),
-) -> GroupDownloadResponseModel:
+    job_repository: JobRepository = Depends(get_job_repository),
+) -> JobResponseModel:
     """
-    Скачивает расписания групп и импортирует их в базу данных
+    Ставит в очередь задачу скачивания расписаний групп и их импорта в базу данных.
+    Ход выполнения доступен через /jobs/{id}
     """
-    try:
-        schedule_data = await schedule_downloader.download_group_schedules(
-            request.groups
-        )
-
-        new_file = await file_manager.save_schedule_data(schedule_data)
-        semcode = await schedule_service.get_current_semcode()
-
-        async def update_database():
-            try:
-                await schedule_service.import_schedule_from_standardized_content(
-                    semcode=semcode,
-                    version=1,
-                    standardized_content=schedule_data["group_schedules"],
-                    is_official=True,
-                )
-            except Exception as e:
-                print(f"Ошибка в фоновой обработке: {str(e)}")
-                import traceback
-
-                print(traceback.format_exc())
-
-        background_tasks.add_task(update_database)
-
-        return GroupDownloadResponseModel(
-            id=new_file.id,
-            name=new_file.original_name,
-            created_at=new_file.created_at.isoformat(),
-            group_count=new_file.group_count,
-            imported_to_db=True,
-            semcode=semcode,
-            is_official=True,
-        )
+    if not request.groups:
+        raise HTTPException(status_code=400, detail="Список групп пуст")
 
-    except ValueError as e:
-        print(f"Ошибка валидации при скачивании расписаний: {str(e)}")
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        print(f"Общая ошибка при скачивании расписаний: {str(e)}")
-        import traceback
+    semcode = await schedule_service.get_current_semcode()
+    job = await job_repository.enqueue(
+        "download_schedules",
+        {"groups": request.groups, "semcode": semcode, "is_official": True},
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+    )
 
-        print(traceback.format_exc())
-        raise HTTPException(
-            status_code=500, detail=f"Ошибка при скачивании расписаний: {str(e)}"
-        )
+    return JobResponseModel.model_validate(job)
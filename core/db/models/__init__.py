@@ -1,2 +1,9 @@
-from .schedule_files import ScheduleFile
+from .import_checkpoints import ImportCheckpoint
+from .jobs import Job, JobStatus
+from .schedule_files import (
+    ScheduleComparison,
+    ScheduleFile,
+    ScheduleFileGroup,
+    ScheduleImport,
+)
 from .schedule_models import *
@@ -0,0 +1,19 @@
+from sqlalchemy import JSON, Boolean, Column, DateTime, Index, Integer, String
+
+from core.db.base_class import BaseWithTimestamp
+
+
+class ImportCheckpoint(BaseWithTimestamp):
+    """Состояние незавершенного пакетного импорта"""
+
+    __tablename__ = "import_checkpoints"
+
+    key = Column(String, nullable=False)
+    semcode = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False)
+    is_official = Column(Boolean, nullable=False, default=False)
+    completed_groups = Column(JSON, nullable=False, default=list)
+    batches_done = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (Index("ix_import_checkpoints_key", "key", unique=True),)
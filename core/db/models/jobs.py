@@ -0,0 +1,31 @@
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, Text
+
+from core.db.base_class import BaseWithTimestamp
+
+
+class JobStatus:
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class Job(BaseWithTimestamp):
+    __tablename__ = "jobs"
+
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False, default=JobStatus.PENDING)
+    payload = Column(JSON, nullable=False, default=dict)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    progress = Column(Integer, nullable=False, default=0)
+    progress_message = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=1)
+    run_after = Column(DateTime(timezone=True), nullable=False)
+    locked_by = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (Index("ix_jobs_status_run_after", "status", "run_after"),)
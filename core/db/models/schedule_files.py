@@ -1,13 +1,142 @@
-from sqlalchemy import JSON, Boolean, Column, Integer, LargeBinary, String
+from typing import Any, Dict, Optional
 
-from core.db.base_class import BaseWithTimestamp
+from sqlalchemy import (
+    ARRAY,
+    JSON,
+    BigInteger,
+    Boolean,
+    Column,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+)
+from sqlalchemy.orm import deferred
 
+from core.db.base_class import BaseWithId, BaseWithTimestamp
+from core.utils.content_codec import decode_content
 
-class ScheduleFile(BaseWithTimestamp):
+
+class EncodedContent:
+    """
+    Содержимое в JSON-колонке content_json или закодированное
+    core.utils.content_codec в packed_content (настройка CONTENT_CODEC).
+    Записывается через FileRepository.content_columns
+    """
+
+    @property
+    def decoded_content(self) -> Optional[Dict[str, Any]]:
+        """
+        Содержимое независимо от способа хранения. packed_content
+        декодируется один раз при первом обращении
+        """
+        if self.packed_content is None:
+            return self.content_json
+
+        cached = self.__dict__.get("_decoded_content")
+        if cached is None or cached[0] is not self.packed_content:
+            cached = (self.packed_content, decode_content(self.packed_content))
+            self.__dict__["_decoded_content"] = cached
+        return cached[1]
+
+
+class ScheduleFile(EncodedContent, BaseWithTimestamp):
     __tablename__ = "schedule_files"
 
     original_name = Column(String, nullable=False)
-    file_data = Column(LargeBinary, nullable=False)
+    # Исходный файл, если он хранится в БД (BLOB_STORAGE=database).
+    # Загружается только по запросу: FileRepository.get_file(with_data=True)
+    file_data = deferred(Column(LargeBinary, nullable=True))
+    # Ключ исходного файла в хранилище core.services.blob_storage
+    blob_key = Column(String(64), nullable=True)
     visible = Column(Boolean, default=True)
-    standardized_content = Column(JSON, nullable=True)
+    # Содержимое файлов, загруженных до хранения по группам (ScheduleFileGroup).
+    # Читается через FileRepository.load_content
+    content_json = Column(
+        "standardized_content", JSON(none_as_null=True), nullable=True
+    )
+    packed_content = Column(LargeBinary, nullable=True)
+    # Дерево отпечатков standardized_content (build_fingerprint_tree)
+    fingerprint_tree = Column(JSON, nullable=True)
     group_count = Column(Integer, default=0)
+    # Группы standardized_content в исходном порядке, для списка файлов
+    group_names = Column(ARRAY(String), nullable=True)
+    content_hash = Column(String(64), nullable=True)
+
+    __table_args__ = (
+        Index("ix_schedule_files_content_hash", "content_hash"),
+        Index("ix_schedule_files_blob_key", "blob_key"),
+    )
+
+
+class ScheduleFileGroup(EncodedContent, BaseWithId):
+    """
+    Содержимое одной группы файла (значение standardized_content группы),
+    чтобы сравнение и импорт части групп не загружали файл целиком
+    """
+
+    __tablename__ = "schedule_file_groups"
+
+    file_id = Column(
+        BigInteger, ForeignKey("schedule_files.id", ondelete="CASCADE"), nullable=False
+    )
+    # Порядок группы в файле
+    position = Column(Integer, nullable=False)
+    group_name = Column(String, nullable=False)
+    content_json = Column("content", JSON(none_as_null=True), nullable=True)
+    packed_content = Column(LargeBinary, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_schedule_file_groups_file_group", "file_id", "group_name", unique=True
+        ),
+    )
+
+
+class ScheduleImport(BaseWithTimestamp):
+    """Журнал импортов файлов расписания в БД"""
+
+    __tablename__ = "schedule_imports"
+
+    file_id = Column(
+        Integer, ForeignKey("schedule_files.id", ondelete="SET NULL"), nullable=True
+    )
+    semcode = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False)
+    is_official = Column(Boolean, nullable=False, default=False)
+    content_hash = Column(String(64), nullable=True)
+
+    __table_args__ = (
+        Index("ix_schedule_imports_semcode_version", "semcode", "version"),
+    )
+
+
+class ScheduleComparison(BaseWithTimestamp):
+    """
+    Сохраненный результат сравнения двух файлов: JSON
+    ScheduleComparisonResultModel, сжатый zlib. Удаляется вместе с любым
+    из файлов
+    """
+
+    __tablename__ = "schedule_comparisons"
+
+    file_id_1 = Column(
+        BigInteger, ForeignKey("schedule_files.id", ondelete="CASCADE"), nullable=False
+    )
+    file_id_2 = Column(
+        BigInteger, ForeignKey("schedule_files.id", ondelete="CASCADE"), nullable=False
+    )
+    engine_version = Column(String(16), nullable=False)
+    result = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_schedule_comparisons_files",
+            "file_id_1",
+            "file_id_2",
+            "engine_version",
+            unique=True,
+        ),
+        Index("ix_schedule_comparisons_file_id_2", "file_id_2"),
+    )
@@ -14,6 +14,8 @@ class ScDisc(BaseWithId):
         "ScRasp18", back_populates="discipline", cascade="all, delete"
     )
 
+    __table_args__ = (Index("ix_sc_disc_title", "title", unique=True),)
+
 
 class ScGroup(BaseWithId):
     __tablename__ = "sc_group"
@@ -25,6 +27,8 @@ class ScGroup(BaseWithId):
         "ScRasp18Groups", back_populates="group", cascade="all, delete"
     )
 
+    __table_args__ = (Index("ix_sc_group_title", "title", unique=True),)
+
 
 class ScPrep(BaseWithId):
     __tablename__ = "sc_prep"
@@ -39,6 +43,8 @@ class ScPrep(BaseWithId):
         "ScRasp18Preps", back_populates="prep", cascade="all, delete"
     )
 
+    __table_args__ = (Index("ix_sc_prep_fio", "fio", unique=True),)
+
 
 class Students(BaseWithId):
     __tablename__ = "students"
@@ -1,4 +1,6 @@
 # coding=utf-8
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -7,6 +9,7 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 
 from core.api import router
+from core.services.conversion_pool import conversion_pool
 from core.settings.app_config import settings
 
 
@@ -21,7 +24,14 @@ class RootPathMiddleware(BaseHTTPMiddleware):
         return await call_next(request)
 
 
-app = FastAPI(title="Excel generate/analyze")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    conversion_pool.start()
+    yield
+    conversion_pool.shutdown()
+
+
+app = FastAPI(title="Excel generate/analyze", lifespan=lifespan)
 
 if settings.ROOT_PATH:
     app.add_middleware(RootPathMiddleware, root_path=settings.ROOT_PATH)
@@ -1,8 +1,9 @@
 from io import BytesIO
 import asyncio
+from sqlalchemy import func, literal
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List, Any
+from typing import List, Any, Sequence, Tuple
 
 
 class BaseRepository:
@@ -40,3 +41,42 @@ class BaseRepository:
             await self.db_session.flush()
 
         return entries
+
+    async def reserve_ids(self, model_class, count: int) -> List[int]:
+        """
+        Резервирует ID из последовательности таблицы одним запросом
+        """
+        if count <= 0:
+            return []
+
+        sequence = func.pg_get_serial_sequence(model_class.__tablename__, "id")
+        query = select(func.nextval(sequence)).select_from(
+            func.generate_series(1, count)
+        )
+        return list((await self.db_session.scalars(query)).all())
+
+    async def copy_records(
+        self,
+        model_class,
+        columns: Sequence[str],
+        records: List[Tuple[Any, ...]],
+    ) -> None:
+        """
+        Загружает записи в таблицу бинарным COPY через соединение asyncpg сессии.
+        Не указанные столбцы (в том числе id) заполняются значениями по умолчанию
+        """
+        if not records:
+            return
+
+        connection = await self.db_session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+
+        # Драйвер открывает транзакцию лениво, при первом запросе;
+        # COPY до этого момента выполнился бы вне транзакции сессии
+        if not driver_connection.is_in_transaction():
+            await self.db_session.execute(select(literal(1)))
+
+        await driver_connection.copy_records_to_table(
+            model_class.__tablename__, records=records, columns=list(columns)
+        )
@@ -1,62 +1,603 @@
 from io import BytesIO
 import asyncio
+import hashlib
+import zlib
+from typing import (
+    Any,
+    AsyncIterator,
+    Collection,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
 from openpyxl import load_workbook
-from sqlalchemy import delete
+from sqlalchemy import Row, delete, exists, or_, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import undefer
 
-from core.db.models.schedule_files import ScheduleFile
-from core.services.converters import StandardContentConverter
+from core.db.models.schedule_files import (
+    ScheduleComparison,
+    ScheduleFile,
+    ScheduleFileGroup,
+)
+from core.services.blob_storage import blob_storage
+from core.services.conversion_pool import conversion_pool
+from core.services.schedule_compare import (
+    COMPARE_ENGINE_VERSION,
+    ScheduleCompareService,
+    build_fingerprint_tree,
+)
 from core.schemas.schedule import ScheduleResult
+from core.settings.app_config import settings
+from core.utils.content_codec import encode_content
+from core.utils.schedule_content import schedule_from_content, schedule_to_content
+from core.utils.upload_spool import SpooledUpload, spool_upload
 from core.repositories.base_repository import BaseRepository
 
+# Колонки каталога файлов: без исходного файла и содержимого
+CATALOG_COLUMNS = (
+    ScheduleFile.id,
+    ScheduleFile.original_name,
+    ScheduleFile.created_at,
+    ScheduleFile.group_count,
+    ScheduleFile.group_names,
+)
+
 
 class FileRepository(BaseRepository):
     def __init__(self, db_session: AsyncSession):
         super().__init__(db_session)
-        self.content_converter = StandardContentConverter()
 
-    async def list_files(self, visible=True):
-        query = select(ScheduleFile).where(ScheduleFile.visible == visible)
+    async def list_files(self, visible=True) -> Sequence[Row]:
+        """
+        Каталог файлов: строки с колонками CATALOG_COLUMNS, исходные файлы
+        и содержимое не загружаются
+        """
+        query = (
+            select(*CATALOG_COLUMNS)
+            .where(ScheduleFile.visible == visible)
+            .order_by(ScheduleFile.id)
+        )
         result = await self.db_session.execute(query)
-        return result.scalars().all()
+        return result.all()
 
-    async def get_file(self, file_id):
+    async def get_file_info(self, file_id: int) -> Optional[Row]:
+        """Строка каталога файла, None - если файла нет"""
+        query = select(*CATALOG_COLUMNS).where(ScheduleFile.id == file_id)
+        result = await self.db_session.execute(query)
+        return result.one_or_none()
+
+    async def get_file(self, file_id, with_data: bool = False):
+        """
+        Файл с содержимым. Исходный файл (file_data) загружается только
+        при with_data=True
+        """
         query = select(ScheduleFile).where(ScheduleFile.id == file_id)
+        if with_data:
+            query = query.options(undefer(ScheduleFile.file_data))
         result = await self.db_session.execute(query)
         return result.scalar_one_or_none()
 
-    async def delete_file(self, file_id):
-        query = delete(ScheduleFile).where(ScheduleFile.id == file_id)
+    async def get_file_by_hash(self, content_hash: str) -> Optional[ScheduleFile]:
+        """Возвращает видимый файл с тем же содержимым"""
+        query = (
+            select(ScheduleFile)
+            .where(
+                ScheduleFile.content_hash == content_hash,
+                ScheduleFile.visible == True,
+            )
+            .order_by(ScheduleFile.id)
+            .limit(1)
+        )
+        result = await self.db_session.execute(query)
+        return result.scalar_one_or_none()
+
+    async def get_previous_file(self, file_id: int) -> Optional[ScheduleFile]:
+        """Последний видимый сконвертированный файл, загруженный до file_id"""
+        query = (
+            select(ScheduleFile)
+            .where(
+                ScheduleFile.id < file_id,
+                ScheduleFile.visible == True,
+                ScheduleFile.group_count > 0,
+            )
+            .order_by(ScheduleFile.id.desc())
+            .limit(1)
+        )
+        result = await self.db_session.execute(query)
+        return result.scalar_one_or_none()
+
+    async def get_cached_comparison(
+        self, file_id_1: int, file_id_2: int
+    ) -> Optional[bytes]:
+        """
+        JSON сохраненного результата сравнения файлов текущей версией
+        алгоритма, None - если сравнение не сохранено
+        """
+        query = select(ScheduleComparison.result).where(
+            ScheduleComparison.file_id_1 == file_id_1,
+            ScheduleComparison.file_id_2 == file_id_2,
+            ScheduleComparison.engine_version == COMPARE_ENGINE_VERSION,
+        )
+        result = (await self.db_session.execute(query)).scalar_one_or_none()
+        return zlib.decompress(result) if result is not None else None
+
+    async def save_cached_comparison(
+        self, file_id_1: int, file_id_2: int, result_json: bytes
+    ) -> None:
+        """
+        Сохраняет JSON результата сравнения файлов. Если то же сравнение
+        параллельно сохранил другой запрос, запись не меняется
+        """
+        query = (
+            insert(ScheduleComparison)
+            .values(
+                file_id_1=file_id_1,
+                file_id_2=file_id_2,
+                engine_version=COMPARE_ENGINE_VERSION,
+                result=zlib.compress(result_json),
+            )
+            .on_conflict_do_nothing()
+        )
         await self.db_session.execute(query)
         await self.db_session.commit()
 
+    async def delete_cached_comparisons(self, file_id: int) -> None:
+        """Удаляет сохраненные сравнения файла, например после его конвертации"""
+        query = delete(ScheduleComparison).where(
+            or_(
+                ScheduleComparison.file_id_1 == file_id,
+                ScheduleComparison.file_id_2 == file_id,
+            )
+        )
+        await self.db_session.execute(query)
+
+    async def delete_file(
+        self, file_id: int, release_blob: bool = True
+    ) -> Optional[str]:
+        """
+        Удаляет файл. Возвращает ключ исходного файла в хранилище, если на него
+        больше не ссылается ни один файл; при release_blob=False данные
+        в хранилище не удаляются, например пока файл еще отдается клиенту
+        """
+        # Сохраненные сравнения файла удаляются каскадно
+        query = (
+            delete(ScheduleFile)
+            .where(ScheduleFile.id == file_id)
+            .returning(ScheduleFile.blob_key)
+        )
+        blob_key = (await self.db_session.execute(query)).scalar_one_or_none()
+        if blob_key and await self.db_session.scalar(
+            select(exists().where(ScheduleFile.blob_key == blob_key))
+        ):
+            blob_key = None
+        await self.db_session.commit()
+
+        if blob_key and release_blob:
+            await asyncio.to_thread(blob_storage.delete, blob_key)
+        return blob_key
+
+    @staticmethod
+    async def store_file_data(file_data: bytes) -> Dict[str, Any]:
+        """
+        Поля ScheduleFile для исходного файла: ключ в хранилище или, если
+        хранилище не настроено, данные в БД
+        """
+        if blob_storage is None:
+            return {"file_data": file_data, "blob_key": None}
+        blob_key = await asyncio.to_thread(blob_storage.put, file_data)
+        return {"file_data": None, "blob_key": blob_key}
+
+    @staticmethod
+    async def store_spooled_file(upload: SpooledUpload) -> Dict[str, Any]:
+        """
+        То же, что store_file_data, для файла во временном файле: в локальное
+        хранилище файл переносится без чтения в память. В БД файл может быть
+        записан только целиком
+        """
+        if blob_storage is None:
+            with open(upload.path, "rb") as spooled_file:
+                return {"file_data": spooled_file.read(), "blob_key": None}
+        blob_key = await asyncio.to_thread(
+            blob_storage.put_file, upload.path, upload.content_hash
+        )
+        return {"file_data": None, "blob_key": blob_key}
+
+    @staticmethod
+    async def read_file_data(file_record: ScheduleFile) -> bytes:
+        """
+        Исходный файл из хранилища или из БД. Файл из БД должен быть загружен
+        через get_file(with_data=True)
+        """
+        if not file_record.blob_key:
+            return file_record.file_data
+        if blob_storage is None:
+            raise ValueError("Хранилище файлов не настроено (BLOB_STORAGE)")
+        return await asyncio.to_thread(blob_storage.read, file_record.blob_key)
+
+    @staticmethod
+    def get_file_path(file_record: ScheduleFile) -> Optional[str]:
+        """Путь к исходному файлу на диске, None - если файл хранится в БД"""
+        if not file_record.blob_key or blob_storage is None:
+            return None
+        return blob_storage.local_path(file_record.blob_key)
+
+    async def move_file_data_to_storage(self, batch_size: int = 20) -> int:
+        """
+        Переносит исходные файлы из БД в хранилище пакетами по batch_size
+        файлов, каждый пакет - отдельная транзакция. Возвращает число
+        перенесенных файлов
+        """
+        if blob_storage is None:
+            raise ValueError("Хранилище файлов не настроено (BLOB_STORAGE)")
+
+        moved = 0
+        while True:
+            query = (
+                select(ScheduleFile.id, ScheduleFile.file_data)
+                .where(
+                    ScheduleFile.blob_key.is_(None),
+                    ScheduleFile.file_data.is_not(None),
+                )
+                .order_by(ScheduleFile.id)
+                .limit(batch_size)
+            )
+            rows = (await self.db_session.execute(query)).all()
+            if not rows:
+                return moved
+
+            for file_id, file_data in rows:
+                blob_key = await asyncio.to_thread(blob_storage.put, file_data)
+                await self.db_session.execute(
+                    update(ScheduleFile)
+                    .where(ScheduleFile.id == file_id)
+                    .values(blob_key=blob_key, file_data=None)
+                )
+            await self.db_session.commit()
+            moved += len(rows)
+
     async def load_xlsx_data(self, file_id):
-        file_record = await self.get_file(file_id)
+        file_record = await self.get_file(file_id, with_data=True)
 
         if file_record:
-            file_stream = BytesIO(file_record.file_data)
+            file_stream = BytesIO(await self.read_file_data(file_record))
             workbook = load_workbook(file_stream)
             return workbook
         return None
 
+    @staticmethod
+    def compute_content_hash(file_data: bytes) -> str:
+        return hashlib.sha256(file_data).hexdigest()
+
+    @staticmethod
+    def build_standardized_content(
+        group_schedules: Dict[str, ScheduleResult],
+    ) -> Dict[str, dict]:
+        """
+        Преобразует расписания групп в содержимое для хранения в standardized_content
+        """
+        return {
+            group_name: schedule_to_content(schedule_result)
+            for group_name, schedule_result in group_schedules.items()
+        }
+
+    @staticmethod
+    def content_columns(
+        standardized_content: Optional[Dict[str, dict]],
+    ) -> Dict[str, Any]:
+        """
+        Поля ScheduleFileGroup для содержимого в формате CONTENT_CODEC.
+        Читается содержимое через load_content
+        """
+        if standardized_content is None or settings.CONTENT_CODEC == "json":
+            return {"content_json": standardized_content, "packed_content": None}
+        return {
+            "content_json": None,
+            "packed_content": encode_content(standardized_content),
+        }
+
+    @staticmethod
+    def content_group_names(
+        standardized_content: Optional[Dict[str, dict]],
+    ) -> Optional[List[str]]:
+        """Группы содержимого для каталога, None - если содержимого нет"""
+        return list(standardized_content) if standardized_content else None
+
+    @staticmethod
+    def build_content_tree(
+        standardized_content: Optional[Dict[str, dict]],
+    ) -> Optional[dict]:
+        """
+        Дерево отпечатков содержимого для сравнения только измененных групп
+        и слотов, None - если содержимого нет
+        """
+        if not standardized_content:
+            return None
+        return build_fingerprint_tree(standardized_content)
+
+    async def _store_content(
+        self, file_record: ScheduleFile, standardized_content: Optional[Dict[str, dict]]
+    ) -> None:
+        """
+        Записывает содержимое файла по группам (ScheduleFileGroup) и данные
+        файла, построенные по содержимому. Прежнее содержимое файла удаляется
+        """
+        file_record.content_json = None
+        file_record.packed_content = None
+        file_record.fingerprint_tree = self.build_content_tree(standardized_content)
+        file_record.group_count = (
+            len(standardized_content) if standardized_content else 0
+        )
+        file_record.group_names = self.content_group_names(standardized_content)
+
+        if file_record.id is None:
+            await self.db_session.flush()
+        else:
+            await self.db_session.execute(
+                delete(ScheduleFileGroup).where(
+                    ScheduleFileGroup.file_id == file_record.id
+                )
+            )
+
+        self.db_session.add_all(
+            ScheduleFileGroup(
+                file_id=file_record.id,
+                position=position,
+                group_name=group_name,
+                **self.content_columns(content),
+            )
+            for position, (group_name, content) in enumerate(
+                (standardized_content or {}).items()
+            )
+        )
+
+    async def load_content(
+        self, file_record: ScheduleFile, groups: Optional[Collection[str]] = None
+    ) -> Dict[str, dict]:
+        """
+        standardized_content файла, при groups - только указанных групп.
+        Загружаются только строки нужных групп; содержимое файлов,
+        сохраненных целиком, фильтруется после чтения
+        """
+        content = file_record.decoded_content
+        if content is not None:
+            if groups is None:
+                return content
+            return {group: content[group] for group in content if group in groups}
+
+        query = (
+            select(ScheduleFileGroup)
+            .where(ScheduleFileGroup.file_id == file_record.id)
+            .order_by(ScheduleFileGroup.position)
+        )
+        if groups is not None:
+            query = query.where(ScheduleFileGroup.group_name.in_(list(groups)))
+
+        result = await self.db_session.execute(query)
+        return {row.group_name: row.decoded_content for row in result.scalars()}
+
+    @staticmethod
+    def file_group_names(
+        file_record: ScheduleFile, groups: Optional[Collection[str]] = None
+    ) -> List[str]:
+        """Группы файла в порядке содержимого, при groups - только указанные"""
+        names = file_record.group_names
+        if names is None:
+            names = list(file_record.decoded_content or {})
+        return [group for group in names if groups is None or group in groups]
+
+    async def iter_content_batches(
+        self,
+        file_record: ScheduleFile,
+        groups: Optional[Collection[str]] = None,
+        batch_size: int = 50,
+    ) -> AsyncIterator[Dict[str, dict]]:
+        """
+        standardized_content файла порциями по batch_size групп, при groups -
+        только указанных групп. Строки ScheduleFileGroup читаются и
+        декодируются по одной порции, поэтому в памяти находится содержимое
+        только текущей порции; файлы, сохраненные целиком, делятся на порции
+        после чтения
+        """
+        content = file_record.decoded_content
+        if content is not None:
+            names = self.file_group_names(file_record, groups)
+            for start in range(0, len(names), batch_size):
+                yield {
+                    group: content[group]
+                    for group in names[start : start + batch_size]
+                    if group in content
+                }
+            return
+
+        last_position = -1
+        while True:
+            query = (
+                select(ScheduleFileGroup)
+                .where(
+                    ScheduleFileGroup.file_id == file_record.id,
+                    ScheduleFileGroup.position > last_position,
+                )
+                .order_by(ScheduleFileGroup.position)
+                .limit(batch_size)
+            )
+            if groups is not None:
+                query = query.where(ScheduleFileGroup.group_name.in_(list(groups)))
+
+            rows = (await self.db_session.scalars(query)).all()
+            if not rows:
+                return
+
+            last_position = rows[-1].position
+            batch = {row.group_name: row.decoded_content for row in rows}
+            # Строки порции не держим в сессии, пока импортируется следующая
+            for row in rows:
+                self.db_session.expunge(row)
+            yield batch
+
+    async def iter_file_schedule_results(
+        self,
+        file_record: ScheduleFile,
+        groups: Optional[Collection[str]] = None,
+        batch_size: int = 50,
+    ) -> AsyncIterator[Tuple[str, ScheduleResult]]:
+        """
+        Последовательно восстанавливает расписания групп файла, загружая
+        содержимое из БД порциями по batch_size групп (iter_content_batches)
+        """
+        async for content in self.iter_content_batches(file_record, groups, batch_size):
+            for item in self.iter_schedule_results(content):
+                yield item
+
+    async def load_compare_contents(
+        self,
+        file_1: ScheduleFile,
+        file_2: ScheduleFile,
+        groups: Optional[Collection[str]] = None,
+    ) -> Tuple[Dict[str, dict], Dict[str, dict]]:
+        """
+        Содержимое двух файлов для сравнения, при groups - только указанных
+        групп. Загружаются только общие группы с различающимися хэшами
+        деревьев отпечатков: остальные группы сравнение не читает, они
+        остаются в словарях с пустым содержимым, чтобы сохранить порядок групп
+        """
+        if file_1.group_names is None or file_2.group_names is None:
+            return (
+                await self.load_content(file_1, groups),
+                await self.load_content(file_2, groups),
+            )
+
+        names_1 = [
+            group for group in file_1.group_names if groups is None or group in groups
+        ]
+        names_2 = [
+            group for group in file_2.group_names if groups is None or group in groups
+        ]
+        changed = (
+            set(names_1)
+            .intersection(names_2)
+            .difference(
+                ScheduleCompareService.unchanged_groups(
+                    file_1.fingerprint_tree, file_2.fingerprint_tree
+                )
+            )
+        )
+
+        content_1 = await self.load_content(file_1, changed)
+        content_2 = await self.load_content(file_2, changed)
+        return (
+            {group: content_1.get(group, {}) for group in names_1},
+            {group: content_2.get(group, {}) for group in names_2},
+        )
+
+    @staticmethod
+    def iter_schedule_results(
+        standardized_content: Optional[Dict[str, dict]],
+    ) -> Iterator[Tuple[str, ScheduleResult]]:
+        """
+        Последовательно восстанавливает расписания групп из standardized_content
+        (в том числе в прежнем формате по неделям), не создавая объекты
+        для всех групп сразу
+        """
+        for group_name, content in (standardized_content or {}).items():
+            yield group_name, schedule_from_content(group_name, content)
+
+    @classmethod
+    def load_schedule_results(
+        cls, standardized_content: Optional[Dict[str, dict]]
+    ) -> Dict[str, ScheduleResult]:
+        """
+        Восстанавливает расписания групп из standardized_content
+        """
+        return dict(cls.iter_schedule_results(standardized_content))
+
+    async def convert_file_data(
+        self, file_data: bytes, file_format: str
+    ) -> Optional[Dict[str, dict]]:
+        """
+        Конвертирует исходный файл в standardized_content в пуле процессов,
+        None - если формат файла не распознан
+        """
+        return await conversion_pool.convert(file_data, file_format)
+
+    async def convert_stored_file(
+        self, file_record: ScheduleFile
+    ) -> Optional[Dict[str, dict]]:
+        """
+        Конвертирует сохраненный исходный файл. Файл из локального хранилища
+        передается в пул процессов путем, а не содержимым
+        """
+        file_format = file_record.original_name.split(".")[-1].lower()
+        file_path = self.get_file_path(file_record)
+        if file_path:
+            return await conversion_pool.convert_path(file_path, file_format)
+        return await self.convert_file_data(
+            await self.read_file_data(file_record), file_format
+        )
+
     async def save_file(self, file):
-        file_data = await file.read()
-        file_format = file.filename.split(".")[-1].lower()
+        """
+        Сохраняет и конвертирует файл. Если файл с таким же содержимым уже
+        загружен и сконвертирован, возвращается он, и конвертация
+        не выполняется; содержимое несконвертированного файла обновляется
+        результатом новой конвертации. Файл не загружается в память целиком:
+        он записывается во временный файл, который конвертируется
+        и переносится в хранилище
+        """
+        async with spool_upload(file) as upload:
+            existing_file = await self.get_file_by_hash(upload.content_hash)
+            if existing_file and existing_file.group_count:
+                return existing_file
+
+            file_format = file.filename.split(".")[-1].lower()
 
-        try:
-            standardized_content = self.content_converter.convert(
-                file_data, file_format
+            standardized_content = await conversion_pool.convert_path(
+                upload.path, file_format
             )
-        except ValueError:
-            standardized_content = None
-        group_count = len(standardized_content.keys()) if standardized_content else 0
+            if existing_file:
+                return await self._update_existing_content(
+                    existing_file, standardized_content
+                )
+            file_columns = await self.store_spooled_file(upload)
+
+        new_file = ScheduleFile(
+            original_name=file.filename,
+            **file_columns,
+            content_hash=upload.content_hash,
+        )
+
+        self.db_session.add(new_file)
+        await self._store_content(new_file, standardized_content)
+        await self.db_session.commit()
+        await self.db_session.refresh(new_file)
+
+        return new_file
+
+    async def save_raw_file(self, file) -> ScheduleFile:
+        """
+        Сохраняет исходный файл без конвертации, содержимое заполняется позже
+        через update_file_content. Если файл с таким же содержимым уже загружен,
+        возвращается он: несконвертированный файл (group_count == 0)
+        конвертируется заново задачей convert_file
+        """
+        async with spool_upload(file) as upload:
+            existing_file = await self.get_file_by_hash(upload.content_hash)
+            if existing_file:
+                return existing_file
+
+            file_columns = await self.store_spooled_file(upload)
 
         new_file = ScheduleFile(
             original_name=file.filename,
-            file_data=file_data,
-            standardized_content=standardized_content,
-            group_count=group_count,
+            **file_columns,
+            group_count=0,
+            content_hash=upload.content_hash,
         )
 
         self.db_session.add(new_file)
@@ -65,22 +606,57 @@ class FileRepository(BaseRepository):
 
         return new_file
 
+    async def update_file_content(
+        self, file_id: int, standardized_content: Optional[Dict[str, dict]]
+    ) -> Optional[ScheduleFile]:
+        file_record = await self.get_file(file_id)
+        if not file_record:
+            return None
+
+        await self._store_content(file_record, standardized_content)
+        await self.delete_cached_comparisons(file_id)
+        await self.db_session.commit()
+
+        return file_record
+
+    async def _update_existing_content(
+        self,
+        file_record: ScheduleFile,
+        standardized_content: Optional[Dict[str, dict]],
+    ) -> ScheduleFile:
+        """
+        Записывает содержимое в ранее загруженный файл с тем же исходным
+        файлом, конвертация которого не удалась
+        """
+        await self._store_content(file_record, standardized_content)
+        await self.delete_cached_comparisons(file_record.id)
+        await self.db_session.commit()
+        await self.db_session.refresh(file_record)
+        return file_record
+
     async def save_schedule_data(self, schedule_data):
+        content_hash = self.compute_content_hash(schedule_data["file_data"])
 
-        standardized_content = {}
-        for group_name, schedule_result in schedule_data["group_schedules"].items():
-            standardized_content[group_name] = schedule_result.model_dump()[
-                "week_schedules"
-            ]
+        existing_file = await self.get_file_by_hash(content_hash)
+        if existing_file and existing_file.group_count:
+            return existing_file
+
+        standardized_content = self.build_standardized_content(
+            schedule_data["group_schedules"]
+        )
+        if existing_file:
+            return await self._update_existing_content(
+                existing_file, standardized_content
+            )
 
         new_file = ScheduleFile(
             original_name=schedule_data["original_name"],
-            file_data=schedule_data["file_data"],
-            standardized_content=standardized_content,
-            group_count=schedule_data["group_count"],
+            **await self.store_file_data(schedule_data["file_data"]),
+            content_hash=content_hash,
         )
 
         self.db_session.add(new_file)
+        await self._store_content(new_file, standardized_content)
         await self.db_session.commit()
         await self.db_session.refresh(new_file)
 
@@ -0,0 +1,199 @@
+import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from core.db.models.jobs import Job, JobStatus
+from core.repositories.base_repository import BaseRepository
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class JobRepository(BaseRepository):
+    def __init__(self, db_session: AsyncSession):
+        super().__init__(db_session)
+
+    async def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        max_attempts: int = 1,
+    ) -> Job:
+        """
+        Ставит задачу в очередь
+        """
+        job = Job(
+            kind=kind,
+            status=JobStatus.PENDING,
+            payload=payload,
+            progress=0,
+            attempts=0,
+            max_attempts=max_attempts,
+            run_after=_now(),
+        )
+        self.db_session.add(job)
+        await self.db_session.commit()
+        await self.db_session.refresh(job)
+        return job
+
+    async def get_job(self, job_id: int) -> Optional[Job]:
+        return await self.get_by_id(Job, job_id)
+
+    async def claim_job(
+        self, worker_id: str, kinds: Optional[List[str]] = None
+    ) -> Optional[Job]:
+        """
+        Захватывает первую готовую к выполнению задачу. Строки, заблокированные
+        другими воркерами, пропускаются (FOR UPDATE SKIP LOCKED), поэтому
+        несколько воркеров не получат одну и ту же задачу
+        """
+        now = _now()
+        query = (
+            select(Job)
+            .where(Job.status == JobStatus.PENDING, Job.run_after <= now)
+            .order_by(Job.run_after, Job.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        if kinds:
+            query = query.where(Job.kind.in_(kinds))
+
+        job = (await self.db_session.execute(query)).scalar_one_or_none()
+        if not job:
+            await self.db_session.rollback()
+            return None
+
+        job.status = JobStatus.RUNNING
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.started_at = now
+        job.heartbeat_at = now
+        job.error = None
+        await self.db_session.commit()
+        return job
+
+    async def update_progress(
+        self, job_id: int, progress: int, message: Optional[str] = None
+    ) -> None:
+        """
+        Сохраняет прогресс выполнения задачи (0-100) и обновляет heartbeat
+        """
+        query = (
+            update(Job)
+            .where(Job.id == job_id, Job.status == JobStatus.RUNNING)
+            .values(
+                progress=max(0, min(100, int(progress))),
+                progress_message=message,
+                heartbeat_at=_now(),
+            )
+        )
+        await self.db_session.execute(query)
+        await self.db_session.commit()
+
+    async def heartbeat(self, job_id: int) -> None:
+        query = (
+            update(Job)
+            .where(Job.id == job_id, Job.status == JobStatus.RUNNING)
+            .values(heartbeat_at=_now())
+        )
+        await self.db_session.execute(query)
+        await self.db_session.commit()
+
+    async def complete_job(
+        self, job_id: int, worker_id: str, result: Dict[str, Any]
+    ) -> bool:
+        """
+        Сохраняет результат задачи, если она еще выполняется воркером worker_id.
+        Возвращает False, если задача уже не принадлежит воркеру (например,
+        была возвращена в очередь как зависшая и захвачена другим воркером)
+        """
+        query = (
+            update(Job)
+            .where(
+                Job.id == job_id,
+                Job.locked_by == worker_id,
+                Job.status == JobStatus.RUNNING,
+            )
+            .values(
+                status=JobStatus.DONE,
+                result=result,
+                progress=100,
+                locked_by=None,
+                finished_at=_now(),
+            )
+            .returning(Job.id)
+        )
+        completed = (await self.db_session.execute(query)).scalar_one_or_none()
+        await self.db_session.commit()
+        return completed is not None
+
+    async def fail_job(
+        self, job_id: int, worker_id: str, error: str, retry_delay: int = 0
+    ) -> Optional[str]:
+        """
+        Отмечает попытку выполнения задачи воркером worker_id как неудачную.
+        Если попытки не исчерпаны, задача возвращается в очередь с задержкой
+        retry_delay секунд. Возвращает новый статус задачи или None, если
+        задача уже не принадлежит воркеру
+        """
+        query = (
+            select(Job)
+            .where(
+                Job.id == job_id,
+                Job.locked_by == worker_id,
+                Job.status == JobStatus.RUNNING,
+            )
+            .with_for_update()
+        )
+        job = (await self.db_session.execute(query)).scalar_one_or_none()
+        if not job:
+            await self.db_session.rollback()
+            return None
+
+        job.error = error
+        job.locked_by = None
+        if job.attempts < job.max_attempts:
+            job.status = JobStatus.PENDING
+            job.run_after = _now() + datetime.timedelta(seconds=retry_delay)
+        else:
+            job.status = JobStatus.FAILED
+            job.finished_at = _now()
+
+        await self.db_session.commit()
+        return job.status
+
+    async def requeue_stale_jobs(self, stale_timeout: int) -> int:
+        """
+        Возвращает в очередь задачи, воркер которых перестал обновлять heartbeat
+        (например, был перезапущен). Задачи с исчерпанными попытками
+        отмечаются как неудачные. Возвращает количество возвращенных задач
+        """
+        now = _now()
+        stale = (
+            Job.status == JobStatus.RUNNING,
+            Job.heartbeat_at < now - datetime.timedelta(seconds=stale_timeout),
+        )
+
+        await self.db_session.execute(
+            update(Job)
+            .where(*stale, Job.attempts >= Job.max_attempts)
+            .values(
+                status=JobStatus.FAILED,
+                error="Воркер перестал отвечать во время выполнения задачи",
+                locked_by=None,
+                finished_at=now,
+            )
+        )
+        requeued = await self.db_session.execute(
+            update(Job)
+            .where(*stale)
+            .values(status=JobStatus.PENDING, locked_by=None, run_after=now)
+            .returning(Job.id)
+        )
+        count = len(requeued.scalars().all())
+        await self.db_session.commit()
+        return count
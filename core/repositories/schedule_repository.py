@@ -1,5 +1,5 @@
 from typing import Dict, List, Optional, Tuple, Any, Set, Union
-from sqlalchemy import and_, delete, insert, or_, select, update, func
+from sqlalchemy import and_, delete, insert, or_, select, update, func, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from datetime import date, datetime
@@ -20,10 +20,236 @@ from core.db.models.schedule_models import (
     ScRasp18Move,
     ScRasp18Info,
 )
+from core.db.models.import_checkpoints import ImportCheckpoint
+from core.db.models.schedule_files import ScheduleImport
 from core.utils.db_utils import get_entity_by_field
 from core.utils.date_utils import parse_date, get_pair_time
+from core.utils.semester_calendar import (
+    SemesterCalendar,
+    cache_calendar,
+    get_cached_calendar,
+    invalidate_calendar,
+)
 from core.repositories.base_repository import BaseRepository
 
+# Занятия 7-дневного расписания разворачиваются по неделям в дни семестра;
+# ID новых записей берутся из последовательности в CTE slots (материализуется
+# один раз), поэтому удаление старых записей, вставка новых и их связей
+# выполняются одним запросом
+REGENERATE_18WEEK_SQL = """
+WITH {target_cte}
+lessons AS (
+    SELECT r.id AS rasp7_id, d.id AS day_id, r.pair, r.disc_id, r.worktype
+    FROM sc_rasp7 AS r
+    CROSS JOIN LATERAL unnest(r.weeksarray) AS w(week)
+    JOIN sc_rasp18_days AS d
+        ON d.semcode = r.semcode AND d.week = w.week AND d.weekday = r.weekday
+    WHERE r.semcode = :semcode AND r.version = :version {lessons_filter}
+),
+removed AS (
+    DELETE FROM sc_rasp18 AS o
+    WHERE o.semcode = :semcode
+        AND (
+            EXISTS (
+                SELECT 1
+                FROM sc_rasp18_groups AS og
+                JOIN target_groups AS tg ON tg.group_id = og.group_id
+                WHERE og.rasp18_id = o.id
+            )
+            OR EXISTS (
+                SELECT 1
+                FROM sc_rasp18_groups AS og
+                JOIN lessons AS l
+                    ON (l.day_id, l.pair, l.disc_id, l.worktype)
+                        = (o.day_id, o.pair, o.disc_id, o.worktype)
+                JOIN sc_rasp7_groups AS g
+                    ON g.rasp7_id = l.rasp7_id AND g.group_id = og.group_id
+                WHERE og.rasp18_id = o.id
+            )
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM sc_rasp18_move AS m WHERE m.rasp18_dest_id = o.id
+        )
+    RETURNING o.id
+),
+slots AS (
+    SELECT
+        nextval(pg_get_serial_sequence('sc_rasp18', 'id')) AS id,
+        day_id, pair, disc_id, worktype
+    FROM (SELECT DISTINCT day_id, pair, disc_id, worktype FROM lessons) AS s
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM sc_rasp18_move AS m
+        JOIN sc_rasp18 AS mo ON mo.id = m.rasp18_dest_id
+        WHERE mo.semcode = :semcode
+            AND m.src_day_id = s.day_id AND m.src_pair = s.pair
+            AND mo.disc_id = s.disc_id AND mo.worktype = s.worktype
+    )
+),
+inserted AS (
+    INSERT INTO sc_rasp18
+        (id, semcode, day_id, pair, kind, worktype, disc_id, timestart, timeend)
+    SELECT
+        id, :semcode, day_id, pair, 0, worktype, disc_id,
+        COALESCE((CAST(:timestarts AS text[]))[pair], '00:00'),
+        COALESCE((CAST(:timeends AS text[]))[pair], '00:00')
+    FROM slots
+    RETURNING id
+),
+inserted_groups AS (
+    INSERT INTO sc_rasp18_groups (rasp18_id, group_id, subgroup)
+    SELECT DISTINCT s.id, g.group_id, g.subgroup
+    FROM slots AS s
+    JOIN lessons AS l USING (day_id, pair, disc_id, worktype)
+    JOIN sc_rasp7_groups AS g ON g.rasp7_id = l.rasp7_id
+),
+inserted_rooms AS (
+    INSERT INTO sc_rasp18_rooms (rasp18_id, room)
+    SELECT DISTINCT s.id, rr.room
+    FROM slots AS s
+    JOIN lessons AS l USING (day_id, pair, disc_id, worktype)
+    JOIN sc_rasp7_rooms AS rr ON rr.rasp7_id = l.rasp7_id
+),
+inserted_preps AS (
+    INSERT INTO sc_rasp18_preps (rasp18_id, prep_id)
+    SELECT DISTINCT s.id, p.prep_id
+    FROM slots AS s
+    JOIN lessons AS l USING (day_id, pair, disc_id, worktype)
+    JOIN sc_rasp7_preps AS p ON p.rasp7_id = l.rasp7_id
+)
+SELECT
+    (SELECT count(*) FROM inserted) AS inserted,
+    (SELECT count(*) FROM removed) AS deleted
+"""
+
+# Группы, записи которых пересобираются: все группы 7-дневного расписания
+# версии. Удаляются все их записи, кроме перенесенных пар, поэтому занятия,
+# которых больше нет в 7-дневном расписании, тоже удаляются
+REGENERATE_18WEEK_GROUPS_CTE = """
+target_groups AS (
+    SELECT DISTINCT rg.group_id
+    FROM sc_rasp7 AS r
+    JOIN sc_rasp7_groups AS rg ON rg.rasp7_id = r.id
+    WHERE r.semcode = :semcode AND r.version = :version
+),
+"""
+
+# С фильтром пересобираются группы фильтра. Занятия групп объединяются в одну
+# запись с другими группами, поэтому слоты (день, пара, дисциплина, тип),
+# в которых у групп фильтра есть занятия в 7-дневном расписании версии или
+# записи в 18-недельном, пересобираются целиком по всем группам
+REGENERATE_18WEEK_TARGET_CTE = """
+target_groups AS (
+    SELECT DISTINCT t.group_id
+    FROM unnest(CAST(:group_ids AS integer[])) AS t(group_id)
+),
+target AS (
+    SELECT d.id AS day_id, r.pair, r.disc_id, r.worktype
+    FROM sc_rasp7 AS r
+    JOIN sc_rasp7_groups AS rg ON rg.rasp7_id = r.id
+    CROSS JOIN LATERAL unnest(r.weeksarray) AS w(week)
+    JOIN sc_rasp18_days AS d
+        ON d.semcode = r.semcode AND d.week = w.week AND d.weekday = r.weekday
+    WHERE r.semcode = :semcode AND r.version = :version
+        AND rg.group_id = ANY(:group_ids)
+    UNION
+    SELECT o.day_id, o.pair, o.disc_id, o.worktype
+    FROM sc_rasp18 AS o
+    JOIN sc_rasp18_groups AS og ON og.rasp18_id = o.id
+    WHERE o.semcode = :semcode AND og.group_id = ANY(:group_ids)
+        AND NOT EXISTS (
+            SELECT 1 FROM sc_rasp18_move AS m WHERE m.rasp18_dest_id = o.id
+        )
+),
+"""
+
+# Сравнение двух версий 7-дневного расписания (семкод, версия, официальное
+# или черновое). Занятия обеих версий разворачиваются по неделям с названиями
+# без маркера официальной записи; FULL OUTER JOIN по (группа, день, пара,
+# неделя) находит слоты групп обеих версий, где версии различаются. Из базы
+# возвращаются недели каждой группы (side, group_title, weeks) и занятия
+# только измененных слотов, с неделями, собранными в массив
+COMPARE_7DAY_SQL = """
+WITH sides (side, semcode, version, official) AS (
+    VALUES
+        (1, CAST(:semcode_1 AS integer), CAST(:version_1 AS integer),
+            CAST(:official_1 AS boolean)),
+        (2, CAST(:semcode_2 AS integer), CAST(:version_2 AS integer),
+            CAST(:official_2 AS boolean))
+),
+lessons AS (
+    SELECT DISTINCT ON (s.side, group_title, r.weekday, r.pair, w.week)
+        s.side,
+        rtrim(g.title, '*') AS group_title,
+        r.weekday,
+        r.pair,
+        w.week,
+        rtrim(d.title, '*') AS subject,
+        r.worktype,
+        COALESCE((
+            SELECT string_agg(rtrim(p.fio, '*'), ', ' ORDER BY rtrim(p.fio, '*'))
+            FROM sc_rasp7_preps AS rp
+            JOIN sc_prep AS p ON p.id = rp.prep_id
+            WHERE rp.rasp7_id = r.id
+        ), '') AS teacher,
+        COALESCE((
+            SELECT string_agg(rtrim(rr.room, '*'), ', ' ORDER BY rtrim(rr.room, '*'))
+            FROM sc_rasp7_rooms AS rr
+            WHERE rr.rasp7_id = r.id
+        ), '') AS room
+    FROM sides AS s
+    JOIN sc_rasp7 AS r ON r.semcode = s.semcode AND r.version = s.version
+    JOIN sc_rasp7_groups AS rg ON rg.rasp7_id = r.id
+    JOIN sc_group AS g
+        ON g.id = rg.group_id AND (right(g.title, 1) = '*') = s.official
+    JOIN sc_disc AS d ON d.id = r.disc_id
+    CROSS JOIN LATERAL unnest(r.weeksarray) AS w(week)
+    ORDER BY s.side, group_title, r.weekday, r.pair, w.week, r.id DESC
+),
+common_groups AS (
+    SELECT group_title
+    FROM lessons
+    GROUP BY group_title
+    HAVING count(DISTINCT side) = 2
+),
+changed_slots AS (
+    SELECT DISTINCT group_title, weekday, pair
+    FROM (SELECT * FROM lessons WHERE side = 1) AS l1
+    FULL OUTER JOIN (SELECT * FROM lessons WHERE side = 2) AS l2
+        USING (group_title, weekday, pair, week)
+    JOIN common_groups USING (group_title)
+    WHERE (l1.subject, l1.worktype, l1.teacher, l1.room)
+        IS DISTINCT FROM (l2.subject, l2.worktype, l2.teacher, l2.room)
+)
+SELECT
+    side, group_title, NULL AS weekday, NULL AS pair,
+    array_agg(DISTINCT week) AS weeks,
+    NULL AS subject, NULL AS worktype, NULL AS teacher, NULL AS room
+FROM lessons
+GROUP BY side, group_title
+UNION ALL
+SELECT
+    l.side, l.group_title, l.weekday, l.pair,
+    array_agg(l.week ORDER BY l.week) AS weeks,
+    l.subject, l.worktype, l.teacher, l.room
+FROM lessons AS l
+JOIN changed_slots USING (group_title, weekday, pair)
+GROUP BY l.side, l.group_title, l.weekday, l.pair, l.subject, l.worktype,
+    l.teacher, l.room
+"""
+
+RASP18_COLUMNS = (
+    "id",
+    "semcode",
+    "day_id",
+    "pair",
+    "kind",
+    "worktype",
+    "disc_id",
+    "timestart",
+    "timeend",
+)
+
 
 class ScheduleRepository(BaseRepository):
     """Репозиторий для работы с данными расписания"""
@@ -69,6 +295,18 @@ class ScheduleRepository(BaseRepository):
         )
         return (await self.db_session.scalars(q_days)).all()
 
+    async def get_semester_calendar(self, semcode: int) -> SemesterCalendar:
+        """
+        Получает календарь семестра; календарь строится один раз на семкод
+        и хранится в кэше процесса
+        """
+        calendar = get_cached_calendar(semcode)
+        if calendar is None:
+            days = await self.get_semester_days(semcode)
+            calendar = SemesterCalendar.from_models(semcode, days)
+            cache_calendar(calendar)
+        return calendar
+
     async def get_days_in_range(
         self, semcode: int, date_from: date, date_to: date
     ) -> List[ScRasp18Days]:
@@ -110,6 +348,9 @@ class ScheduleRepository(BaseRepository):
         self.db_session.add_all(day_entries)
         await self.db_session.commit()
 
+        for semcode in {day["semcode"] for day in days_data}:
+            invalidate_calendar(semcode)
+
     async def get_schedule_for_entity(
         self,
         day_ids: List[int],
@@ -181,6 +422,13 @@ class ScheduleRepository(BaseRepository):
 
         return (await self.db_session.scalars(q)).all()
 
+    async def get_group_ids_by_titles(self, titles: List[str]) -> Dict[str, int]:
+        """Получает ID существующих групп по названиям"""
+        if not titles:
+            return {}
+        q = select(ScGroup.title, ScGroup.id).where(ScGroup.title.in_(titles))
+        return {title: group_id for title, group_id in await self.db_session.execute(q)}
+
     async def search_entities(
         self, search_type: str, query: str, limit: int = 10
     ) -> List[str]:
@@ -275,6 +523,7 @@ class ScheduleRepository(BaseRepository):
                 ),
                 selectinload(ScRasp18.rooms),
                 selectinload(ScRasp18.preps).options(selectinload(ScRasp18Preps.prep)),
+                selectinload(ScRasp18.moves),
             )
         )
         return (await self.db_session.scalars(q)).first()
@@ -399,18 +648,20 @@ class ScheduleRepository(BaseRepository):
         semcode: int,
         version: int = None,
         group_ids: List[int] = None,
-    ) -> None:
+        commit: bool = True,
+    ) -> int:
         """
-        Универсальный метод для удаления расписания
-
+        Универсальный метод для удаления расписания.
+        Возвращает количество удаленных записей
         """
         if not group_ids:
             delete_stmt = delete(model_class).where(model_class.semcode == semcode)
             if version is not None:
                 delete_stmt = delete_stmt.where(model_class.version == version)
-            await self.db_session.execute(delete_stmt)
-            await self.db_session.commit()
-            return
+            result = await self.db_session.execute(delete_stmt)
+            if commit:
+                await self.db_session.commit()
+            return result.rowcount
 
         if model_class == ScRasp7:
             groups_model = ScRasp7Groups
@@ -431,19 +682,110 @@ class ScheduleRepository(BaseRepository):
             await self.db_session.execute(
                 delete(model_class).where(model_class.id.in_(record_ids))
             )
-            await self.db_session.commit()
+            if commit:
+                await self.db_session.commit()
+
+        return len(record_ids)
 
     async def delete_7day_schedule(
-        self, semcode: int, version: int, group_ids: List[int] = None
-    ) -> None:
+        self,
+        semcode: int,
+        version: int,
+        group_ids: List[int] = None,
+        commit: bool = True,
+    ) -> int:
         """Удаляет 7-дневное расписание для указанных групп"""
-        await self.delete_schedule(ScRasp7, semcode, version, group_ids)
+        return await self.delete_schedule(ScRasp7, semcode, version, group_ids, commit)
 
     async def delete_18week_schedule(
         self, semcode: int, group_ids: List[int] = None
-    ) -> None:
+    ) -> int:
         """Удаляет 18-недельное расписание для указанных групп"""
-        await self.delete_schedule(ScRasp18, semcode, None, group_ids)
+        return await self.delete_schedule(ScRasp18, semcode, None, group_ids)
+
+    async def delete_18week_lessons(
+        self, lesson_ids: List[int], chunk_size: int = 5000
+    ) -> None:
+        """Удаляет записи 18-недельного расписания по ID без фиксации транзакции"""
+        for i in range(0, len(lesson_ids), chunk_size):
+            chunk = lesson_ids[i : i + chunk_size]
+            await self.db_session.execute(
+                delete(ScRasp18).where(ScRasp18.id.in_(chunk))
+            )
+
+    async def get_18week_lessons_for_groups(
+        self, semcode: int, group_ids: List[int]
+    ) -> List[Dict[str, Any]]:
+        """
+        Получает записи 18-недельного расписания указанных групп в виде словарей
+        с множествами groups, rooms, preps. Для перенесенных пар добавляются
+        src_day_id и src_pair слота до первого переноса
+        """
+        if not group_ids:
+            return []
+
+        lesson_ids = (
+            select(ScRasp18Groups.rasp18_id)
+            .join(ScRasp18, ScRasp18.id == ScRasp18Groups.rasp18_id)
+            .where(
+                ScRasp18.semcode == semcode,
+                ScRasp18Groups.group_id.in_(group_ids),
+            )
+            .distinct()
+            .scalar_subquery()
+        )
+
+        rows = await self.db_session.execute(
+            select(
+                ScRasp18.id,
+                ScRasp18.day_id,
+                ScRasp18.pair,
+                ScRasp18.disc_id,
+                ScRasp18.worktype,
+            ).where(ScRasp18.id.in_(lesson_ids))
+        )
+        lessons = {
+            row.id: {
+                "id": row.id,
+                "day_id": row.day_id,
+                "pair": row.pair,
+                "disc_id": row.disc_id,
+                "worktype": row.worktype,
+                "groups": set(),
+                "rooms": set(),
+                "preps": set(),
+            }
+            for row in rows
+        }
+        if not lessons:
+            return []
+
+        relations = (
+            ("groups", ScRasp18Groups.rasp18_id, ScRasp18Groups.group_id),
+            ("rooms", ScRasp18Rooms.rasp18_id, ScRasp18Rooms.room),
+            ("preps", ScRasp18Preps.rasp18_id, ScRasp18Preps.prep_id),
+        )
+        for field, rasp18_id_column, value_column in relations:
+            rows = await self.db_session.execute(
+                select(rasp18_id_column, value_column).where(
+                    rasp18_id_column.in_(lesson_ids)
+                )
+            )
+            for rasp18_id, value in rows:
+                lessons[rasp18_id][field].add(value)
+
+        moves = await self.db_session.execute(
+            select(
+                ScRasp18Move.rasp18_dest_id,
+                ScRasp18Move.src_day_id,
+                ScRasp18Move.src_pair,
+            ).where(ScRasp18Move.rasp18_dest_id.in_(lesson_ids))
+        )
+        for rasp18_id, src_day_id, src_pair in moves:
+            lessons[rasp18_id]["src_day_id"] = src_day_id
+            lessons[rasp18_id]["src_pair"] = src_pair
+
+        return list(lessons.values())
 
     async def create_7day_schedule_entries(
         self, entries: List[ScRasp7], chunk_size: int = 500
@@ -457,6 +799,179 @@ class ScheduleRepository(BaseRepository):
         """Сохраняет записи 18-недельного расписания в БД"""
         return await self.create_entities(entries, chunk_size)
 
+    async def bulk_create_18week_schedule(
+        self, lessons: List[Dict[str, Any]]
+    ) -> List[int]:
+        """
+        Загружает записи 18-недельного расписания вместе со связями через COPY.
+
+        Каждое занятие - словарь с полями ScRasp18 и коллекциями
+        groups (ID групп), rooms (аудитории) и preps (ID преподавателей).
+        ID занятий резервируются заранее, поэтому связи пишутся без обратного
+        чтения вставленных строк. Возвращает ID в порядке входного списка.
+        """
+        lesson_ids = await self.reserve_ids(ScRasp18, len(lessons))
+
+        rasp18_records = []
+        groups_records = []
+        rooms_records = []
+        preps_records = []
+
+        for lesson_id, lesson in zip(lesson_ids, lessons):
+            rasp18_records.append(
+                (
+                    lesson_id,
+                    lesson["semcode"],
+                    lesson["day_id"],
+                    lesson["pair"],
+                    lesson["kind"],
+                    lesson["worktype"],
+                    lesson["disc_id"],
+                    lesson["timestart"],
+                    lesson["timeend"],
+                )
+            )
+            groups_records.extend(
+                (lesson_id, group_id) for group_id in lesson.get("groups", ())
+            )
+            rooms_records.extend((lesson_id, room) for room in lesson.get("rooms", ()))
+            preps_records.extend(
+                (lesson_id, prep_id) for prep_id in lesson.get("preps", ())
+            )
+
+        await self.copy_records(ScRasp18, RASP18_COLUMNS, rasp18_records)
+        await self.copy_records(
+            ScRasp18Groups, ("rasp18_id", "group_id"), groups_records
+        )
+        await self.copy_records(ScRasp18Rooms, ("rasp18_id", "room"), rooms_records)
+        await self.copy_records(ScRasp18Preps, ("rasp18_id", "prep_id"), preps_records)
+
+        return lesson_ids
+
+    async def regenerate_18week_from_7day(
+        self,
+        semcode: int,
+        version: int,
+        group_ids: List[int] = None,
+        commit: bool = True,
+    ) -> Dict[str, int]:
+        """
+        Пересобирает 18-недельное расписание из 7-дневного средствами PostgreSQL:
+        недели из weeksarray разворачиваются через unnest и сопоставляются с днями
+        семестра, записи и связи вставляются через INSERT ... SELECT, так что данные
+        занятий не передаются в приложение. Удаляются записи групп версии
+        (или групп group_ids), в том числе занятия, которых больше нет
+        в 7-дневном расписании; записи других групп и перенесенные пары
+        сохраняются, а слоты перенесенных пар заново не создаются.
+        Возвращает количество созданных и удаленных записей
+        """
+        params = {
+            "semcode": semcode,
+            "version": version,
+            "timestarts": [get_pair_time(pair)[0] for pair in range(1, 8)],
+            "timeends": [get_pair_time(pair)[1] for pair in range(1, 8)],
+        }
+        target_cte = REGENERATE_18WEEK_GROUPS_CTE
+        lessons_filter = ""
+
+        if group_ids:
+            params["group_ids"] = list(group_ids)
+            target_cte = REGENERATE_18WEEK_TARGET_CTE
+            lessons_filter = """AND (d.id, r.pair, r.disc_id, r.worktype) IN (
+                SELECT day_id, pair, disc_id, worktype FROM target
+            )"""
+
+        query = REGENERATE_18WEEK_SQL.format(
+            target_cte=target_cte, lessons_filter=lessons_filter
+        )
+        row = (await self.db_session.execute(text(query), params)).one()
+        if commit:
+            await self.db_session.commit()
+        return {"inserted": row.inserted, "deleted": row.deleted}
+
+    async def get_7day_version_diff(
+        self,
+        semcode_1: int,
+        version_1: int,
+        official_1: bool,
+        semcode_2: int,
+        version_2: int,
+        official_2: bool,
+    ) -> List[Any]:
+        """
+        Различия двух версий 7-дневного расписания, найденные средствами
+        PostgreSQL (см. COMPARE_7DAY_SQL). Строки с weekday = NULL содержат
+        недели группы в версии side, остальные - занятия измененных слотов
+        """
+        params = {
+            "semcode_1": semcode_1,
+            "version_1": version_1,
+            "official_1": official_1,
+            "semcode_2": semcode_2,
+            "version_2": version_2,
+            "official_2": official_2,
+        }
+        return (await self.db_session.execute(text(COMPARE_7DAY_SQL), params)).all()
+
+    async def get_last_import(
+        self, semcode: int, version: int
+    ) -> Optional[ScheduleImport]:
+        """Возвращает последний импорт файла в указанные семкод и версию"""
+        query = (
+            select(ScheduleImport)
+            .where(
+                ScheduleImport.semcode == semcode,
+                ScheduleImport.version == version,
+            )
+            .order_by(ScheduleImport.id.desc())
+            .limit(1)
+        )
+        return (await self.db_session.execute(query)).scalar_one_or_none()
+
+    async def record_import(
+        self,
+        semcode: int,
+        version: int,
+        is_official: bool,
+        content_hash: Optional[str],
+        file_id: Optional[int] = None,
+    ) -> None:
+        self.db_session.add(
+            ScheduleImport(
+                file_id=file_id,
+                semcode=semcode,
+                version=version,
+                is_official=is_official,
+                content_hash=content_hash,
+            )
+        )
+        await self.db_session.commit()
+
+    async def get_import_checkpoint(self, key: str) -> Optional[ImportCheckpoint]:
+        query = select(ImportCheckpoint).where(ImportCheckpoint.key == key)
+        return (await self.db_session.execute(query)).scalar_one_or_none()
+
+    async def create_import_checkpoint(
+        self, key: str, semcode: int, version: int, is_official: bool
+    ) -> ImportCheckpoint:
+        """Создает контрольную точку пакетного импорта (без коммита)"""
+        checkpoint = ImportCheckpoint(
+            key=key,
+            semcode=semcode,
+            version=version,
+            is_official=is_official,
+            completed_groups=[],
+            batches_done=0,
+        )
+        self.db_session.add(checkpoint)
+        await self.db_session.flush()
+        return checkpoint
+
+    async def delete_import_checkpoint(self, key: str) -> None:
+        await self.db_session.execute(
+            delete(ImportCheckpoint).where(ImportCheckpoint.key == key)
+        )
+
     async def create_relations(
         self,
         relations: List[Any],
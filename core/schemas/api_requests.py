@@ -41,3 +41,17 @@ class ImportFromFileRequest(BaseModel):
     semcode: Optional[int] = None
     version: int = 1
     is_official: bool = False
+    incremental: bool = False
+    background: bool = False
+    batched: bool = False
+    batch_size: Optional[int] = None
+    # Импортировать только указанные группы файла
+    groups: Optional[List[str]] = None
+
+
+class Regenerate18WeekRequest(BaseModel):
+    """Запрос на пересборку 18-недельного расписания из 7-дневного"""
+
+    semcode: Optional[int] = None
+    version: int = 1
+    groups: Optional[List[str]] = None
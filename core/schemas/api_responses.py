@@ -1,5 +1,5 @@
 from typing import Any, Dict, List, Optional, Union
-from datetime import date
+from datetime import date, datetime
 
 from core.schemas.base import BaseModel
 from core.schemas.schedule import (
@@ -20,6 +20,8 @@ class FileResponseModel(BaseModel):
     is_official: bool = False
     group_count: Optional[int] = None
     group_names: Optional[List[str]] = None
+    job_id: Optional[int] = None
+    cache_hit: bool = False
 
 
 class FileListResponseModel(BaseModel):
@@ -64,6 +66,10 @@ class ImportResultResponseModel(BaseModel):
     imported_to_db: bool
     semcode: int
     is_official: bool
+    inserted_lessons: int = 0
+    deleted_lessons: int = 0
+    unchanged_lessons: int = 0
+    cache_hit: bool = False
 
 
 class LessonMoveResponseModel(BaseModel):
@@ -84,13 +90,27 @@ class LessonCreateMultipleResponseModel(BaseModel):
     total_errors: int
 
 
-class GroupDownloadResponseModel(BaseModel):
-    """Модель ответа при скачивании расписаний групп"""
+class JobResponseModel(BaseModel):
+    """Модель состояния фоновой задачи"""
 
     id: int
-    name: str
-    created_at: str
-    group_count: int
-    imported_to_db: bool
-    semcode: int
-    is_official: bool
+    kind: str
+    status: str
+    progress: int
+    progress_message: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class JobProgressResponseModel(BaseModel):
+    """Модель прогресса фоновой задачи"""
+
+    id: int
+    status: str
+    progress: int
+    progress_message: Optional[str] = None
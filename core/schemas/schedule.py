@@ -16,8 +16,22 @@ class LessonData(BaseModel):
     lesson_type_id: Optional[Union[str, int]] = None
 
 
+class ScheduleLesson(LessonData):
+    """
+    Занятие в компактном формате: одна запись на все недели, в которые оно
+    проводится в слоте (день, пара)
+    """
+
+    day: str
+    pair: str
+    weeks: int = 0  # битовая маска недель, бит n-1 соответствует неделе n
+
+
 class WeekSchedule(BaseModel):
-    """Модель расписания на конкретную неделю"""
+    """
+    Модель расписания на конкретную неделю (прежний формат standardized_content,
+    читается через core.utils.schedule_content)
+    """
 
     week_number: int
     weekday_schedules: Dict[str, Dict[str, LessonData]] = {}
@@ -27,7 +41,7 @@ class ScheduleResult(BaseModel):
     """Результат конвертации файла с расписанием"""
 
     group_name: str = ""
-    week_schedules: Dict[int, WeekSchedule] = {}
+    lessons: List[ScheduleLesson] = []
 
 
 # Модели для API-ответов
@@ -142,6 +156,20 @@ class ScheduleImportResultModel(BaseModel):
     imported_groups: List[str] = []
     total_groups: int
     is_official: bool
+    inserted_lessons: int = 0
+    deleted_lessons: int = 0
+    unchanged_lessons: int = 0
+    cache_hit: bool = False
+
+
+class ScheduleRegenerateResultModel(BaseModel):
+    """Результат пересборки 18-недельного расписания"""
+
+    semcode: int
+    version: int
+    groups: List[str] = []
+    inserted_lessons: int = 0
+    deleted_lessons: int = 0
 
 
 # Модели для результатов сравнения расписаний
@@ -236,3 +264,23 @@ class ScheduleComparisonResultModel(BaseModel):
     """Полный результат сравнения расписаний"""
 
     groups: Dict[str, GroupComparisonModel] = {}
+
+
+class GroupChangeCountsModel(BaseModel):
+    """
+    Количество изменений группы без подробностей: added, removed и modified
+    совпадают с числом записей в details полного сравнения, total и
+    summary - с его total и summary
+    """
+
+    total: int = 0
+    added: int = 0
+    removed: int = 0
+    modified: int = 0
+    summary: ChangeSummaryModel = ChangeSummaryModel()
+
+
+class ScheduleComparisonSummaryModel(BaseModel):
+    """Результат сравнения расписаний в режиме summary"""
+
+    groups: Dict[str, GroupChangeCountsModel] = {}
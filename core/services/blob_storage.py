@@ -0,0 +1,131 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Any, BinaryIO, Callable, Dict, Optional, Type
+
+from core.settings.app_config import settings
+
+
+class BlobStorage(ABC):
+    """
+    Хранилище исходных файлов с адресацией по содержимому: ключ файла -
+    SHA-256 его данных, поэтому одинаковые файлы хранятся один раз
+    """
+
+    @staticmethod
+    def compute_key(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @abstractmethod
+    def put(self, data: bytes) -> str:
+        """Сохраняет данные и возвращает их ключ"""
+
+    def put_file(self, path: str, key: str) -> str:
+        """
+        Сохраняет файл с диска, key - SHA-256 его содержимого, посчитанный
+        при записи файла. Файл по пути path после вызова может быть перемещен
+        """
+        with open(path, "rb") as source:
+            return self.put(source.read())
+
+    @abstractmethod
+    def read(self, key: str) -> bytes:
+        """Данные по ключу, FileNotFoundError - если их нет"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Удаляет данные по ключу, если они есть"""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """
+        Путь к файлу на диске для отдачи через sendfile, None - если
+        хранилище не локальное
+        """
+        return None
+
+
+class LocalBlobStorage(BlobStorage):
+    """Каталог на диске: ключ ab12... хранится в файле <root>/ab/12/ab12..."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, data: bytes) -> str:
+        key = self.compute_key(data)
+        path = self._path(key)
+        if os.path.exists(path):
+            return key
+
+        self._write(path, lambda temp_file: temp_file.write(data))
+        return key
+
+    def put_file(self, path: str, key: str) -> str:
+        target = self._path(key)
+        if os.path.exists(target):
+            return key
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            # Файл в той же файловой системе просто переименовывается
+            os.replace(path, target)
+        except OSError:
+            with open(path, "rb") as source:
+                self._write(
+                    target, lambda temp_file: shutil.copyfileobj(source, temp_file)
+                )
+        return key
+
+    @staticmethod
+    def _write(path: str, write: Callable[[BinaryIO], Any]) -> None:
+        """
+        Запись во временный файл и переименование: другие процессы
+        не увидят частично записанный файл
+        """
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                write(temp_file)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def read(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as blob_file:
+            return blob_file.read()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
+
+
+# Хранилища по значению настройки BLOB_STORAGE. При значении "database"
+# исходные файлы хранятся в schedule_files.file_data, как раньше
+BLOB_STORAGES: Dict[str, Type[BlobStorage]] = {
+    "local": LocalBlobStorage,
+}
+
+
+def create_blob_storage() -> Optional[BlobStorage]:
+    """Хранилище из настроек, None - если файлы хранятся в БД"""
+    if settings.BLOB_STORAGE == "database":
+        return None
+    if settings.BLOB_STORAGE not in BLOB_STORAGES:
+        raise ValueError(f"Неизвестное хранилище файлов: {settings.BLOB_STORAGE}")
+    return BLOB_STORAGES[settings.BLOB_STORAGE](settings.BLOB_STORAGE_PATH)
+
+
+blob_storage = create_blob_storage()
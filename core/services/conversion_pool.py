@@ -0,0 +1,173 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from core.settings.app_config import settings
+
+
+class ConversionPoolBusyError(RuntimeError):
+    """Очередь пула заполнена"""
+
+
+class ConversionTimeoutError(RuntimeError):
+    """Задача пула не уложилась в отведенное время"""
+
+
+def _init_worker() -> None:
+    """
+    Прогревает процесс пула: импортирует openpyxl, конвертеры Excel и ICS
+    (ICS разбирается без icalendar, повторения - через dateutil.rrule)
+    и сервис сравнения расписаний
+    """
+    # Импорты выполняются при старте процесса, а не при первой задаче
+    import openpyxl  # noqa: F401
+
+    from core.services.converters import StandardContentConverter  # noqa: F401
+    from core.services.schedule_compare import ScheduleCompareService  # noqa: F401
+
+
+def _ping() -> bool:
+    return True
+
+
+def convert_file_data(file_data: bytes, file_format: str) -> Optional[Dict[str, dict]]:
+    """
+    Конвертирует файл в standardized_content ({группа: {"lessons": [...]}})
+    со всеми группами файла, None - если формат не распознан или групп нет.
+    Выполняется в процессе пула, результат - словарь из примитивов,
+    который дешево передается между процессами
+    """
+    from core.services.converters import StandardContentConverter
+
+    try:
+        group_schedules = StandardContentConverter().convert(file_data, file_format)
+    except ValueError:
+        return None
+
+    return _schedules_to_content(group_schedules)
+
+
+def convert_file_path(path: str, file_format: str) -> Optional[Dict[str, dict]]:
+    """
+    То же, что convert_file_data, но файл читается процессом пула с диска:
+    между процессами передается только путь
+    """
+    from core.services.converters import StandardContentConverter
+
+    try:
+        group_schedules = StandardContentConverter().convert_file(path, file_format)
+    except ValueError:
+        return None
+
+    return _schedules_to_content(group_schedules)
+
+
+def _schedules_to_content(group_schedules) -> Optional[Dict[str, dict]]:
+    from core.utils.schedule_content import schedule_to_content
+
+    if not group_schedules:
+        return None
+
+    return {
+        group_name: schedule_to_content(schedule_result)
+        for group_name, schedule_result in group_schedules.items()
+    }
+
+
+class ConversionPool:
+    """
+    Пул процессов для конвертации Excel/ICS файлов и другой работы,
+    нагружающей процессор (сравнение расписаний), чтобы она не блокировала
+    цикл событий. Очередь и число процессов общие для всех задач
+    """
+
+    def __init__(
+        self,
+        max_workers: int = settings.CONVERTER_WORKERS,
+        timeout: float = settings.CONVERTER_TIMEOUT,
+        max_queue: int = settings.CONVERTER_MAX_QUEUE,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.max_queue = max(1, max_queue)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Создает пул и заранее запускает все процессы"""
+        if self._executor:
+            return
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        for _ in range(self.max_workers):
+            self._executor.submit(_ping)
+
+    def shutdown(self) -> None:
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _task_done(self, _: Future) -> None:
+        # Вызывается из служебного потока пула
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Выполняет func(*args) в процессе пула. func и аргументы должны
+        передаваться между процессами. Если в очереди уже max_queue задач,
+        выбрасывает ConversionPoolBusyError, если задача дольше timeout
+        секунд - ConversionTimeoutError
+        """
+        self.start()
+
+        # Задача занимает место в очереди, пока процесс ее не завершит,
+        # даже если ожидание прервано по таймауту
+        with self._lock:
+            if self._in_flight >= self.max_queue:
+                raise ConversionPoolBusyError(
+                    "Сервис обработки файлов перегружен, повторите попытку позже"
+                )
+            self._in_flight += 1
+
+        try:
+            future = self._executor.submit(func, *args)
+        except BrokenProcessPool:
+            # Один из процессов упал (например, по памяти) - пересоздаем пул
+            self.shutdown()
+            self.start()
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._task_done(None)
+            raise
+        future.add_done_callback(self._task_done)
+
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            raise ConversionTimeoutError("Превышено время ожидания обработки файла")
+
+    async def convert(
+        self, file_data: bytes, file_format: str
+    ) -> Optional[Dict[str, dict]]:
+        """Конвертирует файл в процессе пула, см. run"""
+        return await self.run(convert_file_data, file_data, file_format)
+
+    async def convert_path(
+        self, path: str, file_format: str
+    ) -> Optional[Dict[str, dict]]:
+        """Конвертирует файл с диска в процессе пула, см. run"""
+        return await self.run(convert_file_path, path, file_format)
+
+
+conversion_pool = ConversionPool()
@@ -2,8 +2,8 @@ from abc import ABC, abstractmethod
 from typing import Dict, List
 from datetime import datetime, timedelta
 
-from core.schemas.schedule import LessonData, WeekSchedule, ScheduleResult
-from core.utils.maps import WEEKDAYS
+from core.schemas.schedule import LessonData, ScheduleResult
+from core.utils.schedule_content import add_lesson
 
 
 class BaseConverter(ABC):
@@ -18,6 +18,13 @@ class BaseConverter(ABC):
         """Конвертирование файла в стандартный формат расписания"""
         pass
 
+    def convert_all(self, file_data: bytes) -> Dict[str, ScheduleResult]:
+        """Конвертирование файла с расписаниями всех групп, которые в нем есть"""
+        result = self.convert(file_data)
+        if not result.group_name and not result.lessons:
+            return {}
+        return {result.group_name: result}
+
     def _convert_full_name(self, full_name: str) -> str:
         """Конвертирует ФИО в сокращенный формат"""
         if not full_name:
@@ -35,28 +42,13 @@ class BaseConverter(ABC):
         delta = date.date() - self.start_of_semester.date()
         return delta.days // 7 + 1  # Номер недели (начиная с 1)
 
-    def _create_week_schedule(self, week_number: int) -> WeekSchedule:
-        """Создать структуру расписания для конкретной недели"""
-        return WeekSchedule(
-            week_number=week_number,
-            weekday_schedules={weekday: {} for weekday in WEEKDAYS},
-        )
-
     def _add_lesson_to_schedule(
         self,
         result: ScheduleResult,
-        week_number: int,
+        weeks: int,
         weekday: str,
         lesson_num: str,
         lesson_data: LessonData,
     ):
-        """Добавить занятие в расписание на конкретную неделю"""
-        if week_number not in result.week_schedules:
-            result.week_schedules[week_number] = self._create_week_schedule(week_number)
-
-        if weekday not in result.week_schedules[week_number].weekday_schedules:
-            result.week_schedules[week_number].weekday_schedules[weekday] = {}
-
-        result.week_schedules[week_number].weekday_schedules[weekday][
-            lesson_num
-        ] = lesson_data
+        """Добавить занятие в расписание на недели из битовой маски weeks"""
+        add_lesson(result, weeks, weekday, lesson_num, lesson_data)
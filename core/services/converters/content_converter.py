@@ -1,4 +1,4 @@
-from io import BytesIO
+import mmap
 from typing import Dict
 
 from core.services.converters.excel_converter import ExcelConverter
@@ -14,19 +14,37 @@ class StandardContentConverter:
         self.ics_converter = ICSConverter()
         self.supported_formats = {"xlsx": self._convert_excel, "ics": self._convert_ics}
 
-    def convert(self, file_data: bytes, file_format: str) -> ScheduleResult:
+    def convert(self, file_data: bytes, file_format: str) -> Dict[str, ScheduleResult]:
         """
-        Конвертировать файл в стандартный формат
+        Конвертировать файл в стандартный формат: {группа: расписание}
+        для всех групп файла
         """
         if file_format not in self.supported_formats:
             raise ValueError(f"Неподдерживаемый формат файла: {file_format}")
 
         return self.supported_formats[file_format](file_data)
 
-    def _convert_excel(self, file_data: bytes) -> ScheduleResult:
+    def convert_file(self, path: str, file_format: str) -> Dict[str, ScheduleResult]:
+        """
+        То же, что convert, но файл читается с диска без загрузки в память
+        целиком: книга Excel открывается по пути, ICS-файл отображается
+        в память через mmap
+        """
+        if file_format not in self.supported_formats:
+            raise ValueError(f"Неподдерживаемый формат файла: {file_format}")
+
+        if file_format == "xlsx":
+            return self.excel_converter.convert_all(path)
+
+        with open(path, "rb") as file, mmap.mmap(
+            file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as file_data:
+            return self.supported_formats[file_format](file_data)
+
+    def _convert_excel(self, file_data: bytes) -> Dict[str, ScheduleResult]:
         """Конвертировать Excel файл в стандартный формат"""
-        return self.excel_converter.convert(file_data)
+        return self.excel_converter.convert_all(file_data)
 
-    def _convert_ics(self, file_data: bytes) -> ScheduleResult:
+    def _convert_ics(self, file_data: bytes) -> Dict[str, ScheduleResult]:
         """Конвертировать ICS файл в стандартный формат"""
-        return self.ics_converter.convert(file_data)
+        return self.ics_converter.convert_all(file_data)
@@ -1,148 +1,180 @@
+import re
 from io import BytesIO
-from typing import Dict
+from typing import Dict, List, Optional, Sequence, Union
 from openpyxl import load_workbook
 
 from core.settings.app_config import settings
 from core.schemas.schedule import LessonData, ScheduleResult
 from core.utils.maps import WEEKDAYS, COLUMN_MAPS
+from core.utils.schedule_content import weeks_to_mask
 from core.services.converters.base_converter import BaseConverter
 
+FIRST_BLOCK_SIZE = 10
+SECOND_BLOCK_SIZE = 5
+HEADER_ROW = 2
+FIRST_DATA_ROW = 4
+ROWS_PER_DAY = 14
 
-class ExcelConverter(BaseConverter):
-    """Конвертер для Excel-файлов расписания"""
 
-    def convert(self, file_data: bytes) -> ScheduleResult:
-        """Конвертировать Excel-файл в стандартный формат"""
-        wb = load_workbook(BytesIO(file_data))
+class _GroupBlock:
+    """Блок столбцов одной группы на листе"""
 
-        results: Dict[str, ScheduleResult] = {}
+    __slots__ = ("offset", "column_map", "result", "last_teacher", "lessons")
+
+    def __init__(self, offset: int, column_map: Dict[int, str], result):
+        self.offset = offset
+        self.column_map = column_map
+        self.result = result
+        self.last_teacher: Optional[str] = None
+        self.lessons: list = []
 
-        for sheet in wb.worksheets:
-            self._process_sheet(sheet, results)
 
+class ExcelConverter(BaseConverter):
+    """Конвертер для Excel-файлов расписания"""
+
+    def __init__(self, group_pattern: Optional[str] = None):
+        super().__init__()
+        # Столбец относится к группе, если заголовок совпадает с шаблоном
+        self.group_pattern = re.compile(group_pattern or settings.EXCEL_GROUP_PATTERN)
+
+    def convert(self, file_data: bytes) -> ScheduleResult:
+        """Конвертировать Excel-файл и вернуть расписание первой группы"""
+        results = self.convert_all(file_data)
         if not results:
             return ScheduleResult()
 
         return next(iter(results.values()))
 
+    def convert_all(self, file_data: Union[bytes, str]) -> Dict[str, ScheduleResult]:
+        """
+        Конвертировать Excel-файл за один разбор книги и вернуть расписания
+        всех групп со всех листов. file_data - содержимое файла или путь к нему
+        """
+        # read_only: строки читаются потоком, модель листа целиком не строится
+        wb = load_workbook(
+            BytesIO(file_data) if isinstance(file_data, bytes) else file_data,
+            read_only=True,
+        )
+
+        results: Dict[str, ScheduleResult] = {}
+
+        try:
+            for sheet in wb.worksheets:
+                self._process_sheet(sheet, results)
+        finally:
+            wb.close()
+
+        return results
+
     def _process_sheet(self, sheet, results: Dict[str, ScheduleResult]):
-        """Обработать лист Excel"""
-        block_size_first_type = 10
-        block_size_second_type = 5
-        max_columns = sheet.max_column
+        """
+        Обработать лист Excel за один проход по строкам: каждая строка
+        читается один раз и передается во все блоки групп
+        """
+        # Размеры в файле могут быть указаны неверно, строки берутся как есть
+        sheet.reset_dimensions()
+        last_row = FIRST_DATA_ROW + len(WEEKDAYS) * ROWS_PER_DAY - 1
+        rows = sheet.iter_rows(min_row=HEADER_ROW, max_row=last_row, values_only=True)
+
+        header = next(rows, None)
+        blocks = self._find_group_blocks(header or (), results)
+        if not blocks:
+            return
+
+        odd_weeks = weeks_to_mask(range(1, self.total_weeks + 1, 2))  # 1, 3, 5, ...
+        even_weeks = weeks_to_mask(range(2, self.total_weeks + 1, 2))  # 2, 4, 6, ...
+
+        for row_idx, values in enumerate(rows, start=HEADER_ROW + 1):
+            if row_idx < FIRST_DATA_ROW or not values:
+                continue
+
+            weekday = WEEKDAYS[(row_idx - FIRST_DATA_ROW) // ROWS_PER_DAY]
+            lesson_num = str(((row_idx - FIRST_DATA_ROW) % ROWS_PER_DAY) // 2 + 1)
+            # четные строки - нечетные недели, нечетные строки - четные недели
+            weeks = odd_weeks if row_idx % 2 == 0 else even_weeks
+
+            for block in blocks:
+                self._process_row(block, values, weekday, lesson_num, weeks)
+
+        # Занятия добавляются поблочно, как при последовательном обходе блоков
+        for block in blocks:
+            for weekday, lesson_num, weeks, lesson in block.lessons:
+                self._add_lesson_to_schedule(
+                    block.result, weeks, weekday, lesson_num, LessonData(**lesson)
+                )
+
+    def _find_group_blocks(
+        self, header: Sequence, results: Dict[str, ScheduleResult]
+    ) -> List[_GroupBlock]:
+        """Найти блоки групп по заголовкам во второй строке листа"""
+        blocks = []
+        max_columns = len(header)
+
+        def add_block(col: int, offset: int, column_map: Dict[int, str]):
+            # col - номер столбца с 1, как в Excel
+            cell_value = header[col - 1] if col <= max_columns else None
+            if cell_value and self.group_pattern.search(str(cell_value)):
+                group_name = str(cell_value).strip()
+                if group_name not in results:
+                    results[group_name] = ScheduleResult(group_name=group_name)
+                blocks.append(_GroupBlock(offset, column_map, results[group_name]))
 
         for start_col in range(
-            1, max_columns + 1, block_size_first_type + block_size_second_type
+            1, max_columns + 1, FIRST_BLOCK_SIZE + SECOND_BLOCK_SIZE
         ):
-            if start_col + 5 <= max_columns:
-                cell_value = sheet.cell(row=2, column=start_col + 5).value
-                if cell_value and "КМБО" in str(cell_value):
-                    group_name = str(cell_value).strip()
-                    if group_name not in results:
-                        results[group_name] = ScheduleResult(group_name=group_name)
-
-                    self._process_block(
-                        sheet,
-                        start_col,
-                        start_col + 9,
-                        results[group_name],
-                        COLUMN_MAPS["1"],
-                    )
-
-            if start_col + block_size_first_type <= max_columns:
-                cell_value = sheet.cell(
-                    row=2, column=start_col + block_size_first_type
-                ).value
-                if cell_value and "КМБО" in str(cell_value):
-                    group_name = str(cell_value).strip()
-                    if group_name not in results:
-                        results[group_name] = ScheduleResult(group_name=group_name)
-
-                    self._process_block(
-                        sheet,
-                        start_col + block_size_first_type,
-                        start_col + block_size_first_type + 4,
-                        results[group_name],
-                        COLUMN_MAPS["2"],
-                    )
-
-    def _process_block(
-        self, sheet, start_col, end_col, result: ScheduleResult, column_map
+            add_block(start_col + 5, start_col - 1, COLUMN_MAPS["1"])
+            add_block(
+                start_col + FIRST_BLOCK_SIZE,
+                start_col + FIRST_BLOCK_SIZE - 1,
+                COLUMN_MAPS["2"],
+            )
+
+        return blocks
+
+    def _process_row(
+        self,
+        block: _GroupBlock,
+        values: Sequence,
+        weekday: str,
+        lesson_num: str,
+        weeks: int,
     ):
-        """Обработать блок Excel и извлечь данные расписания"""
-        last_teacher = None
-
-        for row in range(4, sheet.max_row + 1):
-            weekday_num = (row - 4) // 14
-            if weekday_num >= len(WEEKDAYS):
-                continue
-
-            weekday = WEEKDAYS[weekday_num]
-            lesson_num = str(((row - 4) % 14) // 2 + 1)
-            is_even_row = row % 2 == 0
-
-            week_numbers = []
-            if is_even_row:  # нечетные недели (odd)
-                week_numbers = list(
-                    range(1, self.total_weeks + 1, 2)
-                )  # 1, 3, 5, 7, ...
-            else:  # четные недели (even)
-                week_numbers = list(
-                    range(2, self.total_weeks + 1, 2)
-                )  # 2, 4, 6, 8, ...
-
-            lesson_data = LessonData()
-
-            for col_idx, col in enumerate(range(start_col, end_col + 1)):
-                cell_value = sheet.cell(row=row, column=col).value
-                if cell_value:
-                    if col_idx in column_map:
-                        field = column_map[col_idx]
-                        if field == "title":
-                            lesson_data.subject = str(cell_value)
-                        elif field == "fio":
-                            lesson_data.teacher = str(cell_value)
-                        elif field == "lesson_type":
-                            for type_prefix, type_id in settings.LESSON_TYPES.items():
-                                if str(cell_value).strip() == type_prefix:
-                                    lesson_data.lesson_type = type_prefix
-                                    lesson_data.lesson_type_id = type_id
-                                    break
-                        elif field == "room":
-                            room_parts = (
-                                str(cell_value)
-                                .replace("ауд. ", "")
-                                .replace("комп. ", "")
-                                .split()
-                            )
-                            lesson_data.room = room_parts[0] if room_parts else ""
-                            lesson_data.campus = (
-                                room_parts[1].replace("(", "").replace(")", "")
-                                if len(room_parts) > 1
-                                else ""
-                            )
-
-            if len(lesson_data.subject) < 3:
+        """Извлечь занятие блока из строки Excel"""
+        lesson = {}
+        row_width = len(values)
+
+        for col_idx, field in block.column_map.items():
+            col = block.offset + col_idx
+            cell_value = values[col] if col < row_width else None
+            if not cell_value:
                 continue
 
-            if not lesson_data.teacher and lesson_data.subject and last_teacher:
-                lesson_data.teacher = last_teacher
-            elif lesson_data.teacher:
-                last_teacher = lesson_data.teacher
-
-            if any(
-                getattr(lesson_data, attr) for attr in ["subject", "teacher", "room"]
-            ):
-                for week_number in week_numbers:
-                    week_lesson_data = LessonData(
-                        subject=lesson_data.subject,
-                        teacher=lesson_data.teacher,
-                        room=lesson_data.room,
-                        campus=lesson_data.campus,
-                        lesson_type=lesson_data.lesson_type,
-                        lesson_type_id=lesson_data.lesson_type_id,
-                    )
-
-                    self._add_lesson_to_schedule(
-                        result, week_number, weekday, lesson_num, week_lesson_data
-                    )
+            if field == "title":
+                lesson["subject"] = str(cell_value)
+            elif field == "fio":
+                lesson["teacher"] = str(cell_value)
+            elif field == "lesson_type":
+                type_prefix = str(cell_value).strip()
+                if type_prefix in settings.LESSON_TYPES:
+                    lesson["lesson_type"] = type_prefix
+                    lesson["lesson_type_id"] = settings.LESSON_TYPES[type_prefix]
+            elif field == "room":
+                room_parts = (
+                    str(cell_value).replace("ауд. ", "").replace("комп. ", "").split()
+                )
+                lesson["room"] = room_parts[0] if room_parts else ""
+                lesson["campus"] = (
+                    room_parts[1].replace("(", "").replace(")", "")
+                    if len(room_parts) > 1
+                    else ""
+                )
+
+        if len(lesson.get("subject", "")) < 3:
+            return
+
+        if not lesson.get("teacher") and block.last_teacher:
+            lesson["teacher"] = block.last_teacher
+        elif lesson.get("teacher"):
+            block.last_teacher = lesson["teacher"]
+
+        block.lessons.append((weekday, lesson_num, weeks, lesson))
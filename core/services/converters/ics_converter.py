@@ -1,13 +1,100 @@
-from typing import Dict, List
-from datetime import datetime, timedelta
+import re
+from typing import Dict, List, Optional, Set, Tuple, Union
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from dateutil import rrule as dateutil_rrule
-from icalendar import Calendar
 
 from core.settings.app_config import settings
 from core.schemas.schedule import LessonData, ScheduleResult
 from core.utils.maps import WEEKDAYS, TIME_TO_LESSON
 from core.services.converters.base_converter import BaseConverter
 
+# Перенос строки (RFC 5545, 3.1): CRLF/LF и пробел или табуляция
+FOLDED_LINE = re.compile(rb"\r?\n[ \t]")
+TEXT_ESCAPE = re.compile(r"\\([\\;,nN])")
+TEXT_UNESCAPED = {"\\": "\\", ";": ";", ",": ",", "n": "\n", "N": "\n"}
+
+
+class _ICSEvent:
+    """Свойства VEVENT, нужные для конвертации"""
+
+    __slots__ = ("dtstart", "summary", "description", "location", "rrule", "exdates")
+
+    def __init__(self):
+        self.dtstart: Optional[Union[datetime, date]] = None
+        self.summary = ""
+        self.description = ""
+        self.location = ""
+        self.rrule: Dict[str, str] = {}
+        self.exdates: Set[Union[datetime, date]] = set()
+
+
+def _unescape_text(value: str) -> str:
+    if "\\" not in value:
+        return value
+    return TEXT_ESCAPE.sub(lambda match: TEXT_UNESCAPED[match.group(1)], value)
+
+
+def _split_content_line(line: str) -> Tuple[str, Dict[str, str], str]:
+    """Разбирает строку содержимого на имя свойства, параметры и значение"""
+    if '"' in line:
+        # Двоеточие и точка с запятой внутри кавычек не являются разделителями
+        parts = []
+        start = 0
+        quoted = False
+        value = ""
+        for index, char in enumerate(line):
+            if char == '"':
+                quoted = not quoted
+            elif not quoted and char == ";":
+                parts.append(line[start:index])
+                start = index + 1
+            elif not quoted and char == ":":
+                parts.append(line[start:index])
+                value = line[index + 1 :]
+                break
+    else:
+        head, _, value = line.partition(":")
+        parts = head.split(";")
+
+    params = {}
+    for param in parts[1:]:
+        key, _, param_value = param.partition("=")
+        params[key.upper()] = param_value.strip('"')
+
+    return parts[0].upper(), params, value
+
+
+def _get_tz(params: Dict[str, str]):
+    tzid = params.get("TZID")
+    if not tzid:
+        return None
+    try:
+        return ZoneInfo(tzid)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def _parse_date_time(value: str, tz=None) -> Optional[Union[datetime, date]]:
+    """Разбирает значение DATE (YYYYMMDD) или DATE-TIME (YYYYMMDDTHHMMSS[Z])"""
+    value = value.strip()
+    try:
+        if len(value) == 8:
+            return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+        if value.endswith("Z"):
+            tz = timezone.utc
+        return datetime(
+            int(value[:4]),
+            int(value[4:6]),
+            int(value[6:8]),
+            int(value[9:11]),
+            int(value[11:13]),
+            int(value[13:15]),
+            tzinfo=tz,
+        )
+    except ValueError:
+        return None
+
 
 class ICSConverter(BaseConverter):
     """Конвертер для ICS-файлов расписания"""
@@ -27,36 +114,87 @@ class ICSConverter(BaseConverter):
         }
 
     def convert(self, file_data: bytes) -> ScheduleResult:
-        """Конвертировать ICS-файл в стандартный формат"""
-        cal = Calendar.from_ical(file_data)
-        group_name = str(cal.get("X-WR-CALNAME"))
-        event_dates = []
+        """
+        Конвертировать ICS-файл в стандартный формат. Файл разбирается одним
+        проходом по строкам, начало семестра вычисляется по ходу разбора
+        """
+        group_name = ""
+        events: List[_ICSEvent] = []
+        earliest_date = None
         semester_events = []
 
-        result = ScheduleResult(group_name=group_name)
+        calendars = 0
+        components: List[str] = []
+        event = None
 
-        for component in cal.walk():
-            if component.name == "VEVENT":
-                start_date = None
-                if component.get("dtstart"):
-                    start_date = component.get("dtstart").dt
+        lines = FOLDED_LINE.sub(b"", file_data).decode("utf-8-sig").split("\n")
+        for line in lines:
+            line = line.rstrip("\r")
+            if not line:
+                continue
+
+            name, params, value = _split_content_line(line)
+
+            if name == "BEGIN":
+                component = value.strip().upper()
+                if component == "VCALENDAR" and not components:
+                    calendars += 1
+                    if calendars > 1:
+                        raise ValueError("Файл содержит несколько календарей")
+                elif component == "VEVENT":
+                    event = _ICSEvent()
+                components.append(component)
+                continue
 
-                summary = str(component.get("summary", ""))
+            if name == "END":
+                component = components.pop() if components else None
+                if component != "VEVENT" or event is None:
+                    continue
 
-                if isinstance(start_date, datetime):
-                    event_dates.append(start_date)
+                events.append(event)
+                if isinstance(event.dtstart, datetime):
+                    if earliest_date is None or event.dtstart < earliest_date:
+                        earliest_date = event.dtstart
 
-                if "неделя" in summary:
+                if "неделя" in event.summary:
                     try:
-                        week_num = int(summary.split()[0])
-                        semester_events.append((start_date, week_num))
+                        week_num = int(event.summary.split()[0])
+                        semester_events.append((event.dtstart, week_num))
                     except (ValueError, IndexError):
                         pass
 
-        if not event_dates:
+                event = None
+                continue
+
+            current = components[-1] if components else None
+
+            if current == "VCALENDAR" and name == "X-WR-CALNAME":
+                group_name = _unescape_text(value)
+            elif current != "VEVENT" or event is None:
+                # Свойства вложенных компонентов (например, VALARM) пропускаются
+                continue
+            elif name == "DTSTART":
+                event.dtstart = _parse_date_time(value, _get_tz(params))
+            elif name == "SUMMARY":
+                event.summary = _unescape_text(value)
+            elif name == "DESCRIPTION":
+                event.description = _unescape_text(value)
+            elif name == "LOCATION":
+                event.location = _unescape_text(value)
+            elif name == "RRULE":
+                for part in value.split(";"):
+                    key, _, rule_value = part.partition("=")
+                    event.rrule[key.upper()] = rule_value
+            elif name == "EXDATE":
+                tz = _get_tz(params)
+                for exdate in value.split(","):
+                    exdate = _parse_date_time(exdate, tz)
+                    if exdate is not None:
+                        event.exdates.add(exdate)
+
+        if earliest_date is None:
             return ScheduleResult()
 
-        earliest_date = min(event_dates)
         self.start_of_semester = earliest_date - timedelta(days=earliest_date.weekday())
 
         if semester_events:
@@ -66,28 +204,27 @@ class ICSConverter(BaseConverter):
                 date for date, _ in semester_events
             ) + timedelta(days=6)
 
-        for component in cal.walk():
-            if component.name == "VEVENT":
-                self._process_event(component, result)
+        result = ScheduleResult(group_name=group_name)
+
+        for event in events:
+            self._process_event(event, result)
 
         return result
 
-    def _process_event(self, component, result: ScheduleResult):
+    def _process_event(self, event: _ICSEvent, result: ScheduleResult):
         """Обработать событие и добавить его в расписание"""
-        start_date = component.get("dtstart").dt
+        start_date = event.dtstart
         if not isinstance(start_date, datetime):
             return
 
-        summary = str(component.get("summary", ""))
-        description = str(component.get("description", ""))
-        location = str(component.get("location", ""))
+        summary = event.summary
 
         if "неделя" in summary and len(summary.split()) <= 2:
             return
 
         subject, lesson_type, lesson_type_id = self._extract_subject_type(summary)
-        room, campus = self._extract_room_campus(location)
-        teacher = self._extract_teacher(description)
+        room, campus = self._extract_room_campus(event.location)
+        teacher = self._extract_teacher(event.description)
 
         weekday = WEEKDAYS[start_date.weekday()]
         lesson_num = str(self._get_lesson_number(start_date))
@@ -95,26 +232,18 @@ class ICSConverter(BaseConverter):
         if lesson_num == "0":
             return
 
-        occurrences = self._get_event_occurrences(component)
-
-        for occurrence in occurrences:
-            week_number = self._get_week_number(occurrence)
-
-            if week_number < 1 or week_number > self.total_weeks:
-                continue
-
-            lesson_data = LessonData(
-                subject=subject,
-                teacher=teacher,
-                room=room,
-                campus=campus,
-                lesson_type=lesson_type,
-                lesson_type_id=lesson_type_id,
-            )
+        lesson_data = LessonData(
+            subject=subject,
+            teacher=teacher,
+            room=room,
+            campus=campus,
+            lesson_type=lesson_type,
+            lesson_type_id=lesson_type_id,
+        )
 
-            self._add_lesson_to_schedule(
-                result, week_number, weekday, lesson_num, lesson_data
-            )
+        self._add_lesson_to_schedule(
+            result, self._get_event_weeks(event), weekday, lesson_num, lesson_data
+        )
 
     def _extract_subject_type(self, summary: str) -> tuple:
         """Извлечь название предмета и тип занятия из заголовка"""
@@ -197,58 +326,79 @@ class ICSConverter(BaseConverter):
         delta = date.date() - self.start_of_semester.date()
         return delta.days // 7 + 1  # Номер недели (начиная с 1)
 
-    def _get_event_occurrences(self, component) -> List[datetime]:
-        """Получить все даты проведения занятия с учетом правил повторения и исключений"""
-        start_date = component.get("dtstart").dt
-        if not isinstance(start_date, datetime):
-            return []
-
-        rrule_dict = component.get("RRULE", {})
-        if not rrule_dict:
-            return [start_date]
-
-        exdates = []
-        if "EXDATE" in component:
-            for exdate in component.get("EXDATE", []).dts:
-                if isinstance(exdate, list):
-                    for ex_dt in exdate:
-                        if hasattr(ex_dt, "dt"):
-                            exdates.append(ex_dt.dt)
-                elif hasattr(exdate, "dt"):
-                    exdates.append(exdate.dt)
-
-        freq = rrule_dict.get("FREQ", ["WEEKLY"])[0]
-        interval = int(rrule_dict.get("INTERVAL", [1])[0])
-        until = None
-
-        if "UNTIL" in rrule_dict:
-            until_str = rrule_dict.get("UNTIL")[0]
-            if isinstance(until_str, datetime):
-                until = until_str
-            elif isinstance(until_str, str):
-                if "T" in until_str:
-                    until = datetime.strptime(
-                        until_str.replace("Z", ""), "%Y%m%dT%H%M%S"
-                    )
-                else:
-                    until = datetime.strptime(until_str, "%Y%m%d")
-        elif self.start_of_semester:
-            until = self.start_of_semester + timedelta(days=18 * 7)
+    def _get_until(self, event: _ICSEvent) -> Optional[datetime]:
+        """Граница повторения из UNTIL в часовом поясе, сравнимом с DTSTART"""
+        if "UNTIL" not in event.rrule:
+            return None
+
+        start_date = event.dtstart
+        until = _parse_date_time(event.rrule["UNTIL"])
+        if until is None:
+            return None
+
+        if not isinstance(until, datetime):
+            # UNTIL в виде даты включает весь день
+            return datetime.combine(until, time.max, tzinfo=start_date.tzinfo)
+
+        if start_date.tzinfo is None and until.tzinfo is not None:
+            return until.replace(tzinfo=None)
+        if start_date.tzinfo is not None and until.tzinfo is None:
+            return until.replace(tzinfo=start_date.tzinfo)
+        return until
+
+    def _get_event_weeks(self, event: _ICSEvent) -> int:
+        """
+        Получить маску недель проведения занятия с учетом правил повторения
+        и исключений. Еженедельные правила разворачиваются арифметически,
+        остальные - через dateutil
+        """
+        start_date = event.dtstart
+        exdates = event.exdates
+
+        if not event.rrule:
+            week_number = self._get_week_number(start_date)
+            if 1 <= week_number <= self.total_weeks:
+                return 1 << (week_number - 1)
+            return 0
+
+        freq = event.rrule.get("FREQ", "WEEKLY").upper()
+        try:
+            interval = max(1, int(event.rrule.get("INTERVAL", 1)))
+        except ValueError:
+            interval = 1
+        until = self._get_until(event)
+
+        weeks = 0
+
+        if freq == "WEEKLY":
+            # Без UNTIL повторения ограничены семестром
+            step = timedelta(weeks=interval)
+            occurrence = start_date
+            week_number = self._get_week_number(start_date)
+            while week_number <= self.total_weeks and (
+                until is None or occurrence <= until
+            ):
+                if week_number >= 1 and occurrence not in exdates:
+                    weeks |= 1 << (week_number - 1)
+                occurrence += step
+                week_number += interval
+            return weeks
 
         rule_params = {
             "freq": self.freq_map.get(freq, dateutil_rrule.WEEKLY),
             "dtstart": start_date,
             "interval": interval,
+            "until": until
+            or self.start_of_semester + timedelta(weeks=self.total_weeks),
         }
 
-        if until:
-            rule_params["until"] = until
-
-        dates = list(dateutil_rrule.rrule(**rule_params))
-
-        result = []
-        for date in dates:
-            if date not in exdates:
-                result.append(date)
+        for occurrence in dateutil_rrule.rrule(**rule_params):
+            if occurrence in exdates:
+                continue
+            week_number = self._get_week_number(occurrence)
+            if week_number > self.total_weeks:
+                break
+            if week_number >= 1:
+                weeks |= 1 << (week_number - 1)
 
-        return result
+        return weeks
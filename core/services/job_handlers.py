@@ -0,0 +1,227 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.repositories.file_repository import FileRepository
+from core.services.schedule_compare import ScheduleCompareService
+from core.services.schedule_downloader import ScheduleDownloader
+from core.services.schedule_service import ScheduleService
+
+# progress(процент, сообщение)
+ProgressCallback = Callable[[int, Optional[str]], Awaitable[None]]
+JobHandler = Callable[
+    [AsyncSession, Dict[str, Any], ProgressCallback], Awaitable[Dict[str, Any]]
+]
+
+
+async def _import_content(
+    db_session: AsyncSession,
+    payload: Dict[str, Any],
+    group_schedules,
+    file_record=None,
+    checkpoint_key: Optional[str] = None,
+    on_progress=None,
+    use_content_hash: bool = True,
+) -> Dict[str, Any]:
+    schedule_service = ScheduleService(db_session=db_session)
+
+    semcode = payload.get("semcode")
+    if not semcode:
+        semcode = await schedule_service.get_current_semcode()
+
+    result = await schedule_service.import_schedule_from_standardized_content(
+        semcode=semcode,
+        version=payload.get("version", 1),
+        standardized_content=group_schedules,
+        is_official=payload.get("is_official", False),
+        incremental=payload.get("incremental", False),
+        batch_size=payload.get("batch_size"),
+        checkpoint_key=checkpoint_key,
+        on_progress=on_progress,
+        content_hash=(
+            file_record.content_hash if file_record and use_content_hash else None
+        ),
+        file_id=file_record.id if file_record else None,
+    )
+
+    return {
+        "semcode": semcode,
+        "group_count": result.total_groups,
+        "inserted_lessons": result.inserted_lessons,
+        "deleted_lessons": result.deleted_lessons,
+        "unchanged_lessons": result.unchanged_lessons,
+        "cache_hit": result.cache_hit,
+    }
+
+
+async def download_schedules(
+    db_session: AsyncSession, payload: Dict[str, Any], progress: ProgressCallback
+) -> Dict[str, Any]:
+    """
+    Скачивает расписания групп, сохраняет их файлом и импортирует в базу данных
+    """
+
+    async def on_download_progress(done: int, total: int):
+        await progress(done * 60 // total, f"Скачано расписаний: {done} из {total}")
+
+    schedule_data = await ScheduleDownloader().download_group_schedules(
+        payload["groups"], on_progress=on_download_progress
+    )
+
+    new_file = await FileRepository(db_session).save_schedule_data(schedule_data)
+    await progress(70, "Импорт расписания")
+
+    result = await _import_content(
+        db_session, payload, schedule_data["group_schedules"], new_file
+    )
+    return {"file_id": new_file.id, **result}
+
+
+async def convert_file(
+    db_session: AsyncSession, payload: Dict[str, Any], progress: ProgressCallback
+) -> Dict[str, Any]:
+    """
+    Конвертирует сохраненный файл и, если указано в задаче, импортирует его
+    """
+    file_manager = FileRepository(db_session)
+    file_record = await file_manager.get_file(payload["file_id"], with_data=True)
+    if not file_record:
+        raise ValueError("Файл не найден")
+
+    await progress(10, "Конвертация файла")
+    standardized_content = await file_manager.convert_stored_file(file_record)
+    file_record = await file_manager.update_file_content(
+        file_record.id, standardized_content
+    )
+
+    result = {"file_id": file_record.id, "group_count": file_record.group_count}
+    if payload.get("compare"):
+        await progress(40, "Сравнение с предыдущим файлом")
+        result["compared_with"] = await _precompute_comparison(
+            file_manager, file_record
+        )
+    if not payload.get("import"):
+        return result
+
+    await progress(50, "Импорт расписания")
+    result.update(
+        await _import_content(
+            db_session,
+            payload,
+            file_manager.load_schedule_results(standardized_content),
+            file_record,
+        )
+    )
+    return result
+
+
+async def import_file(
+    db_session: AsyncSession, payload: Dict[str, Any], progress: ProgressCallback
+) -> Dict[str, Any]:
+    """
+    Импортирует расписание из ранее загруженного файла
+    """
+    file_manager = FileRepository(db_session)
+    file_record = await file_manager.get_file(payload["file_id"])
+    if not file_record:
+        raise ValueError("Файл не найден")
+    if not file_record.group_count:
+        raise ValueError("Файл не содержит данных расписания")
+
+    await progress(10, "Импорт расписания")
+
+    groups = payload.get("groups")
+    total_groups = len(file_manager.file_group_names(file_record, groups))
+    if not total_groups:
+        raise ValueError("Указанные группы не найдены в файле")
+
+    async def on_import_progress(done: int):
+        await progress(
+            10 + done * 90 // total_groups,
+            f"Импортировано групп: {done} из {total_groups}",
+        )
+
+    checkpoint_key = None
+    if payload.get("batch_size"):
+        # Повторная попытка задачи продолжит импорт с последнего пакета
+        checkpoint_key = ScheduleService.file_import_checkpoint_key(
+            file_record.id,
+            payload.get("semcode"),
+            payload.get("version", 1),
+            payload.get("is_official", False),
+            groups,
+        )
+        # Группы загружаются из БД по одному пакету
+        group_schedules = file_manager.iter_file_schedule_results(
+            file_record, groups, payload["batch_size"]
+        )
+    else:
+        group_schedules = file_manager.load_schedule_results(
+            await file_manager.load_content(file_record, groups)
+        )
+
+    result = await _import_content(
+        db_session,
+        payload,
+        group_schedules,
+        file_record,
+        checkpoint_key,
+        on_import_progress,
+        # Кэш импорта относится к содержимому всего файла
+        use_content_hash=groups is None,
+    )
+    return {"file_id": file_record.id, **result}
+
+
+async def _precompute_comparison(
+    file_manager: FileRepository, file_record
+) -> Optional[int]:
+    """
+    Сравнивает файл с предыдущим загруженным и сохраняет результат.
+    Возвращает id предыдущего файла, None - если сравнивать не с чем
+    """
+    if not file_record.group_count:
+        return None
+
+    previous_file = await file_manager.get_previous_file(file_record.id)
+    if not previous_file:
+        return None
+
+    if (
+        await file_manager.get_cached_comparison(previous_file.id, file_record.id)
+        is None
+    ):
+        result = await ScheduleCompareService().compare_schedules_parallel(
+            *await file_manager.load_compare_contents(previous_file, file_record),
+            previous_file.fingerprint_tree,
+            file_record.fingerprint_tree,
+        )
+        await file_manager.save_cached_comparison(
+            previous_file.id, file_record.id, result.model_dump_json().encode()
+        )
+
+    return previous_file.id
+
+
+async def compare_files(
+    db_session: AsyncSession, payload: Dict[str, Any], progress: ProgressCallback
+) -> Dict[str, Any]:
+    """
+    Сравнивает загруженный файл с предыдущим и сохраняет результат сравнения
+    """
+    file_manager = FileRepository(db_session)
+    file_record = await file_manager.get_file(payload["file_id"])
+    if not file_record:
+        raise ValueError("Файл не найден")
+
+    await progress(10, "Сравнение с предыдущим файлом")
+    compared_with = await _precompute_comparison(file_manager, file_record)
+    return {"file_id": file_record.id, "compared_with": compared_with}
+
+
+JOB_HANDLERS: Dict[str, JobHandler] = {
+    "download_schedules": download_schedules,
+    "convert_file": convert_file,
+    "import_file": import_file,
+    "compare_files": compare_files,
+}
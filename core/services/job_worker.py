@@ -0,0 +1,152 @@
+import asyncio
+import os
+import signal
+import socket
+import traceback
+from typing import List, Optional
+
+from core.db.models.jobs import Job
+from core.repositories.job_repository import JobRepository
+from core.services.conversion_pool import conversion_pool
+from core.services.job_handlers import JOB_HANDLERS
+from core.settings.app_config import settings
+
+
+class JobWorker:
+    """
+    Воркер очереди задач: несколько слотов забирают задачи из таблицы jobs
+    и выполняют их, каждая задача - в своей сессии БД
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        concurrency: int = settings.WORKER_CONCURRENCY,
+        poll_interval: float = settings.WORKER_POLL_INTERVAL,
+        kinds: Optional[List[str]] = None,
+    ):
+        self.session_factory = session_factory
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.kinds = kinds or list(JOB_HANDLERS.keys())
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """Останавливает воркер после завершения текущих задач"""
+        self._stopping.set()
+
+    async def run(self) -> None:
+        print(f"Воркер {self.worker_id} запущен, слотов: {self.concurrency}")
+        tasks = [asyncio.create_task(self._requeue_loop())]
+        tasks.extend(
+            asyncio.create_task(self._slot_loop()) for _ in range(self.concurrency)
+        )
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            print(f"Воркер {self.worker_id} остановлен")
+
+    async def _sleep(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _requeue_loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                async with self.session_factory() as session:
+                    requeued = await JobRepository(session).requeue_stale_jobs(
+                        settings.JOB_STALE_TIMEOUT
+                    )
+                if requeued:
+                    print(f"Возвращено в очередь зависших задач: {requeued}")
+            except Exception as e:
+                print(f"Ошибка при проверке зависших задач: {str(e)}")
+            await self._sleep(settings.JOB_HEARTBEAT_INTERVAL)
+
+    async def _slot_loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                async with self.session_factory() as session:
+                    job = await JobRepository(session).claim_job(
+                        self.worker_id, self.kinds
+                    )
+            except Exception as e:
+                print(f"Ошибка при получении задачи: {str(e)}")
+                job = None
+
+            if not job:
+                await self._sleep(self.poll_interval)
+                continue
+
+            await self.execute(job)
+
+    async def _heartbeat_loop(self, job_id: int) -> None:
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_INTERVAL)
+            try:
+                async with self.session_factory() as session:
+                    await JobRepository(session).heartbeat(job_id)
+            except Exception as e:
+                print(f"Ошибка heartbeat задачи {job_id}: {str(e)}")
+
+    async def execute(self, job: Job) -> None:
+        """
+        Выполняет задачу и сохраняет результат или ошибку
+        """
+        handler = JOB_HANDLERS.get(job.kind)
+        heartbeat = asyncio.create_task(self._heartbeat_loop(job.id))
+
+        async def progress(value: int, message: Optional[str] = None):
+            async with self.session_factory() as session:
+                await JobRepository(session).update_progress(job.id, value, message)
+
+        try:
+            if not handler:
+                raise ValueError(f"Неизвестный тип задачи: {job.kind}")
+
+            async with self.session_factory() as session:
+                result = await handler(session, job.payload, progress)
+
+            async with self.session_factory() as session:
+                completed = await JobRepository(session).complete_job(
+                    job.id, self.worker_id, result
+                )
+            if not completed:
+                print(
+                    f"Задача {job.id} уже не принадлежит воркеру, результат не сохранен"
+                )
+        except Exception as e:
+            print(f"Ошибка при выполнении задачи {job.id} ({job.kind}): {str(e)}")
+            print(traceback.format_exc())
+            async with self.session_factory() as session:
+                status = await JobRepository(session).fail_job(
+                    job.id, self.worker_id, str(e), settings.JOB_RETRY_DELAY
+                )
+            if status is None:
+                print(
+                    f"Задача {job.id} уже не принадлежит воркеру, ошибка не сохранена"
+                )
+        finally:
+            heartbeat.cancel()
+
+
+async def run_worker(session_factory=None) -> None:
+    if session_factory is None:
+        from core.db.session import Session
+
+        session_factory = Session
+
+    worker = JobWorker(session_factory)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    conversion_pool.start()
+    try:
+        await worker.run()
+    finally:
+        conversion_pool.shutdown()
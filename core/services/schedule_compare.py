@@ -1,457 +1,715 @@
-from typing import Any, Dict, List, Optional, Set
-
-from core.utils.maps import WEEKDAYS
+import asyncio
+import hashlib
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from core.services.conversion_pool import conversion_pool
+from core.settings.app_config import settings
+from core.utils.maps import WEEKDAY_MAP
+from core.utils.schedule_content import (
+    mask_to_weeks,
+    schedule_from_content,
+    schedule_weeks_mask,
+    weeks_to_mask,
+)
 from core.schemas.schedule import (
     ScheduleResult,
-    WeekSchedule,
-    LessonData,
+    ScheduleLesson,
     ScheduleComparisonResultModel,
+    ScheduleComparisonSummaryModel,
     GroupComparisonModel,
-    ScheduleChangeDetailsModel,
-    ChangeSummaryModel,
+    GroupChangeCountsModel,
     AddedLessonModel,
     RemovedLessonModel,
     ModifiedLessonModel,
     LessonDetailsCompareModel,
     LessonChangeModel,
     WeekComparisonItemModel,
+    ChangeSummaryModel,
+)
+
+# Версия алгоритма сравнения: сохраненные результаты сравнения других версий
+# не используются. Увеличивается при любом изменении результата
+COMPARE_ENGINE_VERSION = "2"
+
+# Поля, по которым сравниваются занятия
+COMPARE_FIELDS = ("subject", "teacher", "room", "campus", "lesson_type")
+# Значения полей, не сохраненных в компактном формате
+FIELD_DEFAULTS = ("",) * len(COMPARE_FIELDS)
+# Поля, которые учитываются в сводке и в сравнении по неделям
+SUMMARY_FIELDS = ("subject", "teacher", "room", "campus")
+
+# Недели каждой четности (с запасом по числу недель) для операций с масками
+PARITY_WEEKS_MASKS = (
+    weeks_to_mask(range(2, 129, 2)),
+    weeks_to_mask(range(1, 129, 2)),
 )
 
+# Версия дерева отпечатков: деревья других версий не используются
+FINGERPRINT_TREE_VERSION = 1
+
+# Отпечаток занятия - значения COMPARE_FIELDS
+Fingerprint = Tuple[str, ...]
+# {(день, пара): {отпечаток: (маска недель, занятие)}}
+SlotIndex = Dict[Tuple[str, str], Dict[Fingerprint, Tuple[int, ScheduleLesson]]]
+# {(день, пара): {отпечаток: маска недель}}
+SlotMasks = Dict[Tuple[str, str], Dict[Fingerprint, int]]
+# Узел группы в дереве отпечатков:
+# {"hash", "weeks": маска недель, "days": {день: {"hash", "pairs": {пара: hash}}}}
+GroupNode = Dict
+# {неделя: (до, после)}
+TrackedWeeks = Dict[
+    int,
+    Tuple[Optional[LessonDetailsCompareModel], Optional[LessonDetailsCompareModel]],
+]
+
+
+def lesson_fingerprint(lesson: ScheduleLesson) -> Fingerprint:
+    """Отпечаток занятия: совпадающие отпечатки означают отсутствие изменений"""
+    return tuple(getattr(lesson, field) for field in COMPARE_FIELDS)
+
+
+def _tree_hash(value) -> str:
+    """Хэш узла дерева отпечатков от канонического JSON значения"""
+    data = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def build_fingerprint_tree(schedule: Dict[str, Dict]) -> Dict:
+    """
+    Строит дерево отпечатков standardized_content: группа -> день -> пара.
+    Хэш пары считается по маскам недель отпечатков занятий слота, хэши дня
+    и группы - по хэшам дочерних узлов (и маске недель группы). Совпадение
+    хэшей означает, что в поддереве нет изменений
+    """
+    groups = {}
+    for group, content in schedule.items():
+        slots, weeks_mask = ScheduleCompareService._slot_masks(group, content)
+
+        day_pairs: Dict[str, Dict[str, str]] = {}
+        for (day, pair), masks in slots.items():
+            day_pairs.setdefault(day, {})[pair] = _tree_hash(sorted(masks.items()))
+
+        days = {
+            day: {"hash": _tree_hash(sorted(pairs.items())), "pairs": pairs}
+            for day, pairs in day_pairs.items()
+        }
+        groups[group] = {
+            "hash": _tree_hash(
+                [weeks_mask, sorted((day, node["hash"]) for day, node in days.items())]
+            ),
+            "weeks": weeks_mask,
+            "days": days,
+        }
+
+    return {"version": FINGERPRINT_TREE_VERSION, "groups": groups}
+
+
+def compare_group_contents(
+    shard: List[Tuple[str, Dict, Dict, Optional[GroupNode], Optional[GroupNode]]],
+) -> List[Tuple[str, GroupComparisonModel]]:
+    """
+    Сравнивает часть групп: [(группа, содержимое 1, содержимое 2, узел
+    дерева отпечатков 1, узел 2)]. Выполняется в процессе пула
+    """
+    service = ScheduleCompareService()
+    return [
+        (group, service.compare_group_content(group, content1, content2, node1, node2))
+        for group, content1, content2, node1, node2 in shard
+    ]
+
 
 class ScheduleCompareService:
     """Сервис для сравнения расписаний"""
 
     def compare_schedules(
-        self, schedule1: Dict[str, Dict], schedule2: Dict[str, Dict]
+        self,
+        schedule1: Dict[str, Dict],
+        schedule2: Dict[str, Dict],
+        tree1: Optional[Dict] = None,
+        tree2: Optional[Dict] = None,
     ) -> ScheduleComparisonResultModel:
         """
         Сравнивает два расписания и возвращает информацию о различиях.
+        Принимает standardized_content в компактном и в прежнем формате.
+        tree1 и tree2 - деревья отпечатков файлов (build_fingerprint_tree):
+        если они есть, сравниваются только слоты с различающимися хэшами
         """
-        converted_schedule1 = {}
-        converted_schedule2 = {}
-
-        for group_name, group_data in schedule1.items():
-            converted_schedule1[group_name] = ScheduleResult(
-                group_name=group_name,
-                week_schedules=group_data,
-            )
-
-        for group_name, group_data in schedule2.items():
-            converted_schedule2[group_name] = ScheduleResult(
-                group_name=group_name,
-                week_schedules=group_data,
-            )
-
-        result = ScheduleComparisonResultModel()
-        all_groups = set(schedule1.keys()) | set(schedule2.keys())
+        return ScheduleComparisonResultModel(
+            groups=dict(self.iter_compare_schedules(schedule1, schedule2, tree1, tree2))
+        )
 
-        for group in all_groups:
-            group_result = GroupComparisonModel()
+    def iter_compare_schedules(
+        self,
+        schedule1: Dict[str, Dict],
+        schedule2: Dict[str, Dict],
+        tree1: Optional[Dict] = None,
+        tree2: Optional[Dict] = None,
+    ) -> Iterator[Tuple[str, GroupComparisonModel]]:
+        """
+        Сравнивает расписания по одной группе: (группа, результат) выдается
+        сразу после сравнения группы, в порядке compare_schedules
+        """
+        nodes1 = self._tree_groups(tree1)
+        nodes2 = self._tree_groups(tree2)
 
+        for group in self._ordered_groups(schedule1, schedule2):
             if group not in schedule1:
-                group_result.total = 1
-                group_result.details.added.append(
-                    AddedLessonModel(
-                        day="Группа отсутствует в первой версии",
-                        lesson="",
-                        details=LessonDetailsCompareModel(
-                            subject="Группа появилась во второй версии",
-                            teacher="—",
-                            room="—",
-                            campus="—",
-                        ),
-                        week=0,
-                    )
+                yield group, self.missing_group_result(added=True)
+            elif group not in schedule2:
+                yield group, self.missing_group_result(added=False)
+            else:
+                yield group, self.compare_group_content(
+                    group,
+                    schedule1[group],
+                    schedule2[group],
+                    nodes1.get(group),
+                    nodes2.get(group),
                 )
-                result.groups[group] = group_result
-                continue
 
-            if group not in schedule2:
-                group_result.total = 1
-                group_result.details.removed.append(
-                    RemovedLessonModel(
-                        day="Группа отсутствует во второй версии",
-                        lesson="",
-                        details=LessonDetailsCompareModel(
-                            subject="Группа была в первой версии",
-                            teacher="—",
-                            room="—",
-                            campus="—",
-                        ),
-                        week=0,
-                    )
+    async def compare_schedules_parallel(
+        self,
+        schedule1: Dict[str, Dict],
+        schedule2: Dict[str, Dict],
+        tree1: Optional[Dict] = None,
+        tree2: Optional[Dict] = None,
+    ) -> ScheduleComparisonResultModel:
+        """
+        То же, что compare_schedules, но группы сравниваются частями в общем
+        пуле процессов. Группы с совпадающими хэшами деревьев отпечатков в пул
+        не передаются. Если остальных общих групп меньше
+        COMPARE_PARALLEL_MIN_GROUPS, сравнение выполняется в текущем процессе:
+        передача данных в пул обошлась бы дороже самого сравнения
+        """
+        nodes1 = self._tree_groups(tree1)
+        nodes2 = self._tree_groups(tree2)
+        changed_groups = [
+            group
+            for group in schedule1
+            if group in schedule2
+            and not self._same_hash(nodes1.get(group), nodes2.get(group))
+        ]
+        if len(changed_groups) < settings.COMPARE_PARALLEL_MIN_GROUPS:
+            return self.compare_schedules(schedule1, schedule2, tree1, tree2)
+
+        shards_count = min(conversion_pool.max_workers, len(changed_groups))
+        shards = [
+            [
+                (
+                    group,
+                    schedule1[group],
+                    schedule2[group],
+                    nodes1.get(group),
+                    nodes2.get(group),
                 )
-                result.groups[group] = group_result
-                continue
+                for group in changed_groups[index::shards_count]
+            ]
+            for index in range(shards_count)
+        ]
+        shard_results = await asyncio.gather(
+            *(conversion_pool.run(compare_group_contents, shard) for shard in shards)
+        )
+        compared = {
+            group: group_result
+            for shard_result in shard_results
+            for group, group_result in shard_result
+        }
 
-            group_schedule1 = converted_schedule1[group]
-            group_schedule2 = converted_schedule2[group]
+        result = ScheduleComparisonResultModel()
+        for group in self._ordered_groups(schedule1, schedule2):
+            if group in compared:
+                result.groups[group] = compared[group]
+            elif group in schedule1 and group in schedule2:
+                result.groups[group] = GroupComparisonModel()
+            else:
+                result.groups[group] = self.missing_group_result(
+                    added=group not in schedule1
+                )
 
-            all_weeks = set(group_schedule1.week_schedules.keys()) | set(
-                group_schedule2.week_schedules.keys()
-            )
+        return result
 
-            lessons_tracking = {}
-
-            for week_number in all_weeks:
-                has_week_in_schedule1 = week_number in group_schedule1.week_schedules
-                has_week_in_schedule2 = week_number in group_schedule2.week_schedules
-                if has_week_in_schedule1 and has_week_in_schedule2:
-                    week_data1 = group_schedule1.week_schedules[week_number]
-                    week_data2 = group_schedule2.week_schedules[week_number]
-                    self._compare_week_schedules(
-                        group_result,
-                        week_data1,
-                        week_data2,
-                        week_number,
-                        lessons_tracking,
-                    )
+    def compare_group_content(
+        self,
+        group: str,
+        content1: Dict,
+        content2: Dict,
+        node1: Optional[GroupNode] = None,
+        node2: Optional[GroupNode] = None,
+    ) -> GroupComparisonModel:
+        """
+        Сравнивает группу по значениям standardized_content. Если есть узлы
+        группы в деревьях отпечатков обоих файлов, при совпадении хэшей группы
+        сравнение не выполняется, иначе по хэшам дней и пар выбираются
+        измененные слоты и сравниваются только их занятия
+        """
+        if node1 is None or node2 is None:
+            return self.compare_group(
+                schedule_from_content(group, content1),
+                schedule_from_content(group, content2),
+            )
+        if node1["hash"] == node2["hash"]:
+            return GroupComparisonModel()
+
+        slots = self._changed_slots(node1, node2)
+        return self.compare_group(
+            self._slots_schedule(group, content1, slots),
+            self._slots_schedule(group, content2, slots),
+            weeks_masks=(node1["weeks"], node2["weeks"]),
+        )
 
-            self._process_tracked_lessons(group_result, lessons_tracking, all_weeks)
+    def summarize_schedules(
+        self,
+        schedule1: Dict[str, Dict],
+        schedule2: Dict[str, Dict],
+        tree1: Optional[Dict] = None,
+        tree2: Optional[Dict] = None,
+    ) -> ScheduleComparisonSummaryModel:
+        """
+        Сравнение в режиме summary: только количество изменений по группам,
+        без записей и сравнения по неделям. Группы с совпадающими хэшами
+        деревьев отпечатков не разбираются
+        """
+        result = ScheduleComparisonSummaryModel()
+        nodes1 = self._tree_groups(tree1)
+        nodes2 = self._tree_groups(tree2)
 
-            result.groups[group] = group_result
+        for group in self._ordered_groups(schedule1, schedule2):
+            if group not in schedule1:
+                result.groups[group] = GroupChangeCountsModel(total=1, added=1)
+            elif group not in schedule2:
+                result.groups[group] = GroupChangeCountsModel(total=1, removed=1)
+            elif self._same_hash(nodes1.get(group), nodes2.get(group)):
+                result.groups[group] = GroupChangeCountsModel()
+            else:
+                result.groups[group] = self.summarize_group(
+                    group, schedule1[group], schedule2[group]
+                )
 
         return result
 
-    def _process_tracked_lessons(
-        self,
-        group_result: GroupComparisonModel,
-        lessons_tracking: Dict[tuple, Dict],
-        all_weeks: Set[int],
-    ) -> None:
-        """Обрабатывает отслеживаемые пары и добавляет информацию о всех неделях"""
-        for modified_lesson in group_result.details.modified:
-            key = (modified_lesson.day, int(modified_lesson.lesson.split()[1]))
-            if key in lessons_tracking:
-                lesson_tracking = lessons_tracking[key]
-                weeks_comparison = []
-
-                is_odd_week = modified_lesson.week % 2 == 1
-                filtered_weeks = (
-                    [w for w in sorted(all_weeks) if w % 2 == 1]
-                    if is_odd_week
-                    else [w for w in sorted(all_weeks) if w % 2 == 0]
-                )
-
-                for week in filtered_weeks:
-                    week_info = WeekComparisonItemModel(week=week)
-
-                    if week in lesson_tracking["weeks"]:
-                        week_data = lesson_tracking["weeks"][week]
-                        week_info.before = week_data.get("before")
-                        week_info.after = week_data.get("after")
-
-                        if week_data.get("before") and week_data.get("after"):
-                            changed_fields = []
-                            for field in ["subject", "teacher", "room", "campus"]:
-                                before_value = getattr(week_data["before"], field, "—")
-                                after_value = getattr(week_data["after"], field, "—")
-                                if before_value != after_value:
-                                    changed_fields.append(field)
-
-                            if changed_fields:
-                                week_info.change_type = "modified"
-                                week_info.changed_fields = changed_fields
-                            else:
-                                week_info.change_type = "unchanged"
-                        elif week_data.get("before") and not week_data.get("after"):
-                            week_info.change_type = "removed"
-                        elif not week_data.get("before") and week_data.get("after"):
-                            week_info.change_type = "added"
-
-                    weeks_comparison.append(week_info)
-
-                modified_lesson.weeks_comparison = weeks_comparison
-
-        for added_lesson in group_result.details.added:
-            key = (added_lesson.day, int(added_lesson.lesson.split()[1]))
-            if key in lessons_tracking:
-                lesson_tracking = lessons_tracking[key]
-                weeks_comparison = []
-
-                is_odd_week = added_lesson.week % 2 == 1
-                filtered_weeks = (
-                    [w for w in sorted(all_weeks) if w % 2 == 1]
-                    if is_odd_week
-                    else [w for w in sorted(all_weeks) if w % 2 == 0]
-                )
+    def summarize_group(
+        self, group: str, content1: Dict, content2: Dict
+    ) -> GroupChangeCountsModel:
+        """
+        Количество изменений группы, как в compare_group. Занятия не
+        преобразуются в модели: по содержимому каждого файла один раз
+        строятся маски недель отпечатков в слотах, а изменения считаются
+        операциями над масками
+        """
+        counts = GroupChangeCountsModel()
+        if content1 == content2:
+            return counts
+
+        slots1, weeks_mask1 = self._slot_masks(group, content1)
+        slots2, weeks_mask2 = self._slot_masks(group, content2)
+        common_weeks = weeks_mask1 & weeks_mask2
+        summary_values = dict.fromkeys(SUMMARY_FIELDS, 0)
+
+        for slot in slots1.keys() | slots2.keys():
+            lessons1 = {
+                fingerprint: weeks & common_weeks
+                for fingerprint, weeks in slots1.get(slot, {}).items()
+                if weeks & common_weeks
+            }
+            lessons2 = {
+                fingerprint: weeks & common_weeks
+                for fingerprint, weeks in slots2.get(slot, {}).items()
+                if weeks & common_weeks
+            }
+            if lessons1 == lessons2:
+                continue
 
-                for week in filtered_weeks:
-                    week_info = WeekComparisonItemModel(week=week)
-
-                    if week in lesson_tracking["weeks"]:
-                        if lesson_tracking["weeks"][week].get(
-                            "after"
-                        ) and not lesson_tracking["weeks"][week].get("before"):
-                            week_info.after = lesson_tracking["weeks"][week]["after"]
-                            week_info.change_type = "added"
-                        elif lesson_tracking["weeks"][week].get(
-                            "after"
-                        ) and lesson_tracking["weeks"][week].get("before"):
-                            week_info.before = lesson_tracking["weeks"][week]["before"]
-                            week_info.after = lesson_tracking["weeks"][week]["after"]
-                            week_info.change_type = "unchanged"
-
-                    weeks_comparison.append(week_info)
-
-                added_lesson.weeks_comparison = weeks_comparison
-
-        for removed_lesson in group_result.details.removed:
-            key = (removed_lesson.day, int(removed_lesson.lesson.split()[1]))
-            if key in lessons_tracking:
-                lesson_tracking = lessons_tracking[key]
-                weeks_comparison = []
-
-                is_odd_week = removed_lesson.week % 2 == 1
-                filtered_weeks = (
-                    [w for w in sorted(all_weeks) if w % 2 == 1]
-                    if is_odd_week
-                    else [w for w in sorted(all_weeks) if w % 2 == 0]
+            occupied1 = occupied2 = 0
+            for weeks in lessons1.values():
+                occupied1 |= weeks
+            for weeks in lessons2.values():
+                occupied2 |= weeks
+
+            modified = 0
+            for fingerprint1, weeks1 in lessons1.items():
+                for fingerprint2, weeks2 in lessons2.items():
+                    weeks = weeks1 & weeks2
+                    if not weeks or fingerprint1 == fingerprint2:
+                        continue
+                    modified |= weeks
+                    for index, field in enumerate(SUMMARY_FIELDS):
+                        if fingerprint1[index] != fingerprint2[index]:
+                            summary_values[field] += weeks.bit_count()
+
+            # Как в compare_group: одна запись на вид изменения и четность недели
+            for kind, weeks in (
+                ("added", occupied2 & ~occupied1),
+                ("removed", occupied1 & ~occupied2),
+                ("modified", modified),
+            ):
+                items = sum(1 for parity in PARITY_WEEKS_MASKS if weeks & parity)
+                setattr(counts, kind, getattr(counts, kind) + items)
+
+        counts.total = counts.added + counts.removed + counts.modified
+        counts.summary = ChangeSummaryModel(**summary_values)
+        return counts
+
+    @staticmethod
+    def _slot_masks(group: str, content: Dict) -> Tuple[SlotMasks, int]:
+        """
+        Маски недель отпечатков занятий по слотам и маска всех недель группы.
+        Компактный формат разбирается без создания моделей
+        """
+        if "lessons" in (content or {}):
+            lessons = (
+                (
+                    lesson["day"],
+                    lesson["pair"],
+                    lesson.get("weeks", 0),
+                    tuple(map(lesson.get, COMPARE_FIELDS, FIELD_DEFAULTS)),
                 )
+                for lesson in content["lessons"]
+            )
+        else:
+            lessons = (
+                (lesson.day, lesson.pair, lesson.weeks, lesson_fingerprint(lesson))
+                for lesson in schedule_from_content(group, content).lessons
+            )
 
-                for week in filtered_weeks:
-                    week_info = WeekComparisonItemModel(week=week)
-
-                    if week in lesson_tracking["weeks"]:
-                        if lesson_tracking["weeks"][week].get(
-                            "before"
-                        ) and not lesson_tracking["weeks"][week].get("after"):
-                            week_info.before = lesson_tracking["weeks"][week]["before"]
-                            week_info.change_type = "removed"
-                        elif lesson_tracking["weeks"][week].get(
-                            "before"
-                        ) and lesson_tracking["weeks"][week].get("after"):
-                            week_info.before = lesson_tracking["weeks"][week]["before"]
-                            week_info.after = lesson_tracking["weeks"][week]["after"]
-                            week_info.change_type = "unchanged"
+        slots: SlotMasks = {}
+        weeks_mask = 0
+        for day, pair, weeks, fingerprint in lessons:
+            weeks_mask |= weeks
+            masks = slots.setdefault((day, pair), {})
+            masks[fingerprint] = masks.get(fingerprint, 0) | weeks
 
-                    weeks_comparison.append(week_info)
+        return slots, weeks_mask
 
-                removed_lesson.weeks_comparison = weeks_comparison
+    @staticmethod
+    def _tree_groups(tree: Optional[Dict]) -> Dict[str, GroupNode]:
+        """Узлы групп дерева отпечатков; дерево другой версии не используется"""
+        if not tree or tree.get("version") != FINGERPRINT_TREE_VERSION:
+            return {}
+        return tree["groups"]
 
-    def _compare_week_schedules(
-        self,
-        group_result: GroupComparisonModel,
-        week_data1: WeekSchedule,
-        week_data2: WeekSchedule,
-        week_number: int,
-        lessons_tracking: Optional[Dict] = None,
-    ) -> None:
-        all_days = set(week_data1.weekday_schedules.keys()) | set(
-            week_data2.weekday_schedules.keys()
+    @classmethod
+    def unchanged_groups(cls, tree1: Optional[Dict], tree2: Optional[Dict]) -> Set[str]:
+        """
+        Группы с совпадающими хэшами в деревьях отпечатков: их содержимое
+        при сравнении не читается
+        """
+        nodes1 = cls._tree_groups(tree1)
+        nodes2 = cls._tree_groups(tree2)
+        return {
+            group
+            for group, node in nodes1.items()
+            if cls._same_hash(node, nodes2.get(group))
+        }
+
+    @staticmethod
+    def _same_hash(node1: Optional[GroupNode], node2: Optional[GroupNode]) -> bool:
+        return (
+            node1 is not None and node2 is not None and node1["hash"] == node2["hash"]
         )
 
-        for day in all_days:
-            day_schedule1 = week_data1.weekday_schedules.get(day, {})
-            day_schedule2 = week_data2.weekday_schedules.get(day, {})
+    @staticmethod
+    def _changed_slots(node1: GroupNode, node2: GroupNode) -> Set[Tuple[str, str]]:
+        """Слоты (день, пара), хэши которых различаются в узлах группы"""
+        slots = set()
+        days1, days2 = node1["days"], node2["days"]
 
-            all_pairs = set(day_schedule1.keys()) | set(day_schedule2.keys())
+        for day in days1.keys() | days2.keys():
+            day1, day2 = days1.get(day), days2.get(day)
+            if day1 and day2 and day1["hash"] == day2["hash"]:
+                continue
+            pairs1 = day1["pairs"] if day1 else {}
+            pairs2 = day2["pairs"] if day2 else {}
+            for pair in pairs1.keys() | pairs2.keys():
+                if pairs1.get(pair) != pairs2.get(pair):
+                    slots.add((day, pair))
+
+        return slots
+
+    @staticmethod
+    def _slots_schedule(
+        group: str, content: Dict, slots: Set[Tuple[str, str]]
+    ) -> ScheduleResult:
+        """Расписание группы только с занятиями указанных слотов"""
+        if "lessons" in (content or {}):
+            return ScheduleResult(
+                group_name=group,
+                lessons=[
+                    lesson
+                    for lesson in content["lessons"]
+                    if (lesson["day"], lesson["pair"]) in slots
+                ],
+            )
 
-            for pair_number in all_pairs:
-                has_pair_in_schedule1 = pair_number in day_schedule1
-                has_pair_in_schedule2 = pair_number in day_schedule2
+        schedule = schedule_from_content(group, content)
+        schedule.lessons = [
+            lesson for lesson in schedule.lessons if (lesson.day, lesson.pair) in slots
+        ]
+        return schedule
+
+    @staticmethod
+    def _ordered_groups(
+        schedule1: Dict[str, Dict], schedule2: Dict[str, Dict]
+    ) -> Iterable[str]:
+        """Группы обоих расписаний: сначала группы первого, затем новые"""
+        return list(schedule1) + [
+            group for group in schedule2 if group not in schedule1
+        ]
+
+    @staticmethod
+    def missing_group_result(added: bool) -> GroupComparisonModel:
+        """Результат для группы, которая есть только в одной из версий"""
+        group_result = GroupComparisonModel(total=1)
+
+        if added:
+            group_result.details.added.append(
+                AddedLessonModel(
+                    day="Группа отсутствует в первой версии",
+                    lesson="",
+                    details=LessonDetailsCompareModel(
+                        subject="Группа появилась во второй версии",
+                        teacher="—",
+                        room="—",
+                        campus="—",
+                    ),
+                    week=0,
+                )
+            )
+        else:
+            group_result.details.removed.append(
+                RemovedLessonModel(
+                    day="Группа отсутствует во второй версии",
+                    lesson="",
+                    details=LessonDetailsCompareModel(
+                        subject="Группа была в первой версии",
+                        teacher="—",
+                        room="—",
+                        campus="—",
+                    ),
+                    week=0,
+                )
+            )
 
-                tracking_key = (day, int(pair_number))
+        return group_result
 
-                if (
-                    lessons_tracking is not None
-                    and tracking_key not in lessons_tracking
-                ):
-                    lessons_tracking[tracking_key] = {"changes": [], "weeks": {}}
+    def compare_group(
+        self,
+        schedule1: ScheduleResult,
+        schedule2: ScheduleResult,
+        weeks_masks: Optional[Tuple[int, int]] = None,
+    ) -> GroupComparisonModel:
+        """
+        Сравнивает расписания группы. Сравниваются только недели, которые есть
+        в обеих версиях, и только слоты (день, пара), где отпечатки занятий
+        различаются. Изменения одного вида в слоте объединяются по четности
+        недели: запись создается для первой такой недели, остальные недели
+        той же четности попадают в weeks_comparison.
+
+        weeks_masks - недели группы в каждой версии, если расписания содержат
+        не все занятия группы (например, только измененные слоты)
+        """
+        group_result = GroupComparisonModel()
+
+        if weeks_masks:
+            weeks_mask1, weeks_mask2 = weeks_masks
+        else:
+            weeks_mask1 = schedule_weeks_mask(schedule1)
+            weeks_mask2 = schedule_weeks_mask(schedule2)
+        common_weeks = weeks_mask1 & weeks_mask2
+
+        all_weeks = mask_to_weeks(weeks_mask1 | weeks_mask2)
+        weeks_by_parity = {
+            parity: [week for week in all_weeks if week % 2 == parity]
+            for parity in (0, 1)
+        }
+
+        slots1 = self._index_slots(schedule1, common_weeks)
+        slots2 = self._index_slots(schedule2, common_weeks)
+
+        details_cache: Dict[Fingerprint, LessonDetailsCompareModel] = {}
+        changes_cache: Dict[
+            Tuple[Fingerprint, Fingerprint], List[LessonChangeModel]
+        ] = {}
+
+        def get_details(fingerprint: Fingerprint) -> LessonDetailsCompareModel:
+            if fingerprint not in details_cache:
+                details_cache[fingerprint] = LessonDetailsCompareModel(
+                    **dict(zip(COMPARE_FIELDS, fingerprint))
+                )
+            return details_cache[fingerprint]
 
-                if not has_pair_in_schedule1 and has_pair_in_schedule2:
-                    lesson_data = day_schedule2[pair_number]
-                    details = LessonDetailsCompareModel(
-                        subject=lesson_data.subject,
-                        teacher=lesson_data.teacher,
-                        room=lesson_data.room,
-                        campus=lesson_data.campus,
-                        lesson_type=lesson_data.lesson_type,
-                    )
+        # (неделя, день, пара) создания записи - для порядка вывода
+        created = []
 
-                    existing_added = next(
-                        (
-                            item
-                            for item in group_result.details.added
-                            if item.day == day and f"Пара {pair_number}" in item.lesson
-                        ),
-                        None,
-                    )
+        for slot in list(slots1) + [slot for slot in slots2 if slot not in slots1]:
+            lessons1 = slots1.get(slot, {})
+            lessons2 = slots2.get(slot, {})
+            if {fp: weeks for fp, (weeks, _) in lessons1.items()} == {
+                fp: weeks for fp, (weeks, _) in lessons2.items()
+            }:
+                continue
 
-                    if existing_added and (existing_added.week % 2) == (
-                        week_number % 2
-                    ):
-                        if lessons_tracking is not None:
-                            if (
-                                week_number
-                                not in lessons_tracking[tracking_key]["weeks"]
-                            ):
-                                lessons_tracking[tracking_key]["weeks"][
-                                    week_number
-                                ] = {}
-                            lessons_tracking[tracking_key]["weeks"][week_number][
-                                "after"
-                            ] = details
-                    else:
-                        group_result.details.added.append(
-                            AddedLessonModel(
-                                day=day,
-                                lesson=f"Пара {pair_number} (неделя {week_number})",
-                                details=details,
-                                week=week_number,
+            day, pair = slot
+            by_week1 = self._fingerprints_by_week(lessons1)
+            by_week2 = self._fingerprints_by_week(lessons2)
+
+            tracked: TrackedWeeks = {}
+            # (вид изменения, четность недели) -> запись
+            slot_items: Dict[Tuple[str, int], object] = {}
+
+            for week in sorted(by_week1.keys() | by_week2.keys()):
+                fingerprint1 = by_week1.get(week)
+                fingerprint2 = by_week2.get(week)
+                before = get_details(fingerprint1) if fingerprint1 else None
+                after = get_details(fingerprint2) if fingerprint2 else None
+                tracked[week] = (before, after)
+
+                changes = None
+                if fingerprint1 is None:
+                    kind = "added"
+                elif fingerprint2 is None:
+                    kind = "removed"
+                elif fingerprint1 == fingerprint2:
+                    continue
+                else:
+                    kind = "modified"
+                    changes = changes_cache.get((fingerprint1, fingerprint2))
+                    if changes is None:
+                        changes = self._lesson_changes(fingerprint1, fingerprint2)
+                        changes_cache[(fingerprint1, fingerprint2)] = changes
+                    for change in changes:
+                        if change.field in SUMMARY_FIELDS:
+                            current_value = getattr(group_result.summary, change.field)
+                            setattr(
+                                group_result.summary, change.field, current_value + 1
                             )
-                        )
-                        group_result.total += 1
-
-                        if lessons_tracking is not None:
-                            if (
-                                week_number
-                                not in lessons_tracking[tracking_key]["weeks"]
-                            ):
-                                lessons_tracking[tracking_key]["weeks"][
-                                    week_number
-                                ] = {}
-                            lessons_tracking[tracking_key]["weeks"][week_number][
-                                "after"
-                            ] = details
+
+                item_key = (kind, week % 2)
+                if item_key in slot_items:
                     continue
 
-                if has_pair_in_schedule1 and not has_pair_in_schedule2:
-                    lesson_data = day_schedule1[pair_number]
-                    details = LessonDetailsCompareModel(
-                        subject=lesson_data.subject,
-                        teacher=lesson_data.teacher,
-                        room=lesson_data.room,
-                        campus=lesson_data.campus,
-                        lesson_type=lesson_data.lesson_type,
+                lesson = f"Пара {pair} (неделя {week})"
+                if kind == "added":
+                    item = AddedLessonModel(
+                        day=day, lesson=lesson, details=after, week=week
+                    )
+                elif kind == "removed":
+                    item = RemovedLessonModel(
+                        day=day, lesson=lesson, details=before, week=week
+                    )
+                else:
+                    item = ModifiedLessonModel(
+                        day=day,
+                        lesson=lesson,
+                        changes=list(changes),
+                        before=before,
+                        after=after,
+                        week=week,
                     )
 
-                    existing_removed = next(
-                        (
-                            item
-                            for item in group_result.details.removed
-                            if item.day == day and f"Пара {pair_number}" in item.lesson
-                        ),
-                        None,
+                slot_items[item_key] = item
+                created.append(
+                    (
+                        (week, WEEKDAY_MAP.get(day, len(WEEKDAY_MAP)), int(pair)),
+                        kind,
+                        item,
                     )
+                )
 
-                    if existing_removed and (existing_removed.week % 2) == (
-                        week_number % 2
-                    ):
-                        if lessons_tracking is not None:
-                            if (
-                                week_number
-                                not in lessons_tracking[tracking_key]["weeks"]
-                            ):
-                                lessons_tracking[tracking_key]["weeks"][
-                                    week_number
-                                ] = {}
-                            lessons_tracking[tracking_key]["weeks"][week_number][
-                                "before"
-                            ] = details
-                    else:
-                        group_result.details.removed.append(
-                            RemovedLessonModel(
-                                day=day,
-                                lesson=f"Пара {pair_number} (неделя {week_number})",
-                                details=details,
-                                week=week_number,
-                            )
-                        )
-                        group_result.total += 1
-
-                        if lessons_tracking is not None:
-                            if (
-                                week_number
-                                not in lessons_tracking[tracking_key]["weeks"]
-                            ):
-                                lessons_tracking[tracking_key]["weeks"][
-                                    week_number
-                                ] = {}
-                            lessons_tracking[tracking_key]["weeks"][week_number][
-                                "before"
-                            ] = details
-                    continue
+            for (kind, parity), item in slot_items.items():
+                item.weeks_comparison = self._weeks_comparison(
+                    kind, weeks_by_parity[parity], tracked
+                )
 
-                if has_pair_in_schedule1 and has_pair_in_schedule2:
-                    lesson1 = day_schedule1[pair_number]
-                    lesson2 = day_schedule2[pair_number]
-                    changes = []
-
-                    for field in [
-                        "subject",
-                        "teacher",
-                        "room",
-                        "campus",
-                        "lesson_type",
-                    ]:
-                        value1 = getattr(lesson1, field, "—")
-                        value2 = getattr(lesson2, field, "—")
-
-                        if value1 != value2:
-                            changes.append(
-                                LessonChangeModel(
-                                    field=field,
-                                    from_value=value1,
-                                    to_value=value2,
-                                )
-                            )
-                            if field != "lesson_type":
-                                current_value = getattr(group_result.summary, field)
-                                setattr(group_result.summary, field, current_value + 1)
-
-                    before_details = LessonDetailsCompareModel(
-                        subject=lesson1.subject,
-                        teacher=lesson1.teacher,
-                        room=lesson1.room,
-                        campus=lesson1.campus,
-                        lesson_type=lesson1.lesson_type,
-                    )
-                    after_details = LessonDetailsCompareModel(
-                        subject=lesson2.subject,
-                        teacher=lesson2.teacher,
-                        room=lesson2.room,
-                        campus=lesson2.campus,
-                        lesson_type=lesson2.lesson_type,
-                    )
+        created.sort(key=lambda entry: entry[0])
+        for _, kind, item in created:
+            getattr(group_result.details, kind).append(item)
+        group_result.total = len(created)
 
-                    if changes:
-                        existing_modified = next(
-                            (
-                                item
-                                for item in group_result.details.modified
-                                if item.day == day
-                                and f"Пара {pair_number}" in item.lesson
-                            ),
-                            None,
-                        )
-
-                        if existing_modified and (existing_modified.week % 2) == (
-                            week_number % 2
-                        ):
-                            pass
-                        else:
-                            group_result.details.modified.append(
-                                ModifiedLessonModel(
-                                    day=day,
-                                    lesson=f"Пара {pair_number} (неделя {week_number})",
-                                    changes=changes,
-                                    before=before_details,
-                                    after=after_details,
-                                    week=week_number,
-                                )
-                            )
-                            group_result.total += 1
-
-                    if lessons_tracking is not None:
-                        if week_number not in lessons_tracking[tracking_key]["weeks"]:
-                            lessons_tracking[tracking_key]["weeks"][week_number] = {}
-                        lessons_tracking[tracking_key]["weeks"][week_number][
-                            "before"
-                        ] = before_details
-                        lessons_tracking[tracking_key]["weeks"][week_number][
-                            "after"
-                        ] = after_details
-
-                        if changes:
-                            lessons_tracking[tracking_key]["changes"].extend(changes)
+        return group_result
+
+    @staticmethod
+    def _index_slots(schedule: ScheduleResult, weeks_mask: int) -> SlotIndex:
+        """Индекс занятий по слоту и отпечатку с неделями из weeks_mask"""
+        slots: SlotIndex = {}
+        for lesson in schedule.lessons:
+            weeks = lesson.weeks & weeks_mask
+            if not weeks:
+                continue
+
+            fingerprint = lesson_fingerprint(lesson)
+            lessons = slots.setdefault((lesson.day, lesson.pair), {})
+            if fingerprint in lessons:
+                # Занятия, различающиеся только lesson_type_id, не различаются
+                weeks |= lessons[fingerprint][0]
+            lessons[fingerprint] = (weeks, lesson)
+        return slots
+
+    @staticmethod
+    def _fingerprints_by_week(
+        lessons: Dict[Fingerprint, Tuple[int, ScheduleLesson]],
+    ) -> Dict[int, Fingerprint]:
+        return {
+            week: fingerprint
+            for fingerprint, (weeks, _) in lessons.items()
+            for week in mask_to_weeks(weeks)
+        }
+
+    @staticmethod
+    def _lesson_changes(
+        fingerprint1: Fingerprint, fingerprint2: Fingerprint
+    ) -> List[LessonChangeModel]:
+        return [
+            LessonChangeModel(field=field, from_value=value1, to_value=value2)
+            for field, value1, value2 in zip(COMPARE_FIELDS, fingerprint1, fingerprint2)
+            if value1 != value2
+        ]
+
+    @staticmethod
+    def _weeks_comparison(
+        kind: str, weeks: List[int], tracked: TrackedWeeks
+    ) -> List[WeekComparisonItemModel]:
+        """Сравнение слота по всем неделям той же четности, что и запись"""
+        weeks_comparison = []
+
+        for week in weeks:
+            if week not in tracked:
+                weeks_comparison.append(WeekComparisonItemModel(week=week))
+                continue
+
+            before, after = tracked[week]
+
+            if kind == "modified":
+                week_info = WeekComparisonItemModel(
+                    week=week, before=before, after=after
+                )
+                if before and after:
+                    changed_fields = [
+                        field
+                        for field in SUMMARY_FIELDS
+                        if getattr(before, field) != getattr(after, field)
+                    ]
+                    if changed_fields:
+                        week_info.change_type = "modified"
+                        week_info.changed_fields = changed_fields
+                elif before:
+                    week_info.change_type = "removed"
+                elif after:
+                    week_info.change_type = "added"
+            elif before and after:
+                week_info = WeekComparisonItemModel(
+                    week=week, before=before, after=after
+                )
+            elif kind == "added" and after:
+                week_info = WeekComparisonItemModel(
+                    week=week, after=after, change_type="added"
+                )
+            elif kind == "removed" and before:
+                week_info = WeekComparisonItemModel(
+                    week=week, before=before, change_type="removed"
+                )
+            else:
+                week_info = WeekComparisonItemModel(week=week)
+
+            weeks_comparison.append(week_info)
+
+        return weeks_comparison
@@ -2,13 +2,11 @@ from io import BytesIO
 import httpx
 import asyncio
 
-from core.schemas.schedule import ScheduleResult
-from core.services.converters import StandardContentConverter
+from core.utils.schedule_content import schedule_from_content
+from core.services.conversion_pool import conversion_pool
 
 
 class ScheduleDownloader:
-    def __init__(self):
-        self.content_converter = StandardContentConverter()
 
     async def _make_request_with_retry(self, client, url, params=None, max_retries=3):
         for attempt in range(max_retries):
@@ -21,13 +19,27 @@ class ScheduleDownloader:
                     raise
                 await asyncio.sleep(1)
 
-    async def download_group_schedules(self, groups):
+    async def download_group_schedules(self, groups, on_progress=None):
+        """
+        Скачивает расписания групп. on_progress(done, total) вызывается
+        после обработки каждой группы
+        """
         group_schedules = {}
         group_ics_data = {}
 
         semaphore = asyncio.Semaphore(5)
+        processed = 0
 
         async def process_group(group):
+            nonlocal processed
+            try:
+                return await download_group(group)
+            finally:
+                processed += 1
+                if on_progress:
+                    await on_progress(processed, len(groups))
+
+        async def download_group(group):
             async with semaphore:
                 try:
                     async with httpx.AsyncClient() as client:
@@ -50,23 +62,21 @@ class ScheduleDownloader:
                         )
                         ics_data = ics_response.content
 
-                        try:
-                            schedule_data = self.content_converter.convert(
-                                ics_data, "ics"
-                            )
-                            if schedule_data:
-                                schedule_data.group_name = group
-                                return {
-                                    "group": group,
-                                    "schedule_result": schedule_data,
-                                    "ics_data": ics_data,
-                                }
-                        except ValueError as e:
-                            print(
-                                f"Ошибка конвертации расписания для группы {group}: {e}"
-                            )
+                        content = await conversion_pool.convert(ics_data, "ics")
+                        if not content:
+                            print(f"Ошибка конвертации расписания для группы {group}")
                             return None
 
+                        # ICS-файл группы содержит расписание одной группы
+                        group_content = next(iter(content.values()))
+                        return {
+                            "group": group,
+                            "schedule_result": schedule_from_content(
+                                group, group_content
+                            ),
+                            "ics_data": ics_data,
+                        }
+
                 except httpx.HTTPError as e:
                     print(f"Ошибка загрузки расписания для группы {group}: {e}")
                     return None
@@ -1,6 +1,18 @@
-from typing import Dict, List, Optional, Union, Any, Set, Tuple
+from typing import (
+    Any,
+    AsyncIterable,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import date, datetime
+from datetime import date, datetime, timezone
 import logging
 
 from core.db.models.schedule_models import (
@@ -13,24 +25,20 @@ from core.db.models.schedule_models import (
     ScRasp7Rooms,
     ScRasp18,
     ScRasp18Days,
-    ScRasp18Groups,
-    ScRasp18Preps,
-    ScRasp18Rooms,
     ScRasp18Move,
     ScRasp18Info,
 )
 from core.schemas.schedule import (
     ScheduleResult,
     LessonData,
-    WeekSchedule,
     LessonInfoModel,
     ScheduleImportResultModel,
 )
 from core.repositories.schedule_repository import ScheduleRepository
 from core.utils.db_utils import (
-    get_or_create_group,
-    get_or_create_disc,
-    get_or_create_prep,
+    get_or_create_groups,
+    get_or_create_discs,
+    get_or_create_preps,
     get_entity_by_field,
     OFFICIAL_MARKER,
 )
@@ -41,6 +49,8 @@ from core.utils.date_utils import (
     generate_semester_days,
 )
 from core.utils.maps import WEEKDAY_MAP
+from core.utils.schedule_content import mask_to_weeks
+from core.utils.semester_calendar import SemesterCalendar, get_cached_calendar
 
 
 class ScheduleProcessor:
@@ -56,6 +66,9 @@ class ScheduleProcessor:
         """
         Проверяет и при необходимости создает дни семестра
         """
+        if get_cached_calendar(semcode):
+            return
+
         days_exist = await self.repo.check_if_semester_days_exist(semcode)
         if days_exist:
             return
@@ -119,41 +132,36 @@ class ScheduleProcessor:
                     f"Данные для группы {group} должны быть объектом ScheduleResult"
                 )
 
-        schedule_data = data
-        group_ids = {}
-        disc_ids = {}
-        prep_ids = {}
+        return await self.resolve_entity_ids(data, is_official)
 
+    async def resolve_entity_ids(
+        self,
+        data: Dict[str, ScheduleResult],
+        is_official: bool = False,
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Собирает уникальные группы, дисциплины и преподавателей из данных
+        и получает (или создает) их ID пачками, по одному запросу на справочник
+        """
         unique_groups = set()
         unique_discs = set()
         unique_preps = set()
 
-        for group_title, schedule_result in schedule_data.items():
+        for group_title, schedule_result in data.items():
             unique_groups.add(group_title)
 
-            for week_number, week_schedule in schedule_result.week_schedules.items():
-                for weekday_str, pairs_data in week_schedule.weekday_schedules.items():
-                    for pair_slot, lesson_data in pairs_data.items():
-                        if lesson_data.subject:
-                            unique_discs.add(lesson_data.subject)
+            for lesson_data in schedule_result.lessons:
+                if lesson_data.subject:
+                    unique_discs.add(lesson_data.subject)
 
-                        if lesson_data.teacher:
-                            unique_preps.update(parse_csv_value(lesson_data.teacher))
+                if lesson_data.teacher:
+                    unique_preps.update(parse_csv_value(lesson_data.teacher))
 
-        for group_title in unique_groups:
-            group_ids[group_title] = await get_or_create_group(
-                self.db_session, group_title, is_official
-            )
-
-        for disc_title in unique_discs:
-            disc_ids[disc_title] = await get_or_create_disc(
-                self.db_session, disc_title, is_official
-            )
-
-        for prep_fio in unique_preps:
-            prep_ids[prep_fio] = await get_or_create_prep(
-                self.db_session, prep_fio, is_official
-            )
+        group_ids = await get_or_create_groups(
+            self.db_session, unique_groups, is_official
+        )
+        disc_ids = await get_or_create_discs(self.db_session, unique_discs, is_official)
+        prep_ids = await get_or_create_preps(self.db_session, unique_preps, is_official)
 
         return {"group_ids": group_ids, "disc_ids": disc_ids, "prep_ids": prep_ids}
 
@@ -176,53 +184,47 @@ class ScheduleProcessor:
         for group_title, schedule_result in data.items():
             group_id = group_ids[group_title]
 
-            for week_number, week_schedule in schedule_result.week_schedules.items():
-                for weekday_str, pairs_data in week_schedule.weekday_schedules.items():
-
-                    weekday = WEEKDAY_MAP.get(weekday_str, 0)
-
-                    for pair_slot, lesson_data in pairs_data.items():
-                        pair = parse_pair_number(pair_slot)
-                        if pair is None:
-                            continue
-
-                        if not lesson_data.subject:
-                            continue
-                        disc_id = disc_ids.get(lesson_data.subject, 0)
-                        worktype = lesson_data.lesson_type_id or 0
-
-                        agg_key = (group_id, weekday, pair, disc_id, worktype)
-
-                        if agg_key not in aggregated_lessons:
-                            aggregated_lessons[agg_key] = {
-                                "semcode": semcode,
-                                "version": version,
-                                "disc_id": disc_id,
-                                "weekday": weekday,
-                                "pair": pair,
-                                "worktype": worktype,
-                                "weeksarray": [week_number],
-                                "groups": set([group_id]),
-                                "rooms": set(),
-                                "preps": set(),
-                            }
-                        else:
-                            aggregated_lessons[agg_key]["weeksarray"].append(
-                                week_number
-                            )
-                            aggregated_lessons[agg_key]["groups"].add(group_id)
-
-                        if lesson_data.room:
-                            rooms = parse_csv_value(lesson_data.room)
-                            for room in rooms:
-                                aggregated_lessons[agg_key]["rooms"].add(room)
-
-                        if lesson_data.teacher:
-                            teachers = parse_csv_value(lesson_data.teacher)
-                            for teacher in teachers:
-                                prep_id = prep_ids.get(teacher, 0)
-                                if prep_id:
-                                    aggregated_lessons[agg_key]["preps"].add(prep_id)
+            for lesson_data in schedule_result.lessons:
+                weekday = WEEKDAY_MAP.get(lesson_data.day, 0)
+                pair = parse_pair_number(lesson_data.pair)
+                if pair is None:
+                    continue
+
+                if not lesson_data.subject:
+                    continue
+                disc_id = disc_ids.get(lesson_data.subject, 0)
+                worktype = lesson_data.lesson_type_id or 0
+
+                agg_key = (group_id, weekday, pair, disc_id, worktype)
+
+                if agg_key not in aggregated_lessons:
+                    aggregated_lessons[agg_key] = {
+                        "semcode": semcode,
+                        "version": version,
+                        "disc_id": disc_id,
+                        "weekday": weekday,
+                        "pair": pair,
+                        "worktype": worktype,
+                        "weeks": lesson_data.weeks,
+                        "groups": set([group_id]),
+                        "rooms": set(),
+                        "preps": set(),
+                    }
+                else:
+                    aggregated_lessons[agg_key]["weeks"] |= lesson_data.weeks
+                    aggregated_lessons[agg_key]["groups"].add(group_id)
+
+                if lesson_data.room:
+                    rooms = parse_csv_value(lesson_data.room)
+                    for room in rooms:
+                        aggregated_lessons[agg_key]["rooms"].add(room)
+
+                if lesson_data.teacher:
+                    teachers = parse_csv_value(lesson_data.teacher)
+                    for teacher in teachers:
+                        prep_id = prep_ids.get(teacher, 0)
+                        if prep_id:
+                            aggregated_lessons[agg_key]["preps"].add(prep_id)
 
         rasp7_entries = []
         groups_entries = []
@@ -230,7 +232,7 @@ class ScheduleProcessor:
         preps_entries = []
 
         for agg_data in aggregated_lessons.values():
-            weeks_array = sorted(list(set(agg_data["weeksarray"])))
+            weeks_array = mask_to_weeks(agg_data["weeks"])
 
             rasp7 = ScRasp7(
                 semcode=agg_data["semcode"],
@@ -295,148 +297,195 @@ class ScheduleProcessor:
 
         return related_entries
 
+    def aggregate_18week_lessons(
+        self,
+        semcode: int,
+        data: Dict[str, ScheduleResult],
+        entity_ids: Dict[str, Dict[str, int]],
+        calendar: SemesterCalendar,
+        is_official: bool = False,
+    ) -> Dict[Tuple[int, int, int, int], Dict[str, Any]]:
+        """
+        Собирает занятия 18-недельного расписания по ключу (день, пара, дисциплина,
+        тип занятия) с объединением групп, аудиторий и преподавателей
+        """
+        disc_ids = entity_ids["disc_ids"]
+        prep_ids = entity_ids["prep_ids"]
+
+        aggregated_lessons = {}
+
+        for group_title, schedule_result in data.items():
+            group_id = entity_ids["group_ids"][group_title]
+
+            for lesson_data in schedule_result.lessons:
+                pair = parse_pair_number(lesson_data.pair)
+                if pair is None or not lesson_data.subject:
+                    continue
+
+                weekday = WEEKDAY_MAP.get(lesson_data.day, 0)
+                disc_id = disc_ids[lesson_data.subject]
+                worktype = lesson_data.lesson_type_id or 0
+
+                rooms = set()
+                if lesson_data.room:
+                    for room in parse_csv_value(lesson_data.room):
+                        if is_official and not room.endswith(OFFICIAL_MARKER):
+                            room = f"{room}{OFFICIAL_MARKER}"
+                        rooms.add(room)
+
+                preps = set()
+                if lesson_data.teacher:
+                    for teacher in parse_csv_value(lesson_data.teacher):
+                        preps.add(prep_ids[teacher])
+
+                for week_number in mask_to_weeks(lesson_data.weeks):
+                    day = calendar.get_day(week_number, weekday)
+                    if not day:
+                        continue
+
+                    agg_key = (day.id, pair, disc_id, worktype)
+
+                    if agg_key not in aggregated_lessons:
+                        timestart, timeend = get_pair_time(pair)
+                        aggregated_lessons[agg_key] = {
+                            "semcode": semcode,
+                            "day_id": day.id,
+                            "pair": pair,
+                            "kind": 0,
+                            "worktype": worktype,
+                            "disc_id": disc_id,
+                            "timestart": timestart,
+                            "timeend": timeend,
+                            "groups": set(),
+                            "rooms": set(),
+                            "preps": set(),
+                        }
+
+                    aggregated_lessons[agg_key]["groups"].add(group_id)
+                    aggregated_lessons[agg_key]["rooms"].update(rooms)
+                    aggregated_lessons[agg_key]["preps"].update(preps)
+
+        return aggregated_lessons
+
     async def generate_18week_schedule(
         self,
         semcode: int,
         data: Dict[str, ScheduleResult],
         entity_ids: Dict[str, Dict[str, int]] = None,
         is_official: bool = False,
-    ) -> None:
+    ) -> Dict[str, int]:
         """
-        Генерирует 18-недельное расписание на основе входных данных
+        Генерирует 18-недельное расписание на основе входных данных.
+        Возвращает количество удаленных и созданных записей
         """
         await self.ensure_semester_days(semcode)
 
+        if entity_ids is None:
+            entity_ids = await self.resolve_entity_ids(data, is_official)
+
         group_ids = list(entity_ids["group_ids"].values())
-        await self.repo.delete_18week_schedule(semcode, group_ids)
+        deleted = await self.repo.delete_18week_schedule(semcode, group_ids)
 
-        days = await self.repo.get_semester_days(semcode)
-        if not days:
-            return
+        calendar = await self.repo.get_semester_calendar(semcode)
+        if not calendar:
+            return {"inserted": 0, "deleted": deleted, "unchanged": 0}
 
-        disc_ids = entity_ids.get("disc_ids", {})
-        prep_ids = entity_ids.get("prep_ids", {})
+        aggregated_lessons = self.aggregate_18week_lessons(
+            semcode, data, entity_ids, calendar, is_official
+        )
 
-        aggregated_lessons = {}
-        rasp18_entries = []
+        if aggregated_lessons:
+            await self.repo.bulk_create_18week_schedule(
+                list(aggregated_lessons.values())
+            )
+            await self.db_session.commit()
 
-        for group_title, schedule_result in data.items():
-            if (
-                entity_ids
-                and "group_ids" in entity_ids
-                and group_title in entity_ids["group_ids"]
-            ):
-                group_id = entity_ids["group_ids"][group_title]
+        return {"inserted": len(aggregated_lessons), "deleted": deleted, "unchanged": 0}
+
+    async def sync_18week_schedule(
+        self,
+        semcode: int,
+        data: Dict[str, ScheduleResult],
+        entity_ids: Dict[str, Dict[str, int]] = None,
+        is_official: bool = False,
+    ) -> Dict[str, int]:
+        """
+        Инкрементально применяет входные данные к 18-недельному расписанию:
+        сравнивает текущие записи групп с новыми по ключу (день, пара, дисциплина,
+        тип занятия, группы, преподаватели, аудитории) и удаляет/создает только
+        отличающиеся записи. Перенесенные пары сопоставляются по исходному слоту,
+        поэтому переносы и ID неизмененных пар сохраняются
+        """
+        await self.ensure_semester_days(semcode)
+
+        if entity_ids is None:
+            entity_ids = await self.resolve_entity_ids(data, is_official)
+
+        calendar = await self.repo.get_semester_calendar(semcode)
+        if not calendar:
+            return {"inserted": 0, "deleted": 0, "unchanged": 0}
+
+        incoming = {
+            self._lesson_diff_key(lesson): lesson
+            for lesson in self.aggregate_18week_lessons(
+                semcode, data, entity_ids, calendar, is_official
+            ).values()
+        }
+
+        group_ids = list(entity_ids["group_ids"].values())
+        existing_lessons = await self.repo.get_18week_lessons_for_groups(
+            semcode, group_ids
+        )
+
+        matched = set()
+        ids_to_delete = []
+        for lesson in existing_lessons:
+            key = self._lesson_diff_key(lesson)
+            if key in incoming and key not in matched:
+                matched.add(key)
             else:
-                group_id = await get_or_create_group(
-                    self.db_session, group_title, False
-                )
+                ids_to_delete.append(lesson["id"])
 
-            for week_number, week_schedule in schedule_result.week_schedules.items():
-                for weekday_str, pairs_data in week_schedule.weekday_schedules.items():
-                    weekday = WEEKDAY_MAP.get(weekday_str, 0)
-
-                    day = next(
-                        (
-                            d
-                            for d in days
-                            if d.week == week_number and d.weekday == weekday
-                        ),
-                        None,
-                    )
-                    if not day:
-                        continue
+        lessons_to_insert = [
+            lesson for key, lesson in incoming.items() if key not in matched
+        ]
 
-                    for pair_slot, lesson_data in pairs_data.items():
-                        pair = parse_pair_number(pair_slot)
-                        if pair is None or not lesson_data.subject:
-                            continue
-
-                        if lesson_data.subject not in disc_ids:
-                            disc_ids[lesson_data.subject] = await get_or_create_disc(
-                                self.db_session, lesson_data.subject, False
-                            )
-                        disc_id = disc_ids[lesson_data.subject]
-
-                        worktype = lesson_data.lesson_type_id or 0
-
-                        agg_key = (day.id, pair, disc_id, worktype)
-
-                        if agg_key not in aggregated_lessons:
-                            timestart, timeend = get_pair_time(pair)
-                            rasp18 = ScRasp18(
-                                semcode=semcode,
-                                day_id=day.id,
-                                pair=pair,
-                                kind=0,
-                                worktype=worktype,
-                                disc_id=disc_id,
-                                timestart=timestart,
-                                timeend=timeend,
-                            )
-                            rasp18_entries.append(rasp18)
-                            entry_idx = len(rasp18_entries) - 1
-
-                            aggregated_lessons[agg_key] = {
-                                "entry_idx": entry_idx,
-                                "groups": set(),
-                                "rooms": set(),
-                                "preps": set(),
-                            }
-
-                        aggregated_lessons[agg_key]["groups"].add(group_id)
-
-                        if lesson_data.room:
-                            rooms = parse_csv_value(lesson_data.room)
-                            for room in rooms:
-                                aggregated_lessons[agg_key]["rooms"].add(room)
-
-                        if lesson_data.teacher:
-                            teachers = parse_csv_value(lesson_data.teacher)
-                            for teacher in teachers:
-                                if teacher not in prep_ids:
-                                    prep_ids[teacher] = await get_or_create_prep(
-                                        self.db_session, teacher, False
-                                    )
-                                prep_id = prep_ids[teacher]
-                                aggregated_lessons[agg_key]["preps"].add(prep_id)
-
-        all_related = []
-
-        if rasp18_entries:
-            saved_entries = await self.repo.create_18week_schedule_entries(
-                rasp18_entries
-            )
+        await self.repo.delete_18week_lessons(ids_to_delete)
+        if lessons_to_insert:
+            await self.repo.bulk_create_18week_schedule(lessons_to_insert)
+        await self.db_session.commit()
 
-            for agg_key, agg_data in aggregated_lessons.items():
-                entry_idx = agg_data["entry_idx"]
-
-                for group_id in agg_data["groups"]:
-                    all_related.append(
-                        ScRasp18Groups(
-                            rasp18_id=rasp18_entries[entry_idx].id, group_id=group_id
-                        )
-                    )
-
-                for room in agg_data["rooms"]:
-                    room_value = room
-                    if is_official and not room.endswith(OFFICIAL_MARKER):
-                        room_value = f"{room}{OFFICIAL_MARKER}"
-                    all_related.append(
-                        ScRasp18Rooms(
-                            rasp18_id=rasp18_entries[entry_idx].id, room=room_value
-                        )
-                    )
-
-                for prep_id in agg_data["preps"]:
-                    all_related.append(
-                        ScRasp18Preps(
-                            rasp18_id=rasp18_entries[entry_idx].id, prep_id=prep_id
-                        )
-                    )
-
-            await self.repo.create_18week_relations(all_related)
-            await self.db_session.commit()
+        return {
+            "inserted": len(lessons_to_insert),
+            "deleted": len(ids_to_delete),
+            "unchanged": len(matched),
+        }
+
+    async def regenerate_18week_schedule(
+        self, semcode: int, version: int, group_ids: List[int] = None
+    ) -> Dict[str, int]:
+        """
+        Пересобирает 18-недельное расписание из уже сохраненного 7-дневного
+        без повторного чтения файла (например, после изменения дней семестра)
+        """
+        await self.ensure_semester_days(semcode)
+        return await self.repo.regenerate_18week_from_7day(semcode, version, group_ids)
+
+    @staticmethod
+    def _lesson_diff_key(lesson: Dict[str, Any]) -> Tuple:
+        """
+        Ключ сравнения записи 18-недельного расписания. Перенесенная пара
+        сравнивается по слоту до первого переноса (см. move_lesson)
+        """
+        return (
+            lesson.get("src_day_id") or lesson["day_id"],
+            lesson.get("src_pair") or lesson["pair"],
+            lesson["disc_id"],
+            lesson["worktype"],
+            frozenset(lesson["groups"]),
+            frozenset(lesson["preps"]),
+            frozenset(lesson["rooms"]),
+        )
 
     async def create_single_lesson(
         self,
@@ -544,10 +593,18 @@ class ScheduleProcessor:
 
         await self.repo.copy_lesson_relations(src_lesson.id, new_lesson.id)
 
+        # При повторном переносе сохраняется слот до первого переноса: запись
+        # о предыдущем переносе удаляется вместе с исходной парой, а по этому
+        # слоту пара сопоставляется с 7-дневным расписанием при импорте
+        src_day_id, src_pair = src_lesson.day_id, src_lesson.pair
+        if src_lesson.moves:
+            first_move = min(src_lesson.moves, key=lambda move: move.id)
+            src_day_id, src_pair = first_move.src_day_id, first_move.src_pair
+
         move_data = {
             "rasp18_dest_id": new_lesson.id,
-            "src_day_id": src_lesson.day_id,
-            "src_pair": src_lesson.pair,
+            "src_day_id": src_day_id,
+            "src_pair": src_pair,
             "reason": reason,
             "comment": comment,
         }
@@ -673,9 +730,12 @@ class ScheduleProcessor:
         version: int,
         data: Dict[str, ScheduleResult],
         is_official: bool = False,
+        incremental: bool = False,
     ) -> ScheduleImportResultModel:
         """
-        Импортирует расписание из стандартизированного содержимого
+        Импортирует расписание из стандартизированного содержимого.
+        В инкрементальном режиме 18-недельное расписание не пересоздается,
+        а обновляется только в отличающихся записях
         """
         if not data:
             raise ValueError("Данные расписания отсутствуют")
@@ -696,7 +756,14 @@ class ScheduleProcessor:
         )
         await self.repo.create_7day_relations(relations)
 
-        await self.generate_18week_schedule(semcode, data, entity_ids, is_official)
+        if incremental:
+            lessons_stats = await self.sync_18week_schedule(
+                semcode, data, entity_ids, is_official
+            )
+        else:
+            lessons_stats = await self.generate_18week_schedule(
+                semcode, data, entity_ids, is_official
+            )
 
         imported_groups = []
         for group_title in entity_ids["group_ids"].keys():
@@ -708,4 +775,159 @@ class ScheduleProcessor:
             imported_groups=imported_groups,
             total_groups=len(imported_groups),
             is_official=is_official,
+            inserted_lessons=lessons_stats["inserted"],
+            deleted_lessons=lessons_stats["deleted"],
+            unchanged_lessons=lessons_stats["unchanged"],
+        )
+
+    async def import_schedule_batched(
+        self,
+        semcode: int,
+        version: int,
+        data: Union[
+            Dict[str, ScheduleResult],
+            Iterable[Tuple[str, ScheduleResult]],
+            AsyncIterable[Tuple[str, ScheduleResult]],
+        ],
+        is_official: bool = False,
+        batch_size: int = 50,
+        checkpoint_key: Optional[str] = None,
+        on_progress: Optional[Callable[[int], Awaitable[None]]] = None,
+    ) -> ScheduleImportResultModel:
+        """
+        Импортирует расписание пакетами по batch_size групп, каждый пакет -
+        в отдельной транзакции. 7-дневное расписание пакета сохраняется, а
+        18-недельное пересобирается в PostgreSQL по затронутым слотам, поэтому
+        в памяти находятся данные только текущего пакета. data может быть
+        итератором или асинхронным итератором пар (группа, расписание),
+        например FileRepository.iter_file_schedule_results. При указании
+        checkpoint_key завершенные группы сохраняются в контрольной точке,
+        и повторный вызов после сбоя продолжает импорт с первого
+        незавершенного пакета.
+        on_progress(количество импортированных групп) вызывается после каждого пакета
+        """
+        if batch_size < 1:
+            raise ValueError("Размер пакета должен быть положительным")
+
+        await self.ensure_semester_days(semcode)
+
+        checkpoint = None
+        if checkpoint_key:
+            checkpoint = await self.repo.get_import_checkpoint(checkpoint_key)
+            if checkpoint and (
+                checkpoint.semcode,
+                checkpoint.version,
+                checkpoint.is_official,
+            ) != (semcode, version, is_official):
+                raise ValueError(
+                    "Контрольная точка импорта относится к другим параметрам импорта"
+                )
+            if not checkpoint:
+                checkpoint = await self.repo.create_import_checkpoint(
+                    checkpoint_key, semcode, version, is_official
+                )
+                await self.db_session.commit()
+
+        completed = set(checkpoint.completed_groups) if checkpoint else set()
+        imported_groups = []
+        stats = {"inserted": 0, "deleted": 0}
+        batch = {}
+
+        async def import_batch():
+            batch_stats = await self._import_group_batch(
+                semcode, version, batch, is_official, checkpoint
+            )
+            stats["inserted"] += batch_stats["inserted"]
+            stats["deleted"] += batch_stats["deleted"]
+            imported_groups.extend(batch.keys())
+            batch.clear()
+            if on_progress:
+                await on_progress(len(imported_groups))
+
+        async def iter_items():
+            if isinstance(data, AsyncIterable):
+                async for item in data:
+                    yield item
+            else:
+                for item in data.items() if isinstance(data, dict) else data:
+                    yield item
+
+        async for group_title, schedule_result in iter_items():
+            if group_title in completed:
+                imported_groups.append(group_title)
+                continue
+
+            if not isinstance(schedule_result, ScheduleResult):
+                raise ValueError(
+                    f"Данные для группы {group_title} должны быть объектом ScheduleResult"
+                )
+
+            batch[group_title] = schedule_result
+            if len(batch) >= batch_size:
+                await import_batch()
+
+        if batch:
+            await import_batch()
+
+        if not imported_groups:
+            raise ValueError("Данные расписания отсутствуют")
+
+        if checkpoint_key:
+            await self.repo.delete_import_checkpoint(checkpoint_key)
+            await self.db_session.commit()
+
+        return ScheduleImportResultModel(
+            semcode=semcode,
+            version=version,
+            imported_groups=imported_groups,
+            total_groups=len(imported_groups),
+            is_official=is_official,
+            inserted_lessons=stats["inserted"],
+            deleted_lessons=stats["deleted"],
+            unchanged_lessons=0,
+        )
+
+    async def _import_group_batch(
+        self,
+        semcode: int,
+        version: int,
+        batch: Dict[str, ScheduleResult],
+        is_official: bool,
+        checkpoint=None,
+    ) -> Dict[str, int]:
+        """
+        Импортирует пакет групп одной транзакцией вместе с обновлением
+        контрольной точки. Пересборка 18-недельного расписания по группам
+        пакета удаляет их записи sc_rasp18, кроме перенесенных пар, поэтому
+        занятия, которых нет в новом 7-дневном расписании, не остаются
+        """
+        entity_ids = await self.resolve_entity_ids(batch, is_official)
+        group_ids = list(entity_ids["group_ids"].values())
+
+        await self.repo.delete_7day_schedule(semcode, version, group_ids, commit=False)
+
+        rasp7_entries, relations_data = await self.create_7day_schedule(
+            semcode, version, batch, entity_ids
+        )
+        saved_entries = await self.repo.create_7day_schedule_entries(rasp7_entries)
+        relations = await self.prepare_7day_relations(
+            saved_entries, relations_data, is_official
         )
+        await self.repo.create_7day_relations(relations)
+
+        stats = await self.repo.regenerate_18week_from_7day(
+            semcode, version, group_ids, commit=False
+        )
+
+        if checkpoint is not None:
+            checkpoint.completed_groups = checkpoint.completed_groups + list(batch)
+            checkpoint.batches_done += 1
+            checkpoint.updated_at = datetime.now(timezone.utc)
+
+        await self.db_session.commit()
+
+        # Сохраненные записи пакета больше не нужны, освобождаем память сессии
+        for entry in (*saved_entries, *relations):
+            self.db_session.expunge(entry)
+
+        return stats
@@ -1,27 +1,44 @@
 import datetime
-from typing import Any, Dict, List, Literal, Optional, Tuple, Union
+import hashlib
+from typing import (
+    Any,
+    AsyncIterable,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Union,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.schemas.schedule import (
+    GroupComparisonModel,
+    ScheduleComparisonResultModel,
+    ScheduleLesson,
     ScheduleResult,
     ScheduleInfoModel,
     SemesterDatesModel,
     DayInfoModel,
     LessonInfoModel,
     ScheduleImportResultModel,
+    ScheduleRegenerateResultModel,
     CurrentWeekInfoModel,
     ScheduleResponseModel,
 )
 from core.settings.app_config import settings
 from core.utils.maps import WEEKDAY_MAP, WEEKDAY_MAP_REVERSE
 from core.repositories.schedule_repository import ScheduleRepository
+from core.services.schedule_compare import ScheduleCompareService
 from core.services.schedule_processor import ScheduleProcessor
-from core.utils.date_utils import get_current_semcode
+from core.utils.date_utils import get_current_semcode, parse_date
 from core.utils.db_utils import (
     get_or_create_disc,
     get_or_create_group,
     get_or_create_prep,
 )
+from core.utils.schedule_content import weeks_to_mask
 
 # Маркер для официального расписания
 OFFICIAL_MARKER = "*"
@@ -195,8 +212,8 @@ class ScheduleService:
 
         today = datetime.date.today()
 
-        all_days = await self.repo.get_semester_days(semcode)
-        if not all_days:
+        calendar = await self.repo.get_semester_calendar(semcode)
+        if not calendar:
             return CurrentWeekInfoModel(
                 week_number=None,
                 is_odd_week=None,
@@ -205,80 +222,224 @@ class ScheduleService:
                 current_day=today.isoformat(),
             )
 
-        current_day = None
-        for day in all_days:
-            if day.day <= today and (current_day is None or day.day > current_day.day):
-                current_day = day
+        current_day = calendar.get_last_day_before(today)
 
         if current_day is None:
-            if today < all_days[0].day:
-                first_day = all_days[0]
-                week_number = first_day.week
-                is_odd_week = week_number % 2 == 1
-
-                week_days = [d for d in all_days if d.week == week_number]
-                week_start = min(d.day for d in week_days)
-                week_end = max(d.day for d in week_days)
-
-                return CurrentWeekInfoModel(
-                    week_number=week_number,
-                    is_odd_week=is_odd_week,
-                    week_start=week_start.isoformat(),
-                    week_end=week_end.isoformat(),
-                    current_day=today.isoformat(),
-                    status="before_semester",
-                )
-            else:
-                last_day = all_days[-1]
-                week_number = last_day.week
-                is_odd_week = week_number % 2 == 1
-
-                week_days = [d for d in all_days if d.week == week_number]
-                week_start = min(d.day for d in week_days)
-                week_end = max(d.day for d in week_days)
-
-                return CurrentWeekInfoModel(
-                    week_number=week_number,
-                    is_odd_week=is_odd_week,
-                    week_start=week_start.isoformat(),
-                    week_end=week_end.isoformat(),
-                    current_day=today.isoformat(),
-                    status="after_semester",
-                )
+            week_number = calendar.days[0].week
+            status = "before_semester"
+        else:
+            week_number = current_day.week
+            status = "in_semester"
 
-        week_number = current_day.week
-        is_odd_week = week_number % 2 == 1
-
-        week_days = [d for d in all_days if d.week == week_number]
-        week_start = min(d.day for d in week_days)
-        week_end = max(d.day for d in week_days)
+        week_start, week_end = calendar.get_week_bounds(week_number)
 
         return CurrentWeekInfoModel(
             week_number=week_number,
-            is_odd_week=is_odd_week,
+            is_odd_week=week_number % 2 == 1,
             week_start=week_start.isoformat(),
             week_end=week_end.isoformat(),
             current_day=today.isoformat(),
-            status="in_semester",
+            status=status,
         )
 
     async def import_schedule_from_standardized_content(
         self,
         semcode: int,
         version: int,
-        standardized_content: Dict[str, ScheduleResult],
+        standardized_content: Union[
+            Dict[str, ScheduleResult],
+            Iterable[Tuple[str, ScheduleResult]],
+            AsyncIterable[Tuple[str, ScheduleResult]],
+        ],
         is_official: bool = False,
+        incremental: bool = False,
+        batch_size: Optional[int] = None,
+        checkpoint_key: Optional[str] = None,
+        on_progress=None,
+        content_hash: Optional[str] = None,
+        file_id: Optional[int] = None,
     ) -> ScheduleImportResultModel:
         """
-        Импортирует расписание из стандартизированного содержимого файла
+        Импортирует расписание из стандартизированного содержимого файла.
+        При указании batch_size импорт выполняется пакетами групп
+        с отдельной транзакцией на пакет. Если передан content_hash и последним
+        в семкод и версию импортировалось то же содержимое, импорт пропускается
+        """
+        if content_hash:
+            last_import = await self.repo.get_last_import(semcode, version)
+            if (
+                last_import
+                and last_import.content_hash == content_hash
+                and last_import.is_official == is_official
+            ):
+                if isinstance(standardized_content, dict):
+                    group_titles = list(standardized_content.keys())
+                elif isinstance(standardized_content, AsyncIterable):
+                    group_titles = [title async for title, _ in standardized_content]
+                else:
+                    group_titles = [title for title, _ in standardized_content]
+
+                return ScheduleImportResultModel(
+                    semcode=semcode,
+                    version=version,
+                    imported_groups=group_titles,
+                    total_groups=len(group_titles),
+                    is_official=is_official,
+                    cache_hit=True,
+                )
+
+        if batch_size:
+            if incremental:
+                raise ValueError(
+                    "Инкрементальный режим не поддерживается при пакетном импорте"
+                )
+            result = await self.processor.import_schedule_batched(
+                semcode=semcode,
+                version=version,
+                data=standardized_content,
+                is_official=is_official,
+                batch_size=batch_size,
+                checkpoint_key=checkpoint_key,
+                on_progress=on_progress,
+            )
+        else:
+            result = await self.processor.import_schedule(
+                semcode=semcode,
+                version=version,
+                data=standardized_content,
+                is_official=is_official,
+                incremental=incremental,
+            )
+
+        # Импорт без хеша тоже фиксируется, чтобы следующий импорт файла
+        # с совпадающим хешем не был пропущен
+        await self.repo.record_import(
+            semcode, version, is_official, content_hash, file_id
+        )
+
+        return result
+
+    @staticmethod
+    def file_import_checkpoint_key(
+        file_id: int,
+        semcode: int,
+        version: int,
+        is_official: bool,
+        group_titles: Optional[Iterable[str]] = None,
+    ) -> str:
+        """
+        Ключ контрольной точки пакетного импорта файла. Импорт части групп
+        получает отдельный ключ по хэшу их названий
         """
-        return await self.processor.import_schedule(
+        key = f"file:{file_id}:{semcode}:{version}:{int(is_official)}"
+        if group_titles is None:
+            return key
+        groups_hash = hashlib.sha256(
+            "\n".join(sorted(group_titles)).encode()
+        ).hexdigest()
+        return f"{key}:{groups_hash[:16]}"
+
+    async def regenerate_18week_schedule(
+        self,
+        semcode: int,
+        version: int,
+        group_titles: Optional[List[str]] = None,
+    ) -> ScheduleRegenerateResultModel:
+        """
+        Пересобирает 18-недельное расписание из 7-дневного для семкода и версии,
+        при необходимости только для указанных групп
+        """
+        group_ids = None
+        if group_titles:
+            found = await self.repo.get_group_ids_by_titles(group_titles)
+            missing = [title for title in group_titles if title not in found]
+            if missing:
+                raise ValueError(f"Группы не найдены: {', '.join(missing)}")
+            group_ids = list(found.values())
+
+        stats = await self.processor.regenerate_18week_schedule(
+            semcode, version, group_ids
+        )
+
+        return ScheduleRegenerateResultModel(
             semcode=semcode,
             version=version,
-            data=standardized_content,
-            is_official=is_official,
+            groups=group_titles or [],
+            inserted_lessons=stats["inserted"],
+            deleted_lessons=stats["deleted"],
         )
 
+    async def compare_versions(
+        self,
+        semcode_1: int,
+        version_1: int,
+        official_1: bool,
+        semcode_2: int,
+        version_2: int,
+        official_2: bool,
+    ) -> ScheduleComparisonResultModel:
+        """
+        Сравнивает две версии 7-дневного расписания из базы данных (например,
+        официальное и черновое). Различия находит PostgreSQL, в приложение
+        загружаются только недели групп и занятия измененных слотов
+        """
+        rows = await self.repo.get_7day_version_diff(
+            semcode_1, version_1, official_1, semcode_2, version_2, official_2
+        )
+        lesson_types = {
+            type_id: name for name, type_id in settings.LESSON_TYPES.items()
+        }
+
+        # {группа: [недели в версии 1, недели в версии 2]}
+        group_weeks: Dict[str, List[int]] = {}
+        # {группа: (измененные слоты версии 1, измененные слоты версии 2)}
+        changed: Dict[str, Tuple[ScheduleResult, ScheduleResult]] = {}
+
+        for row in rows:
+            if row.weekday is None:
+                group_weeks.setdefault(row.group_title, [0, 0])[row.side - 1] = (
+                    weeks_to_mask(row.weeks)
+                )
+                continue
+
+            schedules = changed.setdefault(
+                row.group_title,
+                (
+                    ScheduleResult(group_name=row.group_title),
+                    ScheduleResult(group_name=row.group_title),
+                ),
+            )
+            schedules[row.side - 1].lessons.append(
+                ScheduleLesson(
+                    day=WEEKDAY_MAP_REVERSE.get(row.weekday, ""),
+                    pair=str(row.pair),
+                    weeks=weeks_to_mask(row.weeks),
+                    subject=row.subject,
+                    teacher=row.teacher,
+                    room=row.room,
+                    lesson_type=lesson_types.get(row.worktype, str(row.worktype)),
+                    lesson_type_id=row.worktype,
+                )
+            )
+
+        compare_service = ScheduleCompareService()
+        result = ScheduleComparisonResultModel()
+
+        for group in sorted(group_weeks):
+            weeks_mask1, weeks_mask2 = group_weeks[group]
+            if not weeks_mask1:
+                result.groups[group] = compare_service.missing_group_result(added=True)
+            elif not weeks_mask2:
+                result.groups[group] = compare_service.missing_group_result(added=False)
+            elif group in changed:
+                result.groups[group] = compare_service.compare_group(
+                    *changed[group], weeks_masks=(weeks_mask1, weeks_mask2)
+                )
+            else:
+                result.groups[group] = GroupComparisonModel()
+
+        return result
+
     async def add_lesson(
         self,
         semcode: int,
@@ -297,7 +458,9 @@ class ScheduleService:
         Добавляет новую пару в расписание
         """
 
-        day = await self.repo.get_day_by_date(semcode, datestr)
+        calendar = await self.repo.get_semester_calendar(semcode)
+        date_value = parse_date(datestr)
+        day = calendar.get_day_by_date(date_value) if date_value else None
         if not day:
             raise ValueError(f"День с датой {datestr} не найден")
 
@@ -335,34 +498,20 @@ class ScheduleService:
                 datestr=datestr,
             )
 
-        semester_dates = await self.get_semester_dates(semcode)
-
         created_lessons = []
         errors = []
 
         for week_number in weeks:
-            target_day = next(
-                (
-                    d
-                    for d in semester_dates.days
-                    if d.week == week_number and d.weekday == day.weekday
-                ),
-                None,
-            )
-
+            target_day = calendar.get_day(week_number, day.weekday)
             if not target_day:
                 continue
 
-            target_datestr = target_day.date
-            target_day_obj = await self.repo.get_day_by_date(semcode, target_datestr)
-
-            if not target_day_obj:
-                continue
+            target_datestr = target_day.day.isoformat()
 
             try:
                 lesson_info = await self.processor.create_single_lesson(
                     semcode=semcode,
-                    day_id=target_day_obj.id,
+                    day_id=target_day.id,
                     pair=pair,
                     kind=kind,
                     worktype=worktype,
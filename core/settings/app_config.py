@@ -28,6 +28,48 @@ class Settings(BaseSettings):
     def SQLALCHEMY_DATABASE_URI(self) -> str:
         return f"""postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"""
 
+    # Пул процессов для конвертации Excel/ICS файлов
+    CONVERTER_WORKERS: int = 2
+    CONVERTER_TIMEOUT: float = 120.0
+    CONVERTER_MAX_QUEUE: int = 16
+    # Минимальное число общих групп, начиная с которого сравнение файлов
+    # выполняется параллельно в пуле процессов
+    COMPARE_PARALLEL_MIN_GROUPS: int = 100
+    # Сравнивать загруженный файл с предыдущим сразу после загрузки,
+    # чтобы результат сравнения был сохранен к первому просмотру
+    COMPARE_PRECOMPUTE_ON_UPLOAD: bool = False
+
+    # Хранилище исходных файлов: "local" - каталог BLOB_STORAGE_PATH с файлами
+    # по SHA-256 содержимого, "database" - колонка schedule_files.file_data
+    BLOB_STORAGE: str = "local"
+    BLOB_STORAGE_PATH: str = "storage/blobs"
+
+    # Загрузка файлов: файл записывается в каталог UPLOAD_SPOOL_PATH частями
+    # по UPLOAD_CHUNK_SIZE байт, файлы больше UPLOAD_MAX_SIZE байт отклоняются.
+    # Каталог лучше держать в той же файловой системе, что и BLOB_STORAGE_PATH:
+    # тогда файл переносится в хранилище переименованием
+    UPLOAD_MAX_SIZE: int = 50 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    UPLOAD_SPOOL_PATH: str = "storage/spool"
+
+    # Формат хранения standardized_content: "msgpack" - msgpack со сжатием
+    # zlib в schedule_files.packed_content, "json" - JSON-колонка
+    CONTENT_CODEC: str = "msgpack"
+
+    # Регулярное выражение для заголовка столбца группы в Excel-файле
+    EXCEL_GROUP_PATTERN: str = r"[А-ЯЁ]{2,5}-\d{2,3}-\d{2}"
+
+    # Количество групп в пакете при пакетном импорте
+    IMPORT_BATCH_SIZE: int = 50
+
+    # Фоновые задачи (start_worker.py)
+    WORKER_CONCURRENCY: int = 2
+    WORKER_POLL_INTERVAL: float = 1.0
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_DELAY: int = 30
+    JOB_HEARTBEAT_INTERVAL: int = 15
+    JOB_STALE_TIMEOUT: int = 300
+
     LESSON_TYPES: dict = {
         "ПР": 0,
         "ЛК": 1,
@@ -0,0 +1,24 @@
+import zlib
+from typing import Any, Dict
+
+import msgpack
+
+# Первый байт закодированного содержимого - формат, чтобы формат можно было
+# сменить без миграции сохраненных файлов
+MSGPACK_ZLIB = b"\x01"
+
+
+def encode_content(content: Dict[str, Any]) -> bytes:
+    """
+    Кодирует standardized_content для хранения в schedule_files.packed_content:
+    msgpack, сжатый zlib. Повторяющиеся ключи и значения занятий сжимаются
+    в несколько раз лучше, чем в JSON
+    """
+    return MSGPACK_ZLIB + zlib.compress(msgpack.packb(content, use_bin_type=True))
+
+
+def decode_content(data: bytes) -> Dict[str, Any]:
+    """Восстанавливает standardized_content, закодированный encode_content"""
+    if data[:1] != MSGPACK_ZLIB:
+        raise ValueError("Неизвестный формат содержимого файла")
+    return msgpack.unpackb(zlib.decompress(data[1:]), raw=False)
@@ -1,4 +1,5 @@
-from typing import Optional, TypeVar, Type, Dict, Any
+from typing import Optional, TypeVar, Type, Dict, Any, Iterable
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
@@ -20,6 +21,18 @@ async def get_entity_by_field(
     return (await db.scalars(stmt)).first()
 
 
+def normalize_entity_value(value: str, is_official: bool = False) -> str:
+    """
+    Приводит значение к виду, в котором оно хранится в справочнике:
+    официальные записи помечаются маркером, черновые хранятся без него
+    """
+    if is_official and not value.endswith(OFFICIAL_MARKER):
+        return f"{value}{OFFICIAL_MARKER}"
+    if not is_official and value.endswith(OFFICIAL_MARKER):
+        return value[:-1]
+    return value
+
+
 async def get_or_create_entity(
     db: AsyncSession,
     model: Type[ModelType],
@@ -31,12 +44,7 @@ async def get_or_create_entity(
     """
     Получает или создает сущность и возвращает ее ID
     """
-    search_value = value
-
-    if is_official and not value.endswith(OFFICIAL_MARKER):
-        search_value = f"{value}{OFFICIAL_MARKER}"
-    elif not is_official and not value.endswith(OFFICIAL_MARKER):
-        search_value = value[:-1]
+    search_value = normalize_entity_value(value, is_official)
 
     entity = await get_entity_by_field(db, model, field_name, search_value)
 
@@ -53,6 +61,78 @@ async def get_or_create_entity(
     return entity.id
 
 
+async def get_or_create_entities(
+    db: AsyncSession,
+    model: Type[ModelType],
+    field_name: str,
+    values: Iterable[str],
+    is_official: bool = False,
+    chunk_size: int = 1000,
+) -> Dict[str, int]:
+    """
+    Получает или создает сущности пачкой и возвращает словарь значение -> ID.
+
+    На каждую пачку выполняется один запрос INSERT ... ON CONFLICT DO NOTHING
+    RETURNING, объединенный с выборкой уже существующих записей
+    (требуется уникальный индекс по полю).
+    """
+    search_values = {
+        value: normalize_entity_value(value, is_official) for value in set(values)
+    }
+    if not search_values:
+        return {}
+
+    col = getattr(model, field_name)
+    unique_values = sorted(set(search_values.values()))
+    ids: Dict[str, int] = {}
+
+    for i in range(0, len(unique_values), chunk_size):
+        chunk = unique_values[i : i + chunk_size]
+        inserted = (
+            pg_insert(model)
+            .values([{field_name: value} for value in chunk])
+            .on_conflict_do_nothing(index_elements=[field_name])
+            .returning(model.id, col)
+            .cte("inserted")
+        )
+        stmt = select(inserted.c.id, inserted.c[field_name]).union_all(
+            select(model.id, col).where(col.in_(chunk))
+        )
+        for entity_id, value in (await db.execute(stmt)).all():
+            ids[value] = entity_id
+
+    # Записи, вставленные параллельной транзакцией после начала запроса,
+    # не попадают ни в RETURNING, ни в снимок выборки
+    missing = [value for value in unique_values if value not in ids]
+    if missing:
+        stmt = select(model.id, col).where(col.in_(missing))
+        for entity_id, value in (await db.execute(stmt)).all():
+            ids[value] = entity_id
+
+    return {value: ids[search_value] for value, search_value in search_values.items()}
+
+
+async def get_or_create_discs(
+    db: AsyncSession, titles: Iterable[str], is_official: bool = False
+) -> Dict[str, int]:
+    """Получает или создает дисциплины по названиям"""
+    return await get_or_create_entities(db, ScDisc, "title", titles, is_official)
+
+
+async def get_or_create_groups(
+    db: AsyncSession, titles: Iterable[str], is_official: bool = False
+) -> Dict[str, int]:
+    """Получает или создает группы по названиям"""
+    return await get_or_create_entities(db, ScGroup, "title", titles, is_official)
+
+
+async def get_or_create_preps(
+    db: AsyncSession, fios: Iterable[str], is_official: bool = False
+) -> Dict[str, int]:
+    """Получает или создает преподавателей по ФИО"""
+    return await get_or_create_entities(db, ScPrep, "fio", fios, is_official)
+
+
 async def get_or_create_disc(
     db: AsyncSession, title: str, is_official: bool = False
 ) -> int:
@@ -0,0 +1,140 @@
+from typing import Any, Dict, Iterable, List, Tuple
+
+from core.schemas.schedule import (
+    LessonData,
+    ScheduleLesson,
+    ScheduleResult,
+    WeekSchedule,
+)
+
+LESSON_FIELDS = (
+    "subject",
+    "teacher",
+    "room",
+    "campus",
+    "lesson_type",
+    "lesson_type_id",
+)
+
+
+def weeks_to_mask(weeks: Iterable[int]) -> int:
+    """Преобразует номера недель (с 1) в битовую маску"""
+    mask = 0
+    for week in weeks:
+        if week >= 1:
+            mask |= 1 << (week - 1)
+    return mask
+
+
+def mask_to_weeks(mask: int) -> List[int]:
+    """Преобразует битовую маску в отсортированный список номеров недель"""
+    weeks = []
+    week = 1
+    while mask:
+        if mask & 1:
+            weeks.append(week)
+        mask >>= 1
+        week += 1
+    return weeks
+
+
+def lesson_key(lesson: LessonData) -> Tuple:
+    """Содержимое занятия без слота и недель"""
+    return tuple(getattr(lesson, field) for field in LESSON_FIELDS)
+
+
+def schedule_weeks_mask(schedule: ScheduleResult) -> int:
+    """Маска недель, в которых у группы есть хотя бы одно занятие"""
+    mask = 0
+    for lesson in schedule.lessons:
+        mask |= lesson.weeks
+    return mask
+
+
+def add_lesson(
+    schedule: ScheduleResult,
+    weeks: int,
+    day: str,
+    pair: str,
+    lesson_data: LessonData,
+) -> None:
+    """
+    Добавляет занятие в слот (день, пара) на недели из маски weeks. Как и при
+    записи по неделям, новое занятие заменяет другие занятия слота на этих
+    неделях, а совпадающее по содержимому занятие объединяется с ним
+    """
+    if not weeks:
+        return
+
+    key = lesson_key(lesson_data)
+    merged = False
+    lessons = []
+
+    for lesson in schedule.lessons:
+        if lesson.day == day and lesson.pair == pair:
+            if not merged and lesson_key(lesson) == key:
+                lesson.weeks |= weeks
+                merged = True
+            else:
+                lesson.weeks &= ~weeks
+                if not lesson.weeks:
+                    continue
+        lessons.append(lesson)
+
+    if not merged:
+        lessons.append(
+            ScheduleLesson(
+                day=day,
+                pair=pair,
+                weeks=weeks,
+                **{field: getattr(lesson_data, field) for field in LESSON_FIELDS},
+            )
+        )
+
+    schedule.lessons = lessons
+
+
+def schedule_to_content(schedule: ScheduleResult) -> Dict[str, Any]:
+    """
+    Преобразует расписание группы в значение standardized_content:
+    {"lessons": [занятие с маской недель, ...]}, поля со значениями
+    по умолчанию не сохраняются
+    """
+    return {
+        "lessons": [
+            lesson.model_dump(exclude_defaults=True) for lesson in schedule.lessons
+        ]
+    }
+
+
+def schedule_from_content(group_name: str, content: Dict[str, Any]) -> ScheduleResult:
+    """
+    Восстанавливает расписание группы из значения standardized_content.
+    Прежний формат {неделя: {"week_number", "weekday_schedules"}} преобразуется
+    без потерь: одинаковые занятия слота на разных неделях объединяются в одно
+    """
+    if "lessons" in (content or {}):
+        return ScheduleResult(group_name=group_name, lessons=content["lessons"])
+
+    lessons: Dict[Tuple, ScheduleLesson] = {}
+
+    for week_key, week_data in (content or {}).items():
+        week_schedule = WeekSchedule.model_validate(
+            {"week_number": week_key, **week_data}
+        )
+        week_bit = weeks_to_mask([week_schedule.week_number])
+
+        for day, pairs in week_schedule.weekday_schedules.items():
+            for pair, lesson_data in pairs.items():
+                key = (day, pair, lesson_key(lesson_data))
+                if key in lessons:
+                    lessons[key].weeks |= week_bit
+                else:
+                    lessons[key] = ScheduleLesson(
+                        day=day,
+                        pair=pair,
+                        weeks=week_bit,
+                        **lesson_data.model_dump(),
+                    )
+
+    return ScheduleResult(group_name=group_name, lessons=list(lessons.values()))
@@ -0,0 +1,92 @@
+import bisect
+import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class SemesterDay(NamedTuple):
+    """День семестра"""
+
+    id: int
+    day: datetime.date
+    weekday: int
+    week: int
+
+
+class SemesterCalendar:
+    """
+    Календарь семестра с поиском дня по (неделя, день недели) и по дате за O(1)
+    """
+
+    def __init__(self, semcode: int, days: Iterable[SemesterDay]):
+        self.semcode = semcode
+        self.days: List[SemesterDay] = sorted(days, key=lambda d: d.day)
+        self._dates = [d.day for d in self.days]
+        self._by_week_weekday: Dict[Tuple[int, int], SemesterDay] = {
+            (d.week, d.weekday): d for d in self.days
+        }
+        self._by_date: Dict[datetime.date, SemesterDay] = {d.day: d for d in self.days}
+        self._week_bounds: Dict[int, Tuple[datetime.date, datetime.date]] = {}
+
+        for d in self.days:
+            start, end = self._week_bounds.get(d.week, (d.day, d.day))
+            self._week_bounds[d.week] = (min(start, d.day), max(end, d.day))
+
+    @classmethod
+    def from_models(cls, semcode: int, days) -> "SemesterCalendar":
+        """Создает календарь из записей ScRasp18Days"""
+        return cls(
+            semcode,
+            (SemesterDay(d.id, d.day, d.weekday, d.week) for d in days),
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.days)
+
+    @property
+    def start_date(self) -> Optional[datetime.date]:
+        return self._dates[0] if self._dates else None
+
+    @property
+    def end_date(self) -> Optional[datetime.date]:
+        return self._dates[-1] if self._dates else None
+
+    def get_day(self, week: int, weekday: int) -> Optional[SemesterDay]:
+        """Возвращает день по номеру недели и дню недели"""
+        return self._by_week_weekday.get((week, weekday))
+
+    def get_day_by_date(self, date_value: datetime.date) -> Optional[SemesterDay]:
+        """Возвращает день по дате"""
+        return self._by_date.get(date_value)
+
+    def get_last_day_before(self, date_value: datetime.date) -> Optional[SemesterDay]:
+        """Возвращает последний день семестра, не позже указанной даты"""
+        idx = bisect.bisect_right(self._dates, date_value)
+        return self.days[idx - 1] if idx else None
+
+    def get_week_bounds(
+        self, week: int
+    ) -> Optional[Tuple[datetime.date, datetime.date]]:
+        """Возвращает первую и последнюю дату недели"""
+        return self._week_bounds.get(week)
+
+
+_calendars: Dict[int, SemesterCalendar] = {}
+
+
+def get_cached_calendar(semcode: int) -> Optional[SemesterCalendar]:
+    """Возвращает календарь семестра из кэша процесса"""
+    return _calendars.get(semcode)
+
+
+def cache_calendar(calendar: SemesterCalendar) -> None:
+    """Сохраняет календарь семестра в кэш процесса"""
+    if calendar:
+        _calendars[calendar.semcode] = calendar
+
+
+def invalidate_calendar(semcode: Optional[int] = None) -> None:
+    """Сбрасывает кэш календаря семестра (или всех семестров)"""
+    if semcode is None:
+        _calendars.clear()
+    else:
+        _calendars.pop(semcode, None)
@@ -0,0 +1,49 @@
+import hashlib
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, NamedTuple
+
+from core.settings.app_config import settings
+
+
+class UploadTooLargeError(ValueError):
+    """Загружаемый файл больше UPLOAD_MAX_SIZE"""
+
+
+class SpooledUpload(NamedTuple):
+    """Загруженный файл во временном файле на диске"""
+
+    path: str
+    size: int
+    content_hash: str  # SHA-256 содержимого
+
+
+@asynccontextmanager
+async def spool_upload(file) -> AsyncIterator[SpooledUpload]:
+    """
+    Записывает загружаемый файл (UploadFile) во временный файл в каталоге
+    UPLOAD_SPOOL_PATH частями по UPLOAD_CHUNK_SIZE байт, считая SHA-256
+    по ходу записи, так что в памяти находится не больше одной части.
+    Временный файл удаляется при выходе, если его не переместили
+    """
+    os.makedirs(settings.UPLOAD_SPOOL_PATH, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=settings.UPLOAD_SPOOL_PATH, suffix=".upload")
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        with os.fdopen(fd, "wb") as spool:
+            while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.UPLOAD_MAX_SIZE:
+                    raise UploadTooLargeError(
+                        "Размер файла превышает "
+                        f"{settings.UPLOAD_MAX_SIZE // (1024 * 1024)} МБ"
+                    )
+                digest.update(chunk)
+                spool.write(chunk)
+
+        yield SpooledUpload(path=path, size=size, content_hash=digest.hexdigest())
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,15 @@
+import asyncio
+
+from core.db.session import Session
+from core.repositories.file_repository import FileRepository
+
+
+async def move_blobs() -> None:
+    """Переносит исходные файлы из schedule_files.file_data в хранилище"""
+    async with Session() as session:
+        moved = await FileRepository(session).move_file_data_to_storage()
+    print(f"Перенесено файлов: {moved}")
+
+
+if __name__ == "__main__":
+    asyncio.run(move_blobs())
@@ -0,0 +1,6 @@
+import asyncio
+
+from core.services.job_worker import run_worker
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())
@@ -135,107 +135,160 @@ function renderVersionOptions() {
     }
 }
 
+function compareGroupResults(a, b) {
+    if (b[1].total !== a[1].total) {
+        return b[1].total - a[1].total;
+    }
+    return a[0].localeCompare(b[0]);
+}
+
 function renderComparisonResults(result) {
     const comparisonResultsBody = document.getElementById("comparisonResultsBody");
     const comparisonResults = document.getElementById("comparisonResults");
 
     comparisonResultsBody.innerHTML = "";
 
-    const sortedGroups = Object.entries(result.groups).sort((a, b) => {
-        if (b[1].total !== a[1].total) {
-            return b[1].total - a[1].total;
-        }
-        return a[0].localeCompare(b[0]);
-    });
+    const sortedGroups = Object.entries(result.groups).sort(compareGroupResults);
 
     sortedGroups.forEach(([groupName, groupData], index) => {
-        const tr = document.createElement("tr");
-        tr.className = "group-row";
-        tr.dataset.detailsId = `details-${index}`;
-
-        tr.innerHTML = `
-      <td>
-          ${groupData.total
-                ? `<span class="icon toggle-icon"><i class="fas fa-chevron-right"></i></span>`
-                : ""
-            }
-          ${groupName}
-      </td>
-      <td class="${groupData.total ? "has-changes" : "no-changes"}">
-          ${groupData.total
-                ? `${groupData.total} изменений`
-                : "Нет изменений"
-            }
-      </td>
-      <td>${renderSummaryBadges(groupData.summary, groupData)}</td>
-    `;
+        renderGroupRows(groupName, groupData, index).forEach((row) =>
+            comparisonResultsBody.appendChild(row)
+        );
+    });
 
-        comparisonResultsBody.appendChild(tr);
-
-        if (groupData.total > 0) {
-            const detailsRow = document.createElement("tr");
-            detailsRow.className = "details-row";
-            detailsRow.id = `details-${index}`;
-            const detailsCell = document.createElement("td");
-            detailsCell.colSpan = 3;
-
-            const detailsContent = document.createElement("div");
-            detailsContent.className = "change-details";
-
-            if (groupData.details.added.length > 0) {
-                detailsContent.appendChild(
-                    renderChangeSection(
-                        "Добавленные пары",
-                        groupData.details.added,
-                        "added"
-                    )
-                );
-            }
-            if (groupData.details.removed.length > 0) {
-                detailsContent.appendChild(
-                    renderChangeSection(
-                        "Удаленные пары",
-                        groupData.details.removed,
-                        "removed"
-                    )
-                );
-            }
-            if (groupData.details.modified.length > 0) {
-                detailsContent.appendChild(
-                    renderChangeSection(
-                        "Измененные пары",
-                        groupData.details.modified,
-                        "modified"
-                    )
-                );
-            }
+    comparisonResults.style.display = "block";
+}
 
-            detailsCell.appendChild(detailsContent);
-            detailsRow.appendChild(detailsCell);
-            comparisonResultsBody.appendChild(detailsRow);
+async function renderComparisonStream(response, onFirstGroup) {
+    // Группы отображаются по мере получения строк NDJSON, после получения
+    // всех строк таблица сортируется так же, как в renderComparisonResults
+    const comparisonResultsBody = document.getElementById("comparisonResultsBody");
+    const comparisonResults = document.getElementById("comparisonResults");
 
-            tr.addEventListener("click", function () {
-                const detailsRow = document.getElementById(
-                    this.dataset.detailsId
-                );
-                const isVisible = detailsRow.classList.contains("is-visible");
+    comparisonResultsBody.innerHTML = "";
+    comparisonResults.style.display = "block";
 
-                document.querySelectorAll(".details-row").forEach((row) => {
-                    row.classList.remove("is-visible");
-                });
-                document.querySelectorAll(".group-row").forEach((row) => {
-                    row.classList.remove("is-expanded");
-                });
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const rendered = [];
+    let buffer = "";
+
+    const renderLine = (line) => {
+        if (!line.trim()) return;
+        const { group, result } = JSON.parse(line);
+        const rows = renderGroupRows(group, result, rendered.length);
+        rows.forEach((row) => comparisonResultsBody.appendChild(row));
+        rendered.push([group, result, rows]);
+        if (rendered.length === 1 && onFirstGroup) onFirstGroup();
+    };
 
-                if (!isVisible) {
-                    detailsRow.classList.add("is-visible");
-                    this.classList.add("is-expanded");
-                }
-            });
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split("\n");
+        buffer = lines.pop();
+        lines.forEach(renderLine);
+    }
+    renderLine(buffer + decoder.decode());
+
+    rendered
+        .sort(compareGroupResults)
+        .forEach(([, , rows]) =>
+            rows.forEach((row) => comparisonResultsBody.appendChild(row))
+        );
+}
+
+function renderGroupRows(groupName, groupData, index) {
+    const rows = [];
+
+    const tr = document.createElement("tr");
+    tr.className = "group-row";
+    tr.dataset.detailsId = `details-${index}`;
+
+    tr.innerHTML = `
+  <td>
+      ${groupData.total
+            ? `<span class="icon toggle-icon"><i class="fas fa-chevron-right"></i></span>`
+            : ""
+        }
+      ${groupName}
+  </td>
+  <td class="${groupData.total ? "has-changes" : "no-changes"}">
+      ${groupData.total
+            ? `${groupData.total} изменений`
+            : "Нет изменений"
+        }
+  </td>
+  <td>${renderSummaryBadges(groupData.summary, groupData)}</td>
+`;
+
+    rows.push(tr);
+
+    if (groupData.total > 0) {
+        const detailsRow = document.createElement("tr");
+        detailsRow.className = "details-row";
+        detailsRow.id = `details-${index}`;
+        const detailsCell = document.createElement("td");
+        detailsCell.colSpan = 3;
+
+        const detailsContent = document.createElement("div");
+        detailsContent.className = "change-details";
+
+        if (groupData.details.added.length > 0) {
+            detailsContent.appendChild(
+                renderChangeSection(
+                    "Добавленные пары",
+                    groupData.details.added,
+                    "added"
+                )
+            );
+        }
+        if (groupData.details.removed.length > 0) {
+            detailsContent.appendChild(
+                renderChangeSection(
+                    "Удаленные пары",
+                    groupData.details.removed,
+                    "removed"
+                )
+            );
+        }
+        if (groupData.details.modified.length > 0) {
+            detailsContent.appendChild(
+                renderChangeSection(
+                    "Измененные пары",
+                    groupData.details.modified,
+                    "modified"
+                )
+            );
         }
-    });
 
-    comparisonResults.style.display = "block";
+        detailsCell.appendChild(detailsContent);
+        detailsRow.appendChild(detailsCell);
+        rows.push(detailsRow);
+
+        tr.addEventListener("click", function () {
+            const detailsRow = document.getElementById(
+                this.dataset.detailsId
+            );
+            const isVisible = detailsRow.classList.contains("is-visible");
+
+            document.querySelectorAll(".details-row").forEach((row) => {
+                row.classList.remove("is-visible");
+            });
+            document.querySelectorAll(".group-row").forEach((row) => {
+                row.classList.remove("is-expanded");
+            });
+
+            if (!isVisible) {
+                detailsRow.classList.add("is-visible");
+                this.classList.add("is-expanded");
+            }
+        });
+    }
+
+    return rows;
 }
 
 function renderSummaryBadges(summary, groupData) {
@@ -609,6 +662,7 @@ function getLessonTypeClass(lessonType) {
 window.renderVersions = renderVersions;
 window.renderVersionOptions = renderVersionOptions;
 window.renderComparisonResults = renderComparisonResults;
+window.renderComparisonStream = renderComparisonStream;
 window.translateField = translateField;
 window.deleteVersion = deleteVersion;
 window.getLessonTypeClass = getLessonTypeClass; 
\ No newline at end of file
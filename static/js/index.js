@@ -33,9 +33,11 @@ function initializeApp(baseUrl) {
         CURRENT_WEEK: `${API_HOST}/schedule/current-week`,
         FILES_LIST: `${API_HOST}/files`,
         COMPARE_FILES: `${API_HOST}/compare-files`,
+        COMPARE_FILES_STREAM: `${API_HOST}/compare-files/stream`,
         ADD_FILE: `${API_HOST}/files/add-file`,
         SEARCH_GROUPS: `${API_HOST}/search-groups`,
         DOWNLOAD_SCHEDULES: `${API_HOST}/schedule/download-schedules`,
+        JOBS: `${API_HOST}/jobs`,
     };
 
     window.API_ENDPOINTS = API_ENDPOINTS;
@@ -97,7 +99,8 @@ function initializeApp(baseUrl) {
                 body: JSON.stringify({ groups: groupsArray }),
             });
             if (!response.ok) throw new Error("Ошибка при загрузке групп");
-            await response.json();
+            const job = await response.json();
+            await waitForJob(job.id);
             await fetchVersions();
         } catch (error) {
             alert(error.message);
@@ -123,7 +126,7 @@ function initializeApp(baseUrl) {
         showLoading();
         try {
             const response = await fetch(
-                `${window.API_ENDPOINTS.COMPARE_FILES}?file_id_1=${leftVersionId}&file_id_2=${rightVersionId}`,
+                `${window.API_ENDPOINTS.COMPARE_FILES_STREAM}?file_id_1=${leftVersionId}&file_id_2=${rightVersionId}`,
                 {
                     method: "GET",
                     headers: {
@@ -132,8 +135,8 @@ function initializeApp(baseUrl) {
                 }
             );
             if (!response.ok) throw new Error("Ошибка при сравнении версий");
-            const result = await response.json();
-            renderComparisonResults(result);
+            // Индикатор загрузки скрывается, как только показана первая группа
+            await renderComparisonStream(response, hideLoading);
         } catch (error) {
             alert(error.message);
         } finally {
@@ -152,6 +155,20 @@ function hideLoading() {
     loadingModal.classList.remove("is-active");
 }
 
+async function waitForJob(jobId, pollInterval = 1000) {
+    while (true) {
+        const response = await fetch(`${window.API_ENDPOINTS.JOBS}/${jobId}`);
+        if (!response.ok) throw new Error("Ошибка при получении статуса задачи");
+        const job = await response.json();
+
+        if (job.status === "done") return job;
+        if (job.status === "failed") {
+            throw new Error(job.error || "Ошибка при выполнении задачи");
+        }
+        await new Promise((resolve) => setTimeout(resolve, pollInterval));
+    }
+}
+
 let selectedGroupToAdd = null;
 
 function updateAddButtonState() {